@@ -0,0 +1,19 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.admin.apps import SimpleAdminConfig
+from django.utils.module_loading import module_has_submodule
+
+
+class AdminConfig(SimpleAdminConfig):
+    """
+    后台自动发现，跳过 django_apscheduler 自带的 admin：其模块顶层导入 BackgroundScheduler 与 DjangoJobStore，
+    会把调度器带进每个 web worker 与 manage.py 命令的启动路径。调度作业改由 tasks/admin.py 注册
+    """
+    skip_apps = ('django_apscheduler',)
+
+    def ready(self):
+        super().ready()
+        for app_config in apps.get_app_configs():
+            if app_config.name not in self.skip_apps and module_has_submodule(app_config.module, 'admin'):
+                import_module(f'{app_config.name}.admin')
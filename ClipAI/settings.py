@@ -24,7 +24,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-#$#^ij10#p)s!cwf*c^@brw(y6c1p00il!nq0(6@@k9%_g61j!'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# 生产环境设置 DEBUG=0（DEBUG 模式下每个请求的 SQL 都会留在内存中）
+DEBUG = os.getenv('DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['*']
 
@@ -41,7 +42,8 @@ if not CurrentDayLog.exists():
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # 替代 'django.contrib.admin'：自动发现时跳过 django_apscheduler 的 admin（见 ClipAI/apps.py）
+    'ClipAI.apps.AdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -136,9 +138,35 @@ if POSTGRES_HOST:
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'clipai'),
             'HOST':POSTGRES_HOST,
             'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            # 持久连接：同一线程内的请求复用数据库连接（秒，0 为每个请求结束即关闭）
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
         }
     }
+    # 连接池模式 DB_POOL_MODE：
+    #   persistent（默认）每个线程一个持久连接，连接数上限约为 进程数 * 线程数
+    #   pool       进程内共享 psycopg 连接池（Django 5.1+），线程用完即归还，连接数上限为 进程数 * DB_POOL_MAX_SIZE；
+    #              需安装 psycopg 3（pip install "psycopg[binary,pool]"），未安装时自动回退 persistent
+    #   pgbouncer  经 pgbouncer 事务池连接：禁用服务端游标（事务池下不可用）；
+    #              会话级 advisory lock 在事务池下无效，run_scheduler 进程需直连 PostgreSQL（单独设置其 POSTGRES_HOST/PORT）
+    DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'persistent')
+    if DB_POOL_MODE == 'pool':
+        try:
+            import psycopg_pool  # noqa: F401
+            DATABASES['default']['CONN_MAX_AGE'] = 0
+            DATABASES['default']['OPTIONS']['pool'] = {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                # 池中无空闲连接时的最长等待秒数，超时抛出异常而不是无限排队
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+            }
+        except ImportError:
+            DB_POOL_MODE = 'persistent'
+    elif DB_POOL_MODE == 'pgbouncer':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
 else:
+    DB_POOL_MODE = 'persistent'
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -200,22 +228,115 @@ CELERY_BEAT_SCHEDULE = {}
 
 # Encryption key for sensitive fields (set in env for production)
 ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY')
+# 账号令牌解密结果的进程内缓存：有效期（秒，0 为不缓存）与条目上限
+CREDENTIAL_CACHE_TTL = int(os.getenv('CREDENTIAL_CACHE_TTL', '300'))
+CREDENTIAL_CACHE_MAX_SIZE = int(os.getenv('CREDENTIAL_CACHE_MAX_SIZE', '4096'))
 
 # 关闭未用的旧开关
 WEBHOOKS_ENABLED = False
 AI_FAKE_FALLBACK_ENABLED = False
 RATE_LIMIT_ENFORCE_SKIP = False
 RATE_LIMIT_DEFAULT_BACKOFF_SECONDS = 300
+# Twitter 限流器：状态所在缓存别名（多进程需共享缓存）、令牌用尽时最长等待重置的秒数（超过则跳过本次调用）
+TWITTER_RATE_LIMIT_CACHE = os.getenv('TWITTER_RATE_LIMIT_CACHE', 'default')
+TWITTER_RATE_LIMIT_MAX_WAIT = float(os.getenv('TWITTER_RATE_LIMIT_MAX_WAIT', '60'))
+# 推文数据异步并发采集：开关、同一 api_key / 全局同时在途的请求数、请求超时（秒）
+TWITTER_ASYNC_ENABLED = os.getenv('TWITTER_ASYNC_ENABLED', '1') == '1'
+TWITTER_ASYNC_CONCURRENCY_PER_APP = int(os.getenv('TWITTER_ASYNC_CONCURRENCY_PER_APP', '4'))
+TWITTER_ASYNC_MAX_CONCURRENCY = int(os.getenv('TWITTER_ASYNC_MAX_CONCURRENCY', '32'))
+TWITTER_HTTP_TIMEOUT = float(os.getenv('TWITTER_HTTP_TIMEOUT', '30'))
+# 进程内缓存的账号 Twitter 客户端数量上限（LRU 淘汰）
+TWITTER_CLIENT_CACHE_SIZE = int(os.getenv('TWITTER_CLIENT_CACHE_SIZE', '256'))
 FEATURE_THREADS = False
 
-# 简化缓存为本地内存
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'clipai-local-cache',
-    }
+# 多账号任务并发执行：线程池大小与各平台同时执行的账号数上限（进程内全局）
+TASK_EXEC_MAX_WORKERS = int(os.getenv('TASK_EXEC_MAX_WORKERS', '16'))
+TASK_EXEC_PROVIDER_LIMITS = {
+    'twitter': int(os.getenv('TASK_EXEC_TWITTER_LIMIT', '8')),
+    'facebook': int(os.getenv('TASK_EXEC_FACEBOOK_LIMIT', '8')),
 }
 
+# 大模型 HTTP 连接池（按 base_url 主机复用 keep-alive 连接）
+LLM_HTTP_POOL_SIZE = int(os.getenv('LLM_HTTP_POOL_SIZE', '20'))
+LLM_HTTP_TIMEOUT = float(os.getenv('LLM_HTTP_TIMEOUT', '60'))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv('LLM_HTTP_CONNECT_TIMEOUT', '10'))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv('LLM_HTTP_KEEPALIVE_EXPIRY', '60'))
+# 批量生成文案时的并发请求数
+LLM_ASYNC_CONCURRENCY = int(os.getenv('LLM_ASYNC_CONCURRENCY', '8'))
+# HTTP/2 需安装 h2（pip install httpx[http2]），未安装时自动回退 HTTP/1.1
+LLM_HTTP2 = os.getenv('LLM_HTTP2', '0') == '1'
+
+# Redis（可选，用于任务队列等多进程共享场景）
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')
+
+# 任务执行队列：database / redis / local（local 仅用于测试）
+TASK_QUEUE_BACKEND = os.getenv('TASK_QUEUE_BACKEND', 'database')
+TASK_QUEUE_POLL_INTERVAL = float(os.getenv('TASK_QUEUE_POLL_INTERVAL', '1'))
+# worker 启动时，超过该秒数仍处于 running 的作业视为中断
+TASK_QUEUE_STALE_SECONDS = int(os.getenv('TASK_QUEUE_STALE_SECONDS', '3600'))
+
+# 定时任务调度：web 进程只写入任务定义，由 python manage.py run_scheduler 进程执行（多副本时按 advisory lock 选主）
+# SCHEDULER_RUN_IN_PROCESS=1 时在当前进程内直接执行（单进程开发环境，多进程部署会重复触发）
+SCHEDULER_RUN_IN_PROCESS = os.getenv('SCHEDULER_RUN_IN_PROCESS', '0') == '1'
+SCHEDULER_LOCK_KEY = int(os.getenv('SCHEDULER_LOCK_KEY', '720260001'))
+SCHEDULER_POLL_SECONDS = float(os.getenv('SCHEDULER_POLL_SECONDS', '10'))
+
+# 大模型厂商路由：滚动统计窗口（次）、连续失败/窗口错误率熔断阈值、熔断冷却（秒）
+# 对冲请求：首选配置超过其 p95 延迟仍未返回时并发请求下一个配置（默认关闭，会增加调用量）
+AI_ROUTER_WINDOW = int(os.getenv('AI_ROUTER_WINDOW', '50'))
+AI_ROUTER_FAILURE_THRESHOLD = int(os.getenv('AI_ROUTER_FAILURE_THRESHOLD', '3'))
+AI_ROUTER_ERROR_RATE = float(os.getenv('AI_ROUTER_ERROR_RATE', '0.5'))
+AI_ROUTER_MIN_SAMPLES = int(os.getenv('AI_ROUTER_MIN_SAMPLES', '10'))
+AI_ROUTER_COOLDOWN_SECONDS = int(os.getenv('AI_ROUTER_COOLDOWN_SECONDS', '60'))
+AI_ROUTER_HEDGE_ENABLED = os.getenv('AI_ROUTER_HEDGE_ENABLED', '0') == '1'
+AI_ROUTER_HEDGE_MIN_SAMPLES = int(os.getenv('AI_ROUTER_HEDGE_MIN_SAMPLES', '20'))
+AI_ROUTER_HEDGE_WORKERS = int(os.getenv('AI_ROUTER_HEDGE_WORKERS', '8'))
+
+# AI 配置/提示词进程内缓存兜底过期秒数（保存/删除时按版本号立即失效）
+CONFIG_CACHE_TTL = int(os.getenv('CONFIG_CACHE_TTL', '300'))
+
+# limited 使用策略账号每日可执行次数（计数保存在 AccountDailyUsage）
+ACCOUNT_LIMITED_DAILY_QUOTA = int(os.getenv('ACCOUNT_LIMITED_DAILY_QUOTA', '2'))
+
+# 定时任务文案预生成缓冲区：每个任务预留条数（至少覆盖一次触发的账号数）、有效期（秒）、后台补充间隔（分钟）
+# 只为下次触发落在有效期内的任务补充，触发间隔长于有效期的任务（如每日任务）在触发前的有效期窗口内才生成
+# 多进程部署时需将 CACHES 切换为共享缓存，否则各进程缓冲区互不可见
+COPY_BUFFER_DEPTH = int(os.getenv('COPY_BUFFER_DEPTH', '5'))
+COPY_BUFFER_TTL = int(os.getenv('COPY_BUFFER_TTL', str(6 * 3600)))
+COPY_BUFFER_REFILL_MINUTES = int(os.getenv('COPY_BUFFER_REFILL_MINUTES', '30'))
+
+# 推文增量采集：调度间隔（分钟，只刷新到期推文）、最短/最长刷新间隔（秒）、新发推文的高频刷新期（小时）
+ARTICLE_REFRESH_TICK_MINUTES = int(os.getenv('ARTICLE_REFRESH_TICK_MINUTES', '15'))
+ARTICLE_REFRESH_MIN_SECONDS = int(os.getenv('ARTICLE_REFRESH_MIN_SECONDS', '900'))
+ARTICLE_REFRESH_MAX_SECONDS = int(os.getenv('ARTICLE_REFRESH_MAX_SECONDS', str(2 * 86400)))
+ARTICLE_REFRESH_YOUNG_HOURS = int(os.getenv('ARTICLE_REFRESH_YOUNG_HOURS', '24'))
+
+# 缓存后端：默认本地内存；多进程部署（web + worker + scheduler）设置 CACHE_BACKEND=redis 共享缓存
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'clipai',
+        }
+    }
+else:
+    # 简化缓存为本地内存
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'clipai-local-cache',
+        }
+    }
+
+# 统计看板响应缓存：缓存别名、过期秒数（写入时按用户版本号主动失效，过期时间仅作兜底）
+STATS_CACHE_ENABLED = os.getenv('STATS_CACHE_ENABLED', '1') == '1'
+STATS_CACHE_ALIAS = os.getenv('STATS_CACHE_ALIAS', 'default')
+STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', '300'))
+# 流式导出每批从数据库读取的行数
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '2000'))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
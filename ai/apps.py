@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai'
+
+    def ready(self):
+        from utils.configCache import connect_config_signals
+        connect_config_signals()
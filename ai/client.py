@@ -1,8 +1,9 @@
 import random
 import time
 from typing import List, Optional, Dict, Any
-import requests
+import httpx
 
+from utils.httpSession import post_json
 from utils.utils import logger
 
 
@@ -28,7 +29,7 @@ class OpenAICompatibleClient:
     ) -> Dict[str, Any]:
         # url = f"{self.base_url}/v1/chat/completions"
         url = f"{self.base_url}/chat/completions"
-        logger.info("请求的URL为:", url)
+        logger.info(f"请求的URL为: {url}")
         # url = f"{self.base_url}"
         headers = {
             'Authorization': f'Bearer {self.api_key}',
@@ -53,7 +54,7 @@ class OpenAICompatibleClient:
             attempt += 1
             start = time.time()
             try:
-                resp = requests.post(url, json=payload, headers=headers, timeout=self.timeout)
+                resp = post_json(url, payload, headers, timeout=self.timeout)
                 latency_ms = int((time.time() - start) * 1000)
                 # Retry only on 5xx
                 if 500 <= resp.status_code < 600:
@@ -63,7 +64,7 @@ class OpenAICompatibleClient:
                 resp.raise_for_status()
                 data = resp.json()
                 break
-            except requests.RequestException as e:
+            except httpx.HTTPError as e:
                 last_exc = e
                 if attempt < self.max_retries:
                     time.sleep(0.5 * (2 ** (attempt - 1)))
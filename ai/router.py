@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：router.py
+@Author  ：LYP
+@Date    ：2026/10/18 18:30
+@description : 大模型厂商路由（优先级排序、滚动延迟/错误率统计、熔断、失败切换、可选对冲请求）
+
+候选顺序：熔断中的配置排最后，其余按 默认配置 > 优先级 > 近期中位延迟 排序。
+一次生成依次尝试候选，失败即切到下一个；某配置连续失败或窗口内错误率过高时熔断 AI_ROUTER_COOLDOWN_SECONDS 秒，
+冷却结束后放行试探请求，成功即恢复。开启 AI_ROUTER_HEDGE_ENABLED 时，
+首选配置超过其 p95 延迟仍未返回，会向下一个健康配置并发一次对冲请求，取先成功者。
+统计保存在进程内存中，各 worker 进程独立统计。
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Dict, Iterable
+
+from django.conf import settings
+
+from utils.utils import logger
+
+# 走 OpenAI 兼容 chat/completions 协议的厂商
+SUPPORTED_PROVIDERS = ('openai', 'deepseek')
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def _percentile(values: List[float], ratio: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+class ProviderStats(object):
+    """单个配置的滚动统计与熔断状态"""
+
+    def __init__(self, window: int):
+        self.lock = threading.Lock()
+        self.results = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record(self, ok: bool, latency: float | None = None) -> None:
+        with self.lock:
+            self.results.append(ok)
+            if ok:
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+                if latency is not None:
+                    self.latencies.append(latency)
+                return
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= _setting('AI_ROUTER_FAILURE_THRESHOLD', 3) or self._error_rate_exceeded():
+                self.open_until = time.monotonic() + _setting('AI_ROUTER_COOLDOWN_SECONDS', 60)
+
+    def _error_rate_exceeded(self) -> bool:
+        if len(self.results) < _setting('AI_ROUTER_MIN_SAMPLES', 10):
+            return False
+        errors = sum(1 for ok in self.results if not ok)
+        return errors / len(self.results) >= _setting('AI_ROUTER_ERROR_RATE', 0.5)
+
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def p50(self) -> float | None:
+        with self.lock:
+            return _percentile(list(self.latencies), 0.5)
+
+    def p95(self) -> float | None:
+        with self.lock:
+            if len(self.latencies) < _setting('AI_ROUTER_HEDGE_MIN_SAMPLES', 20):
+                return None
+            return _percentile(list(self.latencies), 0.95)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            total = len(self.results)
+            errors = sum(1 for ok in self.results if not ok)
+            latencies = list(self.latencies)
+        return {
+            'samples': total,
+            'error_rate': round(errors / total, 4) if total else 0,
+            'p50_ms': int(_percentile(latencies, 0.5) * 1000) if latencies else None,
+            'p95_ms': int(_percentile(latencies, 0.95) * 1000) if latencies else None,
+            'consecutive_failures': self.consecutive_failures,
+            'circuit_open': self.is_open(),
+        }
+
+
+class ProviderRouter(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[int, ProviderStats] = {}
+        self._names: Dict[int, str] = {}
+        self._executor = None
+
+    def stats_of(self, cfg) -> ProviderStats:
+        with self._lock:
+            stats = self._stats.get(cfg.id)
+            if stats is None:
+                stats = self._stats[cfg.id] = ProviderStats(_setting('AI_ROUTER_WINDOW', 50))
+            self._names[cfg.id] = str(cfg)
+            return stats
+
+    def ranked(self, configs: Iterable) -> list:
+        """候选配置排序；不支持的厂商直接剔除并记录日志"""
+        candidates = []
+        for cfg in configs:
+            if cfg.provider not in SUPPORTED_PROVIDERS:
+                logger.warning(f"AI 配置 {cfg} 的厂商 {cfg.provider} 暂不支持，已跳过")
+                continue
+            candidates.append(cfg)
+
+        def key(cfg):
+            stats = self.stats_of(cfg)
+            p50 = stats.p50()
+            return (stats.is_open(), not cfg.is_default, -cfg.priority, p50 if p50 is not None else float('inf'))
+
+        return sorted(candidates, key=key)
+
+    def _call(self, cfg, messages: List[Dict[str, str]]) -> str:
+        """单次调用并记录统计；失败抛出异常"""
+        from utils.largeModelUnit import LargeModelUnit
+        stats = self.stats_of(cfg)
+        start = time.monotonic()
+        try:
+            flag, text = LargeModelUnit(cfg.model, cfg.api_key, cfg.base_url).generateToOpenAI(messages=messages)
+        except Exception:
+            stats.record(False)
+            raise
+        if not flag or not text:
+            stats.record(False)
+            raise ValueError('模型返回为空')
+        stats.record(True, time.monotonic() - start)
+        return text
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=_setting('AI_ROUTER_HEDGE_WORKERS', 8),
+                                                    thread_name_prefix='ai-hedge')
+            return self._executor
+
+    def _hedged_call(self, cfg, backup, messages: List[Dict[str, str]], tried: set) -> tuple:
+        """
+        首选超过 p95 未返回时向备选并发请求，返回 (配置, 文案)，均失败时抛出最后一个异常
+        :param tried: 已尝试的配置ID，备选真正发出请求时才加入（首选在 p95 内失败时备选留给后续切换）
+        """
+        pool = self._pool()
+        futures = {pool.submit(self._call, cfg, messages): cfg}
+        done, _ = wait(futures, timeout=self.stats_of(cfg).p95())
+        if not done:
+            logger.info(f"AI 配置 {cfg} 超过 p95 延迟未返回，对冲请求 {backup}")
+            tried.add(backup.id)
+            futures[pool.submit(self._call, backup, messages)] = backup
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return futures[future], future.result()
+                except Exception as e:
+                    error = e
+        raise error
+
+    def generate(self, messages: List[Dict[str, str]], configs: Iterable) -> tuple:
+        """
+        按路由顺序生成一条文案
+        :return: (实际使用的配置, 文案)，全部失败时为 (None, '')
+        """
+        candidates = self.ranked(configs)
+        hedge = _setting('AI_ROUTER_HEDGE_ENABLED', False)
+        tried = set()
+        for cfg in candidates:
+            if cfg.id in tried:
+                continue
+            tried.add(cfg.id)
+            backup = next((c for c in candidates if c.id not in tried and not self.stats_of(c).is_open()), None)
+            use_hedge = hedge and backup is not None and self.stats_of(cfg).p95() is not None
+            try:
+                if use_hedge:
+                    return self._hedged_call(cfg, backup, messages, tried)
+                return cfg, self._call(cfg, messages)
+            except Exception as e:
+                logger.warning(f"AI 配置 {cfg} 生成失败，切换下一个：{e}")
+        return None, ''
+
+    def generate_many(self, messages: List[Dict[str, str]], n: int, configs: Iterable) -> list:
+        """
+        批量生成 n 条文案，首选配置未补足的部分由后续配置补齐
+        :return: [(配置, 文案)]，长度不超过 n
+        """
+        from utils.largeModelUnit import AsyncLargeModelUnit
+        results = []
+        for cfg in self.ranked(configs):
+            missing = n - len(results)
+            if missing <= 0:
+                break
+            stats = self.stats_of(cfg)
+            try:
+                texts = AsyncLargeModelUnit(cfg.model, cfg.api_key, cfg.base_url,
+                                            provider=cfg.provider).generate_many_sync(messages, missing)
+            except Exception as e:
+                logger.warning(f"AI 配置 {cfg} 批量生成失败：{e}")
+                texts = []
+            ok = [text for flag, text in texts if flag and text]
+            # 批量请求耗时与单条不可比，只计成功/失败
+            stats.record(bool(ok))
+            results.extend((cfg, text) for text in ok)
+        return results
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            items = list(self._stats.items())
+            names = dict(self._names)
+        return {names.get(config_id, str(config_id)): stats.snapshot() for config_id, stats in items}
+
+
+_router = ProviderRouter()
+
+
+def get_router() -> ProviderRouter:
+    return _router
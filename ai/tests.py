@@ -1,3 +1,136 @@
-from django.test import TestCase
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase, override_settings
+
+from utils import configCache
+from .router import ProviderRouter
+from .models import AIConfig
+
+
+class ConfigCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        configCache.invalidate_config_cache()
+
+    def test_prompt_cached_until_invalidated(self):
+        prompt = SimpleNamespace(id=3, name='p', content='c')
+        with mock.patch.object(configCache.PromptConfig, 'objects') as objects:
+            objects.filter.return_value.first.return_value = prompt
+            for _ in range(5):
+                self.assertIs(configCache.get_prompt(3), prompt)
+            self.assertEqual(objects.filter.call_count, 1)
+            configCache.invalidate_config_cache(sender=configCache.PromptConfig)
+            configCache.get_prompt(3)
+            self.assertEqual(objects.filter.call_count, 2)
+        self.assertIsNone(configCache.get_prompt(None))
+
+    def test_invalidation_during_query_discards_stale_result(self):
+        stale, fresh = SimpleNamespace(id=3, content='old'), SimpleNamespace(id=3, content='new')
+        results = iter([stale, fresh])
+
+        def first():
+            # 查询返回前配置被修改、缓存被失效，另一线程已按新版本重建本地缓存：旧结果不能写入新版本
+            configCache.invalidate_config_cache(sender=configCache.PromptConfig)
+            configCache._fresh_state()
+            return next(results)
+
+        with mock.patch.object(configCache.PromptConfig, 'objects') as objects:
+            objects.filter.return_value.first.side_effect = first
+            self.assertIs(configCache.get_prompt(3), stale)
+            objects.filter.return_value.first.side_effect = lambda: next(results)
+            self.assertIs(configCache.get_prompt(3), fresh)
+            self.assertIs(configCache.get_prompt(3), fresh)
+            self.assertEqual(objects.filter.call_count, 2)
+
+
+class ConfigCacheSignalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        configCache.invalidate_config_cache()
+
+    def test_saving_or_deleting_config_refreshes_cache(self):
+        first = AIConfig.objects.create(name='a', provider='deepseek', model='m1', api_key='k', priority=1)
+        self.assertEqual(configCache.get_ai_config(), first)
+        with self.assertNumQueries(0):
+            configCache.get_ai_config()
+        second = AIConfig.objects.create(name='b', provider='openai', model='m2', api_key='k', priority=5)
+        self.assertEqual(configCache.get_ai_config(), second)
+        second.delete()
+        self.assertEqual(configCache.get_ai_configs(), [first])
+
+
+class ProviderRouterTests(SimpleTestCase):
+    @override_settings(AI_ROUTER_FAILURE_THRESHOLD=2, AI_ROUTER_COOLDOWN_SECONDS=60, AI_ROUTER_HEDGE_ENABLED=False)
+    def test_failover_and_circuit_breaker(self):
+        primary = SimpleNamespace(id=1, provider='deepseek', model='a', api_key='k', base_url='u', is_default=True,
+                                  priority=0)
+        backup = SimpleNamespace(id=2, provider='openai', model='b', api_key='k', base_url='u', is_default=False,
+                                 priority=5)
+        unknown = SimpleNamespace(id=3, provider='anthropic', model='c', api_key='k', base_url='u', is_default=False,
+                                  priority=9)
+        router = ProviderRouter()
+        calls = []
+
+        def generate(self, messages):
+            calls.append(self.model)
+            return (False, '') if self.model == 'a' else (True, 'ok')
+
+        with mock.patch('utils.largeModelUnit.LargeModelUnit.generateToOpenAI', generate):
+            self.assertEqual(router.ranked([backup, unknown, primary]), [primary, backup])
+            for _ in range(2):
+                used, text = router.generate([], [primary, backup, unknown])
+                self.assertEqual((used.id, text), (2, 'ok'))
+            self.assertEqual(calls, ['a', 'b', 'a', 'b'])
+            # 首选熔断后排到最后，直接命中备选
+            self.assertEqual(router.ranked([primary, backup]), [backup, primary])
+            router.generate([], [primary, backup])
+            self.assertEqual(calls[-1], 'b')
+            self.assertEqual(len(calls), 5)
+        self.assertTrue(router.snapshot()[str(primary)]['circuit_open'])
+
+    @override_settings(AI_ROUTER_HEDGE_ENABLED=True, AI_ROUTER_HEDGE_MIN_SAMPLES=1)
+    def test_hedge_falls_back_when_primary_fails_fast(self):
+        primary = SimpleNamespace(id=1, provider='deepseek', model='a', api_key='k', base_url='u', is_default=True,
+                                  priority=0)
+        backup = SimpleNamespace(id=2, provider='openai', model='b', api_key='k', base_url='u', is_default=False,
+                                 priority=0)
+        router = ProviderRouter()
+        router.stats_of(primary).record(True, 5)
+        calls = []
+
+        def generate(self, messages):
+            calls.append(self.model)
+            return (False, '') if self.model == 'a' else (True, 'ok')
+
+        with mock.patch('utils.largeModelUnit.LargeModelUnit.generateToOpenAI', generate):
+            used, text = router.generate([], [primary, backup])
+        # 首选在 p95 内失败，未发出对冲请求，备选由失败切换调用
+        self.assertEqual((used.id, text), (2, 'ok'))
+        self.assertEqual(calls, ['a', 'b'])
+
+    @override_settings(AI_ROUTER_HEDGE_ENABLED=True, AI_ROUTER_HEDGE_MIN_SAMPLES=1)
+    def test_hedge_calls_backup_once_when_primary_is_slow(self):
+        import threading
+        primary = SimpleNamespace(id=1, provider='deepseek', model='a', api_key='k', base_url='u', is_default=True,
+                                  priority=0)
+        backup = SimpleNamespace(id=2, provider='openai', model='b', api_key='k', base_url='u', is_default=False,
+                                 priority=0)
+        router = ProviderRouter()
+        router.stats_of(primary).record(True, 0.01)
+        release = threading.Event()
+        calls = []
+
+        def generate(self, messages):
+            calls.append(self.model)
+            if self.model == 'a':
+                release.wait(5)
+                return False, ''
+            return True, 'ok'
+
+        with mock.patch('utils.largeModelUnit.LargeModelUnit.generateToOpenAI', generate):
+            used, text = router.generate([], [primary, backup])
+            release.set()
+        self.assertEqual((used.id, text), (2, 'ok'))
+        self.assertEqual(sorted(calls), ['a', 'b'])
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：gunicorn.conf.py
+@Author  ：LYP
+@Date    ：2026/10/18 20:00
+@description : 生产环境 gunicorn 配置
+
+用法: gunicorn -c gunicorn.conf.py ClipAI.wsgi:application
+
+视图以等待大模型 / Twitter / 数据库为主（I/O 密集），采用 gthread：每个进程多个线程并发处理请求，
+慢请求不会阻塞同进程内的其它请求。每个线程各自持有一个数据库连接（CONN_MAX_AGE 持久化），
+数据库连接上限约为 workers * threads，需与 PostgreSQL max_connections / pgbouncer 配置匹配。
+
+预加载（preload_app）：主进程导入一次应用，fork 后各进程共享内存页、启动更快；
+导入阶段不会启动调度器（定时任务由 run_scheduler 进程执行），fork 后关闭主进程中可能已建立的数据库/HTTP 连接。
+平滑重载：kill -HUP 主进程会按 graceful_timeout 逐个替换 worker；预加载模式下 HUP 不会重新导入代码，
+发布新代码请使用 kill -USR2（启动新主进程）后对旧主进程 kill -WINCH / -TERM，或设置 GUNICORN_PRELOAD=0。
+"""
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+
+# 大模型生成可能耗时较长，超时需大于 LLM_HTTP_TIMEOUT
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# 定期回收 worker，避免长期运行的内存增长；jitter 防止所有 worker 同时重启
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.getenv('GUNICORN_ERROR_LOG', '-')
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+# nginx 反向代理转发的客户端地址
+forwarded_allow_ips = os.getenv('GUNICORN_FORWARDED_ALLOW_IPS', '*')
+
+
+def post_fork(server, worker):
+    """fork 后的连接不能与主进程共用：关闭预加载阶段可能已打开的数据库连接与 HTTP 连接池"""
+    from django.db import connections
+    from utils.httpSession import close_http_clients
+
+    connections.close_all()
+    close_http_clients()
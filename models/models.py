@@ -401,6 +401,7 @@ class TasksSimpletaskrun(models.Model):
     account = models.ForeignKey(SocialPoolaccount, models.DO_NOTHING, blank=True, null=True)
     owner = models.ForeignKey(AuthUser, models.DO_NOTHING)
     task = models.ForeignKey(TasksSimpletask, models.DO_NOTHING)
+    job_id = models.UUIDField(blank=True, null=True)
 
     class Meta:
         managed = False
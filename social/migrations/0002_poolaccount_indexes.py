@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='poolaccount',
+            index=models.Index(fields=['owner', 'provider', 'status'], name='poolacct_owner_prov_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poolaccount',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['provider', 'owner'], name='poolacct_active_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social', '0002_poolaccount_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_usages', to='social.poolaccount')),
+            ],
+            options={
+                'verbose_name': '账号每日用量',
+                'verbose_name_plural': '账号每日用量',
+                'unique_together': {('account', 'date')},
+            },
+        ),
+    ]
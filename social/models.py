@@ -1,5 +1,6 @@
 from django.db import models
-from .utils import encrypt_text, decrypt_text
+from .utils import encrypt_text, decrypt_text, invalidate_credential_cache
+from utils.twitterClientCache import invalidate_twitter_client
 from django.contrib.auth.models import User
 class PoolAccount(models.Model):
     """账号池模型（全局/共享），用于执行任务时选择多个账号并行执行。
@@ -33,20 +34,58 @@ class PoolAccount(models.Model):
 
     class Meta:
         ordering = ['provider', 'name']
+        indexes = [
+            # 账号列表/任务选号：owner + provider + status 组合过滤
+            models.Index(fields=['owner', 'provider', 'status'], name='poolacct_owner_prov_status_idx'),
+            # 执行任务时只取激活账号，部分索引只收录 active 行
+            models.Index(fields=['provider', 'owner'], name='poolacct_active_idx', condition=models.Q(status='active')),
+        ]
 
     def __str__(self) -> str:
         return f"{self.provider}:{self.name}"
 
     def set_access_token(self, value: str | None):
+        invalidate_credential_cache(self.access_token)
         self.access_token = encrypt_text(value)
+        # 凭证变更，丢弃按旧凭证创建的客户端
+        invalidate_twitter_client(self.id)
 
     def get_access_token(self) -> str:
         return decrypt_text(self.access_token)
 
     def set_access_token_secret(self, value: str | None):
+        invalidate_credential_cache(self.access_token_secret)
         self.access_token_secret = encrypt_text(value)
+        invalidate_twitter_client(self.id)
 
     def get_access_token_secret(self) -> str:
         return decrypt_text(self.access_token_secret)
 
-# Create your models her
\ No newline at end of file
+
+class AccountDailyUsage(models.Model):
+    """账号每日执行次数（limited 使用策略的配额计数），检查与占用在一条 UPDATE 中完成。"""
+    account = models.ForeignKey(PoolAccount, on_delete=models.CASCADE, related_name='daily_usages')
+    date = models.DateField()
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('account', 'date')
+        verbose_name = '账号每日用量'
+        verbose_name_plural = '账号每日用量'
+
+    @classmethod
+    def reserve(cls, account_id: int, limit: int, day=None) -> bool:
+        """占用一次当日额度：count < limit 时原子加一并返回 True，已达上限返回 False（并发安全）"""
+        from datetime import date as _date
+        day = day or _date.today()
+        cls.objects.bulk_create([cls(account_id=account_id, date=day)], ignore_conflicts=True)
+        return cls.objects.filter(account_id=account_id, date=day, count__lt=limit) \
+            .update(count=models.F('count') + 1) == 1
+
+    @classmethod
+    def release(cls, account_id: int, day=None) -> None:
+        """归还一次当日额度（执行失败时调用），计数不会小于 0"""
+        from datetime import date as _date
+        day = day or _date.today()
+        cls.objects.filter(account_id=account_id, date=day, count__gt=0).update(count=models.F('count') - 1)
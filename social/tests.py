@@ -1,3 +1,100 @@
-from django.test import TestCase
+from datetime import date
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from cryptography.fernet import Fernet
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+
+from utils.twitterClientCache import clear_twitter_clients, get_twitter_client, get_twitter_client_stats
+from . import utils as social_utils
+from .models import PoolAccount, AccountDailyUsage
+
+
+class MigrationStateTests(TestCase):
+    def test_models_match_migrations(self):
+        out = StringIO()
+        # 模型与迁移不一致时 --check 以非零状态退出
+        call_command('makemigrations', '--check', '--dry-run', stdout=out)
+        self.assertIn('No changes detected', out.getvalue())
+
+    def test_pool_account_indexes_created(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, PoolAccount._meta.db_table)
+        for index in PoolAccount._meta.indexes:
+            self.assertIn(index.name, constraints)
+
+
+class AccountDailyUsageTests(TestCase):
+    def setUp(self):
+        self.account = PoolAccount.objects.create(provider='twitter', name='a', usage_policy='limited')
+        self.day = date(2026, 10, 18)
+
+    def test_reserve_until_limit_then_next_day(self):
+        self.assertEqual([AccountDailyUsage.reserve(self.account.id, 2, self.day) for _ in range(3)],
+                         [True, True, False])
+        # 行已存在时 ignore_conflicts 插入不报错也不重复
+        self.assertEqual(AccountDailyUsage.objects.filter(account=self.account).count(), 1)
+        self.assertTrue(AccountDailyUsage.reserve(self.account.id, 2, date(2026, 10, 19)))
+        counts = dict(AccountDailyUsage.objects.values_list('date', 'count'))
+        self.assertEqual(counts, {self.day: 2, date(2026, 10, 19): 1})
+
+    def test_release_returns_slot_and_never_goes_negative(self):
+        AccountDailyUsage.reserve(self.account.id, 1, self.day)
+        AccountDailyUsage.release(self.account.id, self.day)
+        self.assertTrue(AccountDailyUsage.reserve(self.account.id, 1, self.day))
+        AccountDailyUsage.release(self.account.id, self.day)
+        AccountDailyUsage.release(self.account.id, self.day)
+        AccountDailyUsage.release(self.account.id, date(2026, 10, 1))
+        self.assertEqual(AccountDailyUsage.objects.get(account=self.account, date=self.day).count, 0)
+
+
+class TwitterClientCacheTests(SimpleTestCase):
+    def setUp(self):
+        clear_twitter_clients()
+        self.addCleanup(clear_twitter_clients)
+
+    @override_settings(TWITTER_CLIENT_CACHE_SIZE=2)
+    def test_reuse_evict_and_invalidate(self):
+        with mock.patch('utils.twitterUnit.TwitterUnit', side_effect=lambda *args: mock.Mock()):
+            first = get_twitter_client(1, 'k', 's', 't', 'ts')
+            self.assertIs(get_twitter_client(1, 'k', 's', 't', 'ts'), first)
+            # 凭证变化即为新客户端
+            self.assertIsNot(get_twitter_client(1, 'k', 's', 't2', 'ts'), first)
+            get_twitter_client(2, 'k', 's', 't', 'ts')
+            self.assertIsNot(get_twitter_client(1, 'k', 's', 't', 'ts'), first)
+            first.client.session.close.assert_called_once()
+            second = get_twitter_client(2, 'k', 's', 't', 'ts')
+            PoolAccount(id=2).set_access_token('new')
+            self.assertIsNot(get_twitter_client(2, 'k', 's', 't', 'ts'), second)
+        stats = get_twitter_client_stats()
+        self.assertEqual((stats['hits'], stats['size'], stats['invalidations']), (2, 2, 1))
+
+
+class CredentialCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.key = Fernet.generate_key().decode()
+        social_utils.invalidate_credential_cache()
+
+    def test_memoized_cipher_batch_decrypt_and_invalidate(self):
+        with override_settings(ENCRYPTION_KEY=self.key):
+            cipher = social_utils._get_fernet()
+            self.assertIs(social_utils._get_fernet(), cipher)
+            token, secret = social_utils.encrypt_text('tok'), social_utils.encrypt_text('sec')
+            accounts = [SimpleNamespace(id=i, access_token=token, access_token_secret=secret) for i in range(50)]
+            accounts.append(SimpleNamespace(id=99, access_token='legacy', access_token_secret=''))
+            with mock.patch.object(Fernet, 'decrypt', autospec=True, side_effect=Fernet.decrypt) as decrypt:
+                result = social_utils.decrypt_accounts(accounts)
+                # 相同密文只解密一次，之后的单条解密命中缓存
+                self.assertEqual(decrypt.call_count, 3)
+                self.assertEqual(social_utils.decrypt_text(token), 'tok')
+                self.assertEqual(decrypt.call_count, 3)
+                social_utils.invalidate_credential_cache(token)
+                social_utils.decrypt_text(token)
+                self.assertEqual(decrypt.call_count, 4)
+            self.assertEqual(result[0], {'access_token': 'tok', 'access_token_secret': 'sec'})
+            self.assertEqual(result[99], {'access_token': 'legacy', 'access_token_secret': ''})
+        with override_settings(ENCRYPTION_KEY=Fernet.generate_key().decode()):
+            self.assertIsNot(social_utils._get_fernet(), cipher)
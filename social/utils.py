@@ -1,16 +1,23 @@
 import base64
 import os
+import threading
+import time
+from typing import Iterable
+
 from django.conf import settings
 from cryptography.fernet import Fernet, InvalidToken
 
+# 令牌加解密在多账号执行中会被频繁调用：Fernet 实例按 ENCRYPTION_KEY 复用，解密结果按密文短期缓存
+_lock = threading.Lock()
+_cipher = {'key': None, 'fernet': None}
+# 密文 -> (明文, 过期时间)；Fernet 每次加密生成不同密文，凭证变更后旧缓存不会再被命中
+_plaintexts = {}
+CREDENTIAL_FIELDS = ('access_token', 'access_token_secret')
 
-def _get_fernet() -> Fernet | None:
-    key = getattr(settings, 'ENCRYPTION_KEY', None)
-    if not key:
-        return None
+
+def _build_fernet(key: str) -> Fernet:
     # 如果提供的是原始 key（32 urlsafe base64），直接使用；否则从明文派生（仅开发环境）
     try:
-        Fernet(key)
         return Fernet(key)
     except Exception:
         # 开发兜底：将明文转 urlsafe_b64（不建议生产）
@@ -18,6 +25,18 @@ def _get_fernet() -> Fernet | None:
         return Fernet(padded)
 
 
+def _get_fernet() -> Fernet | None:
+    key = getattr(settings, 'ENCRYPTION_KEY', None)
+    if not key:
+        return None
+    with _lock:
+        if _cipher['key'] != key:
+            # 密钥变化：重建实例并丢弃按旧密钥解密的明文
+            _cipher.update(key=key, fernet=_build_fernet(key))
+            _plaintexts.clear()
+        return _cipher['fernet']
+
+
 def encrypt_text(plaintext: str | None) -> str:
     if not plaintext:
         return ''
@@ -27,16 +46,86 @@ def encrypt_text(plaintext: str | None) -> str:
     return f.encrypt(plaintext.encode()).decode()
 
 
+def _decrypt(f: Fernet, ciphertext: str) -> str:
+    try:
+        return f.decrypt(ciphertext.encode()).decode()
+    except InvalidToken:
+        # 兼容旧明文
+        return ciphertext
+
+
+def _cached(ciphertext: str, now: float) -> str | None:
+    item = _plaintexts.get(ciphertext)
+    if item is None or item[1] <= now:
+        return None
+    return item[0]
+
+
+def _remember(items: dict[str, str], now: float) -> None:
+    ttl = getattr(settings, 'CREDENTIAL_CACHE_TTL', 300)
+    if ttl <= 0:
+        return
+    with _lock:
+        if len(_plaintexts) + len(items) > getattr(settings, 'CREDENTIAL_CACHE_MAX_SIZE', 4096):
+            for key in [k for k, (_, expires_at) in _plaintexts.items() if expires_at <= now]:
+                del _plaintexts[key]
+            if len(_plaintexts) + len(items) > getattr(settings, 'CREDENTIAL_CACHE_MAX_SIZE', 4096):
+                _plaintexts.clear()
+        for ciphertext, plaintext in items.items():
+            _plaintexts[ciphertext] = (plaintext, now + ttl)
+
+
 def decrypt_text(ciphertext: str | None) -> str:
     if not ciphertext:
         return ''
     f = _get_fernet()
     if not f:
         return ciphertext
-    try:
-        return f.decrypt(ciphertext.encode()).decode()
-    except InvalidToken:
-        # 兼容旧明文
-        return ciphertext
+    now = time.monotonic()
+    with _lock:
+        plaintext = _cached(ciphertext, now)
+    if plaintext is None:
+        plaintext = _decrypt(f, ciphertext)
+        _remember({ciphertext: plaintext}, now)
+    return plaintext
+
+
+def decrypt_accounts(accounts: Iterable, fields: tuple = CREDENTIAL_FIELDS) -> dict[int, dict[str, str]]:
+    """
+    批量解密账号令牌（PoolAccount 查询集或列表），同一密文只解密一次，结果写入明文缓存
+    :return: {账号ID: {字段: 明文}}
+    """
+    accounts = list(accounts)
+    f = _get_fernet()
+    now = time.monotonic()
+    ciphertexts = {getattr(account, field) or '' for account in accounts for field in fields}
+    ciphertexts.discard('')
+    plaintexts = {}
+    if f:
+        with _lock:
+            for ciphertext in ciphertexts:
+                plaintext = _cached(ciphertext, now)
+                if plaintext is not None:
+                    plaintexts[ciphertext] = plaintext
+        missing = {ciphertext: _decrypt(f, ciphertext) for ciphertext in ciphertexts - plaintexts.keys()}
+        _remember(missing, now)
+        plaintexts.update(missing)
+    else:
+        plaintexts = {ciphertext: ciphertext for ciphertext in ciphertexts}
+    return {account.id: {field: plaintexts.get(getattr(account, field) or '', '') for field in fields}
+            for account in accounts}
+
+
+def account_credentials(account) -> tuple[str, str, str, str]:
+    """账号执行用的明文凭证 (api_key, api_secret, access_token, access_token_secret)，令牌经明文缓存解密"""
+    return (account.api_key, account.api_secret,
+            decrypt_text(account.access_token), decrypt_text(account.access_token_secret))
 
 
+def invalidate_credential_cache(*ciphertexts: str) -> None:
+    """移除指定密文的明文缓存；不传参数时清空全部"""
+    with _lock:
+        if not ciphertexts:
+            _plaintexts.clear()
+        for ciphertext in ciphertexts:
+            _plaintexts.pop(ciphertext, None)
@@ -7,7 +7,6 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiResponse, OpenApiParameter
-import tweepy
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework import viewsets
@@ -93,6 +92,7 @@ class PoolAccountTwitterOAuthStart(APIView):
         if not api_key or not api_secret:
             return Response({'detail': '缺少 api_key/api_secret'}, status=400)
         callback_url = request.build_absolute_uri('/api/social/oauth/pool/twitter/callback/')
+        import tweepy
         auth = tweepy.OAuth1UserHandler(api_key, api_secret, callback=callback_url)
         try:
             redirect_url = auth.get_authorization_url()
@@ -123,6 +123,7 @@ class PoolAccountTwitterOAuthCallback(APIView):
         api_key = ctx.get('api_key')
         api_secret = ctx.get('api_secret')
         oauth_token_secret = ctx.get('oauth_token_secret')
+        import tweepy
         auth = tweepy.OAuth1UserHandler(api_key, api_secret)
         auth.request_token = {'oauth_token': oauth_token, 'oauth_token_secret': oauth_token_secret}
         try:
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from stats.utils import rebuild_article_rollup
+
+
+class Command(BaseCommand):
+    help = '根据 t_article 重建文章日汇总表（首次上线回填或修正偏差）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='开始日期 YYYY-MM-DD，默认不限')
+        parser.add_argument('--end', help='结束日期 YYYY-MM-DD，默认不限')
+
+    def handle(self, *args, **options):
+        start = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+        end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        rows = rebuild_article_rollup(start, end)
+        self.stdout.write(f'文章日汇总重建完成，共 {rows} 行')
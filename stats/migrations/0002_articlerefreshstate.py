@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleRefreshState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article_id', models.CharField(max_length=50, unique=True)),
+                ('robot_id', models.IntegerField(db_index=True)),
+                ('next_refresh_at', models.DateTimeField(db_index=True)),
+                ('interval_seconds', models.IntegerField(default=0)),
+                ('impression_count', models.IntegerField(default=0)),
+                ('comment_count', models.IntegerField(default=0)),
+                ('like_count', models.IntegerField(default=0)),
+                ('since_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('last_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': '推文采集状态',
+                'verbose_name_plural': '推文采集状态',
+            },
+        ),
+    ]
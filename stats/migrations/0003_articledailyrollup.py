@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0002_articlerefreshstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('owner_id', models.IntegerField(blank=True, null=True)),
+                ('platform', models.CharField(max_length=100)),
+                ('public_count', models.IntegerField(default=0)),
+                ('impression_count', models.BigIntegerField(default=0)),
+                ('comment_count', models.BigIntegerField(default=0)),
+                ('message_count', models.BigIntegerField(default=0)),
+                ('like_count', models.BigIntegerField(default=0)),
+                ('click_count', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '文章日汇总',
+                'verbose_name_plural': '文章日汇总',
+                'indexes': [models.Index(fields=['owner_id', 'date'], name='stats_artic_owner_i_5b2bf5_idx')],
+                'unique_together': {('date', 'owner_id', 'platform')},
+            },
+        ),
+    ]
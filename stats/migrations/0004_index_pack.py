@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:30
+"""
+非托管表 t_article 上热点过滤条件的索引（模型不由迁移管理，以原生 SQL 创建）。
+使用 CONCURRENTLY 避免锁表，需在事务外执行（atomic = False）；IF NOT EXISTS 保证重复执行安全。非 PostgreSQL 数据库跳过。
+运行记录表的索引定义在 SimpleTaskRun.Meta.indexes，由 tasks 应用的迁移创建。
+
+- 统计/采集按 robot_id + platform + 时间过滤
+- 采集窗口按时间扫描
+
+执行计划对比见 test/bench_query_plans.py。
+"""
+from django.db import migrations
+
+INDEXES = [
+    ('article_robot_plat_created_idx', 't_article', '(robot_id, platform, created_at)', ''),
+    ('article_created_idx', 't_article', '(created_at)', ''),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, columns, where in INDEXES:
+        schema_editor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {columns} {where}')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('stats', '0003_articledailyrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def backfill_article_rollup(apps, schema_editor):
+    """首次上线回填文章日汇总；t_article 不存在（新库）或汇总表已有数据（已手动执行 rebuild_article_rollup）时跳过"""
+    from stats.utils import aggregate_article_rollup
+    ArticleDailyRollup = apps.get_model('stats', 'ArticleDailyRollup')
+    if 't_article' not in schema_editor.connection.introspection.table_names():
+        return
+    if ArticleDailyRollup.objects.exists():
+        return
+    merged = aggregate_article_rollup(apps.get_model('tasks', 'TArticle').objects.all(),
+                                      apps.get_model('social', 'PoolAccount').objects.all())
+    ArticleDailyRollup.objects.bulk_create(
+        [ArticleDailyRollup(date=day, owner_id=owner_id, platform=platform, **values)
+         for (day, owner_id, platform), values in merged.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stats', '0004_index_pack'),
+        ('tasks', '0001_initial'),
+        ('social', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_article_rollup, migrations.RunPython.noop),
+    ]
@@ -28,4 +28,42 @@ class DailyStat(models.Model):
         verbose_name_plural = '日统计'
 
 
+class ArticleRefreshState(models.Model):
+    """推文增量采集状态：下次刷新时间、上次指标与评论游标"""
+    article_id = models.CharField(max_length=50, unique=True)
+    robot_id = models.IntegerField(db_index=True)
+    next_refresh_at = models.DateTimeField(db_index=True)
+    interval_seconds = models.IntegerField(default=0)
+    impression_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    like_count = models.IntegerField(default=0)
+    since_id = models.CharField(max_length=50, null=True, blank=True)
+    last_refreshed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = '推文采集状态'
+        verbose_name_plural = '推文采集状态'
+
+
+class ArticleDailyRollup(models.Model):
+    """文章日汇总（按发布日期、所属用户、平台），由发帖与采集流程增量维护，供统计接口直接读取"""
+    date = models.DateField()
+    owner_id = models.IntegerField(null=True, blank=True)
+    platform = models.CharField(max_length=100)
+    public_count = models.IntegerField(default=0)
+    impression_count = models.BigIntegerField(default=0)
+    comment_count = models.BigIntegerField(default=0)
+    message_count = models.BigIntegerField(default=0)
+    like_count = models.BigIntegerField(default=0)
+    click_count = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'owner_id', 'platform')
+        indexes = [models.Index(fields=['owner_id', 'date'])]
+        verbose_name = '文章日汇总'
+        verbose_name_plural = '文章日汇总'
+
+
 # Create your models here.
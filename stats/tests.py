@@ -1,3 +1,312 @@
-from django.test import TestCase
+import asyncio
+import time
+from datetime import date, datetime
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from social.models import PoolAccount
+from tasks.models import TArticle
+from utils.asyncTwitter import collect_twitter_data
+from utils.rateLimiter import RateLimitExceeded
+from utils.streamExport import iter_csv, iter_ndjson
+from utils.twitterUnit import buildConversationQueries
+from utils.responseCache import cached_stats_response, invalidate_stats_cache, get_stats_cache_stats
+from utils.utils import ApiResponse
+from .models import ArticleDailyRollup
+from .utils import apply_article_deltas
+
+
+class ArticleTableMixin(object):
+    """t_article 为非托管表，测试库中按模型临时建表"""
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            editor.create_model(TArticle)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            editor.delete_model(TArticle)
+
+
+def create_account(owner, **kwargs):
+    data = dict(owner=owner, provider='twitter', name='acc', api_key='k', api_secret='s')
+    data.update(kwargs)
+    return PoolAccount.objects.create(**data)
+
+
+def create_article(article_id, robot_id, created_at, **kwargs):
+    data = dict(article_id=article_id, platform='twitter', article_text='', impression_count=0, comment_count=0,
+                message_count=0, like_count=0, click_count=0, robot_id=robot_id, created_at=created_at,
+                updated_at=created_at)
+    data.update(kwargs)
+    return TArticle.objects.create(**data)
+
+
+def rollup_rows():
+    return {(row.date, row.owner_id, row.platform): (row.public_count, row.impression_count, row.like_count)
+            for row in ArticleDailyRollup.objects.all()}
+
+
+class ArticleRollupTests(ArticleTableMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='u1', password='p')
+        self.account = create_account(self.user)
+        self.day = date(2026, 10, 1)
+
+    def test_cache_invalidated_only_after_commit(self):
+        calls = []
+
+        class View(object):
+            @cached_stats_response('rollup')
+            def get(self, request):
+                calls.append(1)
+                return ApiResponse({'n': len(calls)})
+
+        req = Request(APIRequestFactory().get('/x'))
+        req.user = SimpleNamespace(id=self.user.id, is_superuser=False)
+        View().get(req)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            apply_article_deltas({(self.day, self.account.id, 'twitter'): {'public_count': 1}})
+            self.assertEqual(View().get(req).data['data'], {'n': 1})
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(View().get(req).data['data'], {'n': 2})
+
+    def test_deltas_accumulate_per_owner_and_skip_unknown_accounts(self):
+        other = create_account(self.user, name='acc2')
+        apply_article_deltas({(self.day, self.account.id, 'twitter'): {'public_count': 1, 'impression_count': 10},
+                              (self.day, other.id, 'twitter'): {'public_count': 1, 'impression_count': 5},
+                              (self.day, 999999, 'twitter'): {'public_count': 1}})
+        apply_article_deltas({(self.day, self.account.id, 'twitter'): {'impression_count': -3, 'like_count': 2}})
+        self.assertEqual(rollup_rows(), {(self.day, self.user.id, 'twitter'): (2, 12, 2)})
+
+    def test_metric_refresh_applies_change_once(self):
+        from utils.twitterUnit import bulkUpdateArticles
+        create_article('100', self.account.id, datetime(2026, 10, 1, 8), impression_count=4)
+        apply_article_deltas({(self.day, self.account.id, 'twitter'): {'public_count': 1, 'impression_count': 4}})
+        metrics = {'100': {'pageViews': 9, 'commentCount': 0, 'likeCount': 1}}
+        bulkUpdateArticles(metrics)
+        bulkUpdateArticles(metrics)
+        self.assertEqual(rollup_rows(), {(self.day, self.user.id, 'twitter'): (1, 9, 1)})
+
+    def test_rebuild_command_recomputes_range(self):
+        create_article('1', self.account.id, datetime(2026, 10, 1, 8), impression_count=3, like_count=1)
+        create_article('2', self.account.id, datetime(2026, 10, 1, 9), impression_count=2)
+        create_article('3', self.account.id, datetime(2026, 10, 2, 9), impression_count=7)
+        create_article('4', 999999, datetime(2026, 10, 2, 9), impression_count=7)
+        ArticleDailyRollup.objects.create(date=date(2026, 10, 2), owner_id=self.user.id, platform='twitter',
+                                          public_count=50)
+        ArticleDailyRollup.objects.create(date=date(2026, 9, 1), owner_id=self.user.id, platform='twitter',
+                                          public_count=5)
+        out = StringIO()
+        call_command('rebuild_article_rollup', start='2026-10-01', stdout=out)
+        self.assertIn('共 2 行', out.getvalue())
+        self.assertEqual(rollup_rows(), {
+            (date(2026, 10, 1), self.user.id, 'twitter'): (2, 5, 1),
+            (date(2026, 10, 2), self.user.id, 'twitter'): (1, 7, 0),
+            (date(2026, 9, 1), self.user.id, 'twitter'): (5, 0, 0),
+        })
+
+
+class StatsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(username='u1', password='p')
+        self.other = get_user_model().objects.create_user(username='u2', password='p')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for owner, day, public_count, impressions in ((self.user, date(2026, 10, 1), 2, 10),
+                                                      (self.user, date(2026, 10, 3), 1, 5),
+                                                      (self.other, date(2026, 10, 1), 9, 90)):
+            ArticleDailyRollup.objects.create(date=day, owner_id=owner.id, platform='twitter',
+                                              public_count=public_count, impression_count=impressions, like_count=1)
+
+    def test_summary_totals_own_rollups_with_rates(self):
+        twitter = self.client.get('/api/stats/summary/').json()['data']['twitter']
+        self.assertEqual((twitter['total_public_count'], twitter['total_impression_count']), (3, 15))
+        self.assertEqual((twitter['exposure_rate'], twitter['like_rate']), (5.0, round(2 / 3, 4)))
+        ranged = self.client.get('/api/stats/summary/', {'start_date': '2026-10-02'}).json()['data']
+        self.assertEqual(ranged['twitter']['total_public_count'], 1)
+
+    def test_detail_fills_missing_days(self):
+        response = self.client.get('/api/stats/detail/', {'platform': 'twitter', 'start_date': '2026-10-01',
+                                                           'end_date': '2026-10-03'})
+        rows = response.json()['data']
+        self.assertEqual([(row['created_date'], row['total_public_count']) for row in rows],
+                         [('2026-10-01', 2), ('2026-10-02', 0), ('2026-10-03', 1)])
+        self.assertEqual(self.client.get('/api/stats/detail/').json()['code'], 400)
+
+
+class StatsResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_then_invalidate_by_owner(self):
+        calls = []
+
+        class View(object):
+            @cached_stats_response('unit')
+            def get(self, request):
+                calls.append(1)
+                return ApiResponse({'n': len(calls)})
+
+        def request(user_id, superuser=False):
+            req = Request(APIRequestFactory().get('/x', {'start_date': '2026-01-01'}))
+            req.user = SimpleNamespace(id=user_id, is_superuser=superuser)
+            return req
+
+        view = View()
+        self.assertEqual(view.get(request(1)).data['data'], {'n': 1})
+        self.assertEqual(view.get(request(1)).data['data'], {'n': 1})
+        self.assertEqual(view.get(request(9, superuser=True)).data['data'], {'n': 2})
+        invalidate_stats_cache([2])
+        self.assertEqual(view.get(request(1)).data['data'], {'n': 1})
+        self.assertEqual(view.get(request(9, superuser=True)).data['data'], {'n': 3})
+        invalidate_stats_cache([1])
+        self.assertEqual(view.get(request(1)).data['data'], {'n': 4})
+        self.assertEqual(get_stats_cache_stats()['views']['unit'], {'hits': 2, 'misses': 4})
+
+
+class StreamExportTests(SimpleTestCase):
+    def test_csv_and_ndjson_are_encoded_per_row(self):
+        rows = [{'id': 1, 'created_at': date(2026, 1, 2), 'text': 'a,b'}, {'id': 2, 'created_at': None}]
+        self.assertEqual(list(iter_csv(iter(rows), ['id', 'text'])), ['id,text\r\n', '1,"a,b"\r\n', '2,\r\n'])
+        lines = list(iter_ndjson(iter(rows)))
+        self.assertEqual(lines[0], '{"id": 1, "created_at": "2026-01-02", "text": "a,b"}\n')
+        self.assertEqual(len(lines), 2)
+
+
+class ExportViewTests(ArticleTableMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='u1', password='p')
+        self.other = get_user_model().objects.create_user(username='u2', password='p')
+        self.admin = get_user_model().objects.create_superuser(username='root', password='p')
+        self.client = APIClient()
+        created_at = datetime(2026, 10, 1, 8)
+        for owner, article_id in ((self.user, '1'), (self.user, '2'), (self.other, '3')):
+            create_article(article_id, create_account(owner).id, created_at)
+
+    def export(self, user, resource='articles', **params):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/api/stats/export/{resource}/', params)
+        return [line for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_users_export_only_their_accounts(self):
+        lines = self.export(self.user)
+        self.assertEqual(lines[0].split(',')[:4], ['id', 'created_at', 'updated_at', 'article_id'])
+        self.assertEqual([line.split(',')[3] for line in lines[1:]], ['1', '2'])
+        # 普通用户传 enterprise_id 无效
+        self.assertEqual(len(self.export(self.user, enterprise_id=self.other.id)), 3)
+
+    def test_superuser_exports_all_or_one_enterprise(self):
+        self.assertEqual(len(self.export(self.admin)), 4)
+        self.assertEqual([line.split(',')[3] for line in self.export(self.admin, enterprise_id=self.other.id)[1:]],
+                         ['3'])
+        self.assertEqual(len(self.export(self.admin, start_date='2026-10-02')), 1)
+
+
+def mock_queries(*groups):
+    """让每组推文各自成为一条评论查询"""
+    queries = [('(' + ' OR '.join(f'conversation_id:{i}' for i in ids) + ') is:reply', None) for ids in groups]
+    return mock.patch('utils.asyncTwitter.buildConversationQueries', return_value=queries)
+
+
+class AsyncTwitterCollectorTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_fetch_bounded_per_app(self):
+        in_flight, peak = {}, {}
+
+        async def handler(request):
+            app = 'a' if 'oauth_consumer_key="a"' in request.headers['Authorization'] else 'b'
+            in_flight[app] = in_flight.get(app, 0) + 1
+            peak[app] = max(peak.get(app, 0), in_flight[app])
+            await asyncio.sleep(0.02)
+            in_flight[app] -= 1
+            if request.url.path == '/2/tweets':
+                ids = request.url.params['ids'].split(',')
+                return httpx.Response(200, json={'data': [
+                    {'id': i, 'text': '', 'created_at': '2026-10-18T00:00:00.000Z',
+                     'public_metrics': {'reply_count': 1, 'like_count': 2}} for i in ids]})
+            conversation = request.url.params['query'].split('conversation_id:')[1].split(' ')[0].rstrip(')')
+            return httpx.Response(200, json={
+                'data': [{'id': '9', 'text': 'hi', 'author_id': '7', 'conversation_id': conversation}],
+                'includes': {'users': [{'id': '7', 'name': 'N', 'username': 'u'}]}})
+
+        jobs = {robot: {'credentials': ('a' if robot < 3 else 'b', 's', f't{robot}', 'ts'),
+                        'tweet_ids': [str(robot * 1000 + i) for i in range(150)]} for robot in range(6)}
+        outcomes = collect_twitter_data(jobs, per_app=2, transport=httpx.MockTransport(handler))
+        self.assertEqual(peak, {'a': 2, 'b': 2})
+        data = outcomes[0]['0']
+        self.assertEqual((data['likeCount'], data['commentCount'], data['createDate'].year), (2, 1, 2026))
+        # 每组评论查询返回一条回复，挂到对应推文下
+        queries = buildConversationQueries(jobs[0]['tweet_ids'])
+        self.assertEqual(sum(len(v['comments']) for v in outcomes[0].values()), len(queries))
+        self.assertEqual(outcomes[0]['0']['comments'][0]['username'], 'u')
+
+    def test_rate_limited_account_is_isolated(self):
+
+        def handler(request):
+            if 'oauth_token="bad"' in request.headers['Authorization']:
+                return httpx.Response(429, headers={'x-rate-limit-reset': str(int(time.time()) + 900)})
+            return httpx.Response(200, json={'data': [{'id': '1', 'text': '', 'public_metrics': {}}]})
+
+        jobs = {1: {'credentials': ('a', 's', 'bad', 'ts'), 'tweet_ids': ['1']},
+                2: {'credentials': ('a', 's', 'good', 'ts'), 'tweet_ids': ['1']}}
+        outcomes = collect_twitter_data(jobs, transport=httpx.MockTransport(handler))
+        self.assertIsInstance(outcomes[1], RateLimitExceeded)
+        self.assertEqual(outcomes[2], {})
+
+    def test_replies_paged_and_search_failure_keeps_metrics(self):
+
+        def handler(request):
+            params = request.url.params
+            if request.url.path == '/2/tweets':
+                return httpx.Response(200, json={'data': [
+                    {'id': i, 'text': '', 'public_metrics': {'reply_count': 2}} for i in params['ids'].split(',')]})
+            if 'conversation_id:2' in params['query']:
+                return httpx.Response(503)
+            reply = {'id': params.get('next_token', '10'), 'text': '', 'author_id': '7', 'conversation_id': '1'}
+            meta = {} if 'next_token' in params else {'next_token': '11'}
+            return httpx.Response(200, json={'data': [reply], 'meta': meta})
+
+        with override_settings(TWITTER_ASYNC_CONCURRENCY_PER_APP=1):
+            with mock_queries(['1'], ['2']):
+                outcome = collect_twitter_data({1: {'credentials': ('a', 's', 't', 'ts'), 'tweet_ids': ['1', '2']}},
+                                               transport=httpx.MockTransport(handler))[1]
+        self.assertEqual([item['id'] for item in outcome['1']['comments']], ['10', '11'])
+        self.assertTrue(outcome['1']['commentsComplete'])
+        self.assertEqual((outcome['2']['commentCount'], outcome['2']['commentsComplete']), (2, False))
+
+
+class ArticleCollectScheduleTests(TestCase):
+    @override_settings(ARTICLE_REFRESH_TICK_MINUTES=7)
+    def test_post_registers_interval_job_in_job_store(self):
+        user = get_user_model().objects.create_user(username='u1', password='p')
+        client = APIClient()
+        client.force_authenticate(user)
+        scheduler = mock.Mock()
+        with mock.patch('stats.views.get_scheduler', return_value=scheduler):
+            self.assertEqual(client.post('/api/tasks/collect-tweets/').json()['data']['status'], 'success')
+        args, kwargs = scheduler.scheduler.add_job.call_args
+        # 以字符串引用任务函数，DjangoJobStore 可持久化，由 run_scheduler 进程执行
+        self.assertEqual(args, ('utils.c_scheduler:collect_recent_articles_data',))
+        self.assertEqual((kwargs['trigger'], kwargs['minutes'], kwargs['id']), ('interval', 7, 'collect_artical_data'))
+        self.assertTrue(kwargs['replace_existing'] and kwargs['coalesce'])
 
-# Create your tests here.
@@ -1,10 +1,12 @@
 from django.urls import path
-from .views import SummaryView, OverviewView, DetailView
+from .views import SummaryView, OverviewView, DetailView, MetricsView, ExportView
 
 urlpatterns = [
     path('summary/', SummaryView.as_view()),
     path('detail/', DetailView.as_view()),
     path('overview/', OverviewView.as_view()),
+    path('metrics/', MetricsView.as_view()),
+    path('export/<str:resource>/', ExportView.as_view()),
 ]
 
 
@@ -1,7 +1,18 @@
-from django.db.models import F
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, Sum, Count
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from datetime import date as _date
-from .models import DailyStat
+from utils.responseCache import invalidate_stats_cache
+from .models import DailyStat, ArticleDailyRollup
+
+
+def _invalidate_on_commit(owner_ids) -> None:
+    """Drop cached stats responses once the surrounding transaction commits (readers never re-cache stale rows)."""
+    owner_ids = list(owner_ids)
+    transaction.on_commit(lambda: invalidate_stats_cache(owner_ids))
 
 
 def record_success_run(owner_id: int | None, provider: str, task_type: str, started_date: _date):
@@ -48,9 +59,93 @@ def record_success_run(owner_id: int | None, provider: str, task_type: str, star
         updates['reply_message_count'] = F('reply_message_count') + 1
 
     DailyStat.objects.filter(pk=obj.pk).update(**updates)
+    _invalidate_on_commit([owner_id])
 
 
 def rebuild_daily_stats(date_start: _date, date_end: _date, owner_id: int | None = None) -> int:
     """Deprecated in simplified mode: no-op, keep for admin compatibility."""
     return 0
-    
\ No newline at end of file
+    
+
+ROLLUP_FIELDS = ('public_count', 'impression_count', 'comment_count', 'message_count', 'like_count', 'click_count')
+
+
+def _owners_of(robot_ids) -> dict:
+    from social.models import PoolAccount
+    return dict(PoolAccount.objects.filter(id__in=set(robot_ids)).values_list('id', 'owner_id'))
+
+
+@transaction.atomic
+def apply_article_deltas(deltas: dict) -> None:
+    """Apply counter deltas to ArticleDailyRollup.
+    - deltas: {(date, robot_id, platform): {field: delta}}, field in ROLLUP_FIELDS
+    - robot_id is resolved to the owning user; articles of deleted accounts are skipped (same as the old live query)
+    """
+    if not deltas:
+        return
+    owners = _owners_of(robot_id for _, robot_id, _ in deltas)
+    merged = defaultdict(lambda: defaultdict(int))
+    for (day, robot_id, platform), values in deltas.items():
+        if robot_id not in owners:
+            continue
+        for field, value in values.items():
+            merged[(day, owners[robot_id], platform)][field] += value
+    for (day, owner_id, platform), values in merged.items():
+        updates = {field: F(field) + value for field, value in values.items() if value}
+        if not updates:
+            continue
+        obj, _ = ArticleDailyRollup.objects.get_or_create(date=day, owner_id=owner_id, platform=platform)
+        ArticleDailyRollup.objects.filter(pk=obj.pk).update(updated_at=timezone.now(), **updates)
+    _invalidate_on_commit(owner_id for _, owner_id, _ in merged)
+
+
+def rollup_article_created(platform: str, robot_id: int, created_date: _date) -> None:
+    """A new article was posted: count it into its day/owner/platform bucket."""
+    apply_article_deltas({(created_date, robot_id, platform): {'public_count': 1}})
+
+
+def aggregate_article_rollup(articles, accounts) -> dict:
+    """Aggregate an article queryset into {(date, owner_id, platform): {field: value}}.
+    - accounts: PoolAccount queryset used to resolve robot_id → owner (historical model in data migrations)
+    """
+    rows = articles.annotate(day=TruncDate('created_at')).values('day', 'robot_id', 'platform').annotate(
+        public_count=Count('id'),
+        impression_count=Sum('impression_count'),
+        comment_count=Sum('comment_count'),
+        message_count=Sum('message_count'),
+        like_count=Sum('like_count'),
+        click_count=Sum('click_count'),
+    )
+    rows = list(rows)
+    owners = dict(accounts.filter(id__in={row['robot_id'] for row in rows}).values_list('id', 'owner_id'))
+    merged = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        if row['robot_id'] not in owners:
+            continue
+        for field in ROLLUP_FIELDS:
+            merged[(row['day'], owners[row['robot_id']], row['platform'])][field] += row[field] or 0
+    return merged
+
+
+@transaction.atomic
+def rebuild_article_rollup(date_start: _date | None = None, date_end: _date | None = None) -> int:
+    """Recompute ArticleDailyRollup from t_article (initial backfill / drift repair). Returns rows written."""
+    from social.models import PoolAccount
+    from tasks.models import TArticle
+    articles = TArticle.objects.all()
+    rollups = ArticleDailyRollup.objects.all()
+    if date_start:
+        articles = articles.filter(created_at__date__gte=date_start)
+        rollups = rollups.filter(date__gte=date_start)
+    if date_end:
+        articles = articles.filter(created_at__date__lte=date_end)
+        rollups = rollups.filter(date__lte=date_end)
+    merged = aggregate_article_rollup(articles, PoolAccount.objects.all())
+    rollups.delete()
+    ArticleDailyRollup.objects.bulk_create(
+        [ArticleDailyRollup(date=day, owner_id=owner_id, platform=platform, **values)
+         for (day, owner_id, platform), values in merged.items()],
+        batch_size=500,
+    )
+    _invalidate_on_commit(owner_id for _, owner_id, _ in merged)
+    return len(merged)
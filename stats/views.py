@@ -1,43 +1,51 @@
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, F, Q
 from drf_spectacular.types import OpenApiTypes
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.interval import IntervalTrigger
-import atexit
-import threading
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from django.conf import settings
 from django.http import HttpResponse
 import csv
 from drf_spectacular.utils import extend_schema
+from ai.router import get_router
+from utils.autoTask import get_scheduler
 from models.models import AuthUser
+from utils.dbConnections import get_db_connection_stats
+from utils.httpSession import get_http_stats
+from utils.responseCache import cached_stats_response, get_stats_cache_stats
+from utils.twitterClientCache import get_twitter_client_stats
+from utils.streamExport import EXPORT_FORMATS, streaming_export
 from utils.utils import logger, ApiResponse
-from .models import DailyStat
+from .models import DailyStat, ArticleDailyRollup
 from .serializers import SummaryResponseSerializer
-from tasks.models import TArticle
+from models.models import TasksSimpletaskrun
+from tasks.models import TArticle, TArticleComments
 from social.models import PoolAccount
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
 
-# 全局调度器实例和锁
-_scheduler_instance = None
-_scheduler_lock = threading.Lock()
+# 日汇总表上的聚合口径，与原 t_article 实时聚合的返回字段一致
+ROLLUP_TOTALS = {
+    'total_impression_count': Sum('impression_count'),
+    'total_comment_count': Sum('comment_count'),
+    'total_message_count': Sum('message_count'),
+    'total_like_count': Sum('like_count'),
+    'total_click_count': Sum('click_count'),
+    'total_public_count': Sum('public_count'),
+}
 
 
-def get_global_scheduler():
-    """
-    获取全局 APScheduler 调度器实例
-    """
-    global _scheduler_instance
-    with _scheduler_lock:
-        if _scheduler_instance is None:
-            _scheduler_instance = BackgroundScheduler()
-            _scheduler_instance.start()
-            # 程序退出时关闭调度器
-            atexit.register(lambda: _scheduler_instance.shutdown() if _scheduler_instance.running else None)
-        return _scheduler_instance
+def owner_rollup_queryset(request):
+    """按当前用户可见范围过滤日汇总：超级管理员看全部（可按 enterprise_id 过滤），其他用户只看自己的账号"""
+    if request.user.is_superuser:
+        queryset = ArticleDailyRollup.objects.all()
+        enterprise_id = request.query_params.get('enterprise_id')
+        if enterprise_id:
+            queryset = queryset.filter(owner_id=enterprise_id)
+        return queryset
+    return ArticleDailyRollup.objects.filter(owner_id=request.user.id)
 
 
 class SummaryView(APIView):
@@ -70,35 +78,25 @@ class SummaryView(APIView):
             )
         ]
     )
+    @cached_stats_response('summary')
     def get(self, request):
-        userId = request.user.id
-        userData = AuthUser.objects.get(id=userId)
-        if userData.is_superuser:
-            robotList = PoolAccount.objects.all()
-            enterprise_id = request.query_params.get('enterprise_id')
-            if enterprise_id:
-                robotList = robotList.filter(owner_id=enterprise_id)
-            robotList = [robot["id"] for robot in robotList.values('id')]
-        else:
-            robotList = PoolAccount.objects.filter(owner_id=userId).values('id')
-            robotList = [robot["id"] for robot in robotList]
         # 获取查询参数中的开始日期
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
-        # 构建查询集
-        article_query = TArticle.objects.filter(robot_id__in=robotList)
+        # 构建查询集（读取日汇总表，不再扫描 t_article）
+        article_query = owner_rollup_queryset(request)
         from datetime import datetime
         # 如果提供了开始日期，则过滤大于等于该日期的数据
         if start_date:
             try:
                 start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                article_query = article_query.filter(created_at__date__gte=start_date_obj)
+                article_query = article_query.filter(date__gte=start_date_obj)
             except ValueError:
                 return ApiResponse({'error': '日期格式错误，请使用 YYYY-MM-DD 格式'}, status=400)
         if end_date:
             try:
                 end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-                article_query = article_query.filter(created_at__date__lte=end_date_obj)
+                article_query = article_query.filter(date__lte=end_date_obj)
             except ValueError as e:
                 logger.error(f"结束日期解析失败: {e}")
                 return ApiResponse(message=f'结束日期格式错误: {str(e)}，请使用 YYYY-MM-DD 格式', status=400)
@@ -108,14 +106,7 @@ class SummaryView(APIView):
 
         # 如果传了日期，按平台分组返回数据
         if start_date or end_date:
-            articleData = article_query.values('platform').annotate(
-                total_impression_count=Sum('impression_count'),
-                total_comment_count=Sum('comment_count'),
-                total_message_count=Sum('message_count'),
-                total_like_count=Sum('like_count'),
-                total_click_count=Sum('click_count'),
-                total_public_count = Count('id')
-            )
+            articleData = article_query.values('platform').annotate(**ROLLUP_TOTALS)
             articleData = {item['platform']: {k: v for k, v in item.items() if k != 'platform'} for item in articleData}
             if not articleData:
                 default_platforms = ['fb', 'ins', 'twitter']
@@ -131,14 +122,7 @@ class SummaryView(APIView):
             return ApiResponse(data=articleData)
         else:
             # 如果未传日期，按平台分组计算所有数据的总和
-            articleData = article_query.values('platform').annotate(
-                total_impression_count=Sum('impression_count'),
-                total_comment_count=Sum('comment_count'),
-                total_message_count=Sum('message_count'),
-                total_like_count=Sum('like_count'),
-                total_click_count=Sum('click_count'),
-                total_public_count=Count('id')
-            )
+            articleData = article_query.values('platform').annotate(**ROLLUP_TOTALS)
             result = {}
             for item in articleData:
                 platform = item['platform']
@@ -213,54 +197,35 @@ class DetailView(APIView):
             ),
         ]
     )
+    @cached_stats_response('detail')
     def get(self, request):
-        userId = request.user.id
-        userData = AuthUser.objects.get(id=userId)
-        if userData.is_superuser:
-            robotList = PoolAccount.objects.all()
-            enterprise_id = request.query_params.get('enterprise_id')
-            if enterprise_id:
-                robotList = robotList.filter(owner_id=enterprise_id)
-            robotList = [robot["id"] for robot in robotList.values('id')]
-        else:
-            robotList = PoolAccount.objects.filter(owner_id=userId).values('id')
-            robotList = [robot["id"] for robot in robotList]
         # 获取查询参数
         platform = request.query_params.get('platform')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         if not platform:
             return ApiResponse({'error': 'platform参数是必需的'}, status=400)
-        # 构建查询集
-        article_query = TArticle.objects.filter(
-            robot_id__in=robotList,
-            platform=platform
-        )
+        # 构建查询集（读取日汇总表，不再扫描 t_article）
+        article_query = owner_rollup_queryset(request).filter(platform=platform)
         from datetime import datetime
+        start_date_obj = end_date_obj = None
         # 处理开始日期
         if start_date:
             try:
                 start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                article_query = article_query.filter(created_at__date__gte=start_date_obj)
+                article_query = article_query.filter(date__gte=start_date_obj)
             except ValueError:
                 return ApiResponse(message=f'开始日期格式错误，请使用 YYYY-MM-DD 格式', status=400)
         # 处理结束日期
         if end_date:
             try:
                 end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-                article_query = article_query.filter(created_at__date__lte=end_date_obj)
+                article_query = article_query.filter(date__lte=end_date_obj)
             except ValueError:
                 return ApiResponse(message=f'结束日期格式错误，请使用 YYYY-MM-DD 格式', status=400)
         # 查询详细数据
-        detail_data = article_query.annotate(
-            created_date=TruncDate('created_at')
-        ).values('created_date').annotate(
-            total_public_count=Count('id'),
-            total_impression_count=Sum('impression_count'),
-            total_comment_count=Sum('comment_count'),
-            total_message_count=Sum('message_count'),
-            total_like_count=Sum('like_count'),
-            total_click_count=Sum('click_count')
+        detail_data = article_query.annotate(created_date=F('date')).values('created_date').annotate(
+            **ROLLUP_TOTALS
         ).order_by('created_date')
 
         result_data = list(detail_data)
@@ -293,9 +258,115 @@ class DetailView(APIView):
         # return ApiResponse(data=list(detail_data))
         return ApiResponse(data=result_data)
 
+class MetricsView(APIView):
+    """运行时指标（仅管理员）"""
+    permission_classes = [IsAuthenticated, IsAdminUser]
+
+    @extend_schema(summary='运行时指标（HTTP/数据库连接、统计缓存命中率、大模型路由等）', tags=['数据统计'], responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        return ApiResponse({
+            'http': get_http_stats(),
+            'stats_cache': get_stats_cache_stats(),
+            'ai_router': get_router().snapshot(),
+            'db': get_db_connection_stats(),
+            'twitter_clients': get_twitter_client_stats(),
+        })
+
+
+def _robot_ids_of(owner_id):
+    return PoolAccount.objects.filter(owner_id=owner_id).values('id')
+
+
+# 可导出资源：模型、日期字段、按所属用户过滤的方式、导出字段
+EXPORT_RESOURCES = {
+    'task_runs': {
+        'model': TasksSimpletaskrun,
+        'date_field': 'created_at',
+        'owner_filter': lambda owner_id: Q(owner_id=owner_id),
+        'fields': ['id', 'created_at', 'task_id', 'account_id', 'owner_id', 'provider', 'type', 'success',
+                   'external_id', 'error_code', 'error_message', 'ai_provider', 'ai_model', 'used_prompt', 'text'],
+    },
+    'articles': {
+        'model': TArticle,
+        'date_field': 'created_at',
+        'owner_filter': lambda owner_id: Q(robot_id__in=_robot_ids_of(owner_id)),
+        'fields': ['id', 'created_at', 'updated_at', 'article_id', 'platform', 'robot_id', 'impression_count',
+                   'comment_count', 'message_count', 'like_count', 'click_count', 'article_text'],
+    },
+    'comments': {
+        'model': TArticleComments,
+        'date_field': 'created_at',
+        'owner_filter': lambda owner_id: Q(article__robot_id__in=_robot_ids_of(owner_id)),
+        'fields': ['id', 'created_at', 'comment_id', 'article__article_id', 'commenter_id', 'commenter_nickname',
+                   'reply_to_id', 'reply_to_nickname', 'content'],
+    },
+    'daily_stats': {
+        'model': DailyStat,
+        'date_field': 'date',
+        'owner_filter': lambda owner_id: Q(owner_id=owner_id),
+        'fields': ['date', 'owner_id', 'account_count', 'ins', 'x', 'fb', 'post_count', 'reply_comment_count',
+                   'reply_message_count', 'total_impressions'],
+    },
+}
+
+
+class ExportView(APIView):
+    """流式导出（CSV / NDJSON），按日期范围与所属用户过滤，内存占用恒定"""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        summary='流式导出运行记录/文章/评论/日统计',
+        tags=['数据统计'],
+        responses={(200, 'text/csv'): OpenApiTypes.STR, (200, 'application/x-ndjson'): OpenApiTypes.STR},
+        parameters=[
+            OpenApiParameter(name='resource', type=OpenApiTypes.STR, location=OpenApiParameter.PATH,
+                             description='task_runs / articles / comments / daily_stats'),
+            OpenApiParameter(name='export_format', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                             description='csv（默认） / ndjson', required=False),
+            OpenApiParameter(name='start_date', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='开始日期 (格式: YYYY-MM-DD)', required=False),
+            OpenApiParameter(name='end_date', type=OpenApiTypes.DATE, location=OpenApiParameter.QUERY,
+                             description='结束日期 (格式: YYYY-MM-DD)', required=False),
+            OpenApiParameter(name='enterprise_id', type=OpenApiTypes.INT, location=OpenApiParameter.QUERY,
+                             description='企业用户ID，仅超级管理员可使用此参数导出指定企业的数据', required=False),
+        ]
+    )
+    def get(self, request, resource):
+        config = EXPORT_RESOURCES.get(resource)
+        if config is None:
+            return ApiResponse(message=f'不支持的导出类型: {resource}', status=400)
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return ApiResponse(message=f'不支持的导出格式: {export_format}', status=400)
+        from datetime import datetime
+        date_field = config['date_field']
+        queryset = config['model'].objects.all()
+        try:
+            start_date = request.query_params.get('start_date')
+            end_date = request.query_params.get('end_date')
+            # 使用半开区间，保证日期字段上的索引可用
+            if start_date:
+                queryset = queryset.filter(**{f'{date_field}__gte': datetime.strptime(start_date, '%Y-%m-%d').date()})
+            if end_date:
+                end = datetime.strptime(end_date, '%Y-%m-%d').date() + timedelta(days=1)
+                queryset = queryset.filter(**{f'{date_field}__lt': end})
+        except ValueError:
+            return ApiResponse(message='日期格式错误，请使用 YYYY-MM-DD 格式', status=400)
+        if request.user.is_superuser:
+            enterprise_id = request.query_params.get('enterprise_id')
+            if enterprise_id:
+                queryset = queryset.filter(config['owner_filter'](enterprise_id))
+        else:
+            queryset = queryset.filter(config['owner_filter'](request.user.id))
+        queryset = queryset.order_by(date_field, 'id')
+        return streaming_export(queryset, config['fields'], f'{resource}', export_format,
+                                chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000))
+
+
 class OverviewView(APIView):
     permission_classes = [IsAuthenticated]
     @extend_schema(summary='昨日统计明细（当前用户，单日一行）', tags=['数据统计'])
+    @cached_stats_response('overview', superuser_all=False)
     def get(self, request):
         if not (request.user and request.user.is_authenticated):
             return ApiResponse({'results': []})
@@ -329,7 +400,7 @@ from django.utils import timezone
 from datetime import timedelta
 
 # 修改 stats/views.py 中的 CollectArticalView 类
-from utils.c_scheduler import collect_recent_articles_data
+from utils.c_scheduler import collect_recent_articles_data, schedule_article_collect
 
 
 class CollectArticalView(APIView):
@@ -339,7 +410,7 @@ class CollectArticalView(APIView):
     permission_classes = [IsAuthenticated]
     @extend_schema(
         summary='手动触发推文数据收集',
-        description='立即执行一次推文和评论数据的收集任务',
+        description='立即执行一次推文和评论数据的收集任务（默认只刷新到期推文，force=1 时全部刷新）',
         tags=['数据统计'],
         responses={
             200: OpenApiTypes.OBJECT,
@@ -351,7 +422,8 @@ class CollectArticalView(APIView):
         手动触发收集任务
         """
         try:
-            results = collect_recent_articles_data()
+            force = request.query_params.get('force') in ('1', 'true')
+            results = collect_recent_articles_data(force=force)
             return ApiResponse({'status': 'success', 'message': '数据收集完成', 'results': results})
         except Exception as e:
             logger.error(f"收集推文数据失败: {e}")
@@ -359,7 +431,7 @@ class CollectArticalView(APIView):
 
     @extend_schema(
         summary='设置定时收集任务',
-        description='启动定时任务，每6小时自动收集推文和评论数据',
+        description='启动定时任务，按 ARTICLE_REFRESH_TICK_MINUTES 间隔增量收集到期推文的数据和评论',
         tags=['数据统计'],
         responses={
             200: OpenApiTypes.OBJECT,
@@ -368,26 +440,14 @@ class CollectArticalView(APIView):
     )
     def post(self, request):
         """
-        启动定时任务（每6小时执行一次）
+        启动定时任务（每 ARTICLE_REFRESH_TICK_MINUTES 分钟检查一次，只采集到期推文）
+        任务写入 DjangoJobStore（同名任务直接替换），由 run_scheduler 进程执行
         """
         try:
-            scheduler = get_global_scheduler()
-            # 移除已存在的同名任务
-            try:
-                scheduler.remove_job('collect_artical_data')
-            except:
-                pass  # 如果任务不存在则忽略
-            # 添加新的定时任务
-            scheduler.add_job(
-                func=collect_recent_articles_data,
-                trigger=IntervalTrigger(hours=6),
-                id='collect_artical_data',
-                name='Collect Artical Data Every 6 Hours',
-                replace_existing=True,
-            )
+            schedule_article_collect(get_scheduler())
             return ApiResponse({
                 'status': 'success',
-                'message': '定时任务已启动，将每6小时执行一次数据收集'
+                'message': f'定时任务已启动，将每{settings.ARTICLE_REFRESH_TICK_MINUTES}分钟增量收集一次数据'
             })
         except Exception as e:
             logger.error(f"设置定时任务失败: {e}")
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django import forms
+from django_apscheduler.models import DjangoJob, DjangoJobExecution
 from .models import SimpleTask, SimpleTaskRun
 
 
@@ -85,3 +86,14 @@ class SimpleTaskAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(DjangoJob)
+class DjangoJobAdmin(admin.ModelAdmin):
+    # 只查看调度作业；django_apscheduler 自带的“立即执行”会在 web 进程内临时启动调度器，不再提供
+    list_display = ('id', 'next_run_time')
+    search_fields = ('id',)
+
+
+@admin.register(DjangoJobExecution)
+class DjangoJobExecutionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job', 'status', 'run_time', 'duration')
+    list_filter = ('job__id', 'run_time', 'status')
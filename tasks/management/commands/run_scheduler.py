@@ -0,0 +1,50 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.autoTask import get_scheduler, register_system_jobs
+from utils.schedulerLeader import SchedulerLeaderLock
+
+
+class Command(BaseCommand):
+    help = '启动定时任务调度进程：web 进程只写入任务定义，由本进程（多副本时仅主节点）触发执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='只进行一轮选举/检查后退出')
+        parser.add_argument('--poll', type=float, default=None, help='选举与任务存储轮询间隔（秒）')
+
+    def handle(self, *args, **options):
+        if getattr(settings, 'SCHEDULER_RUN_IN_PROCESS', False):
+            raise CommandError('SCHEDULER_RUN_IN_PROCESS=1 时各进程自行执行任务，无需启动调度进程')
+        scheduler = get_scheduler()
+        poll = options['poll'] or settings.SCHEDULER_POLL_SECONDS
+        lock = SchedulerLeaderLock(settings.SCHEDULER_LOCK_KEY)
+        leader = False
+        self.stdout.write('调度进程已启动')
+        try:
+            while True:
+                if not leader:
+                    leader = lock.acquire()
+                    if leader:
+                        self.stdout.write('已成为调度主节点，开始执行任务')
+                        register_system_jobs(scheduler)
+                        scheduler.resume_execution()
+                elif not lock.is_held():
+                    self.stdout.write('已失去调度主节点身份，暂停执行任务')
+                    scheduler.pause_execution()
+                    leader = False
+                if leader:
+                    # web 进程新增/修改的任务只写入了数据库，唤醒调度器重新计算下次触发时间
+                    scheduler.scheduler.wakeup()
+                if options['once']:
+                    break
+                time.sleep(poll)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if leader:
+                scheduler.pause_execution()
+            lock.release()
+            scheduler.shutdown()
+            self.stdout.write('调度进程已退出')
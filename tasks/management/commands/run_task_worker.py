@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from utils.taskQueue import recover_jobs, run_worker
+
+
+class Command(BaseCommand):
+    help = '启动任务执行 worker：从队列中取出 run 接口提交的作业并执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='处理完当前队列后退出')
+        parser.add_argument('--timeout', type=float, default=5.0, help='单次取作业等待秒数')
+
+    def handle(self, *args, **options):
+        recover_jobs()
+        self.stdout.write('任务 worker 已启动')
+        executed = run_worker(once=options['once'], timeout=options['timeout'])
+        self.stdout.write(f'共执行 {executed} 个作业')
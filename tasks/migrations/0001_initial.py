@@ -0,0 +1,121 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:38
+"""
+tasks 应用的初始表结构（此前未纳入迁移管理）。
+
+已有数据库中这些表已经存在：首次部署本迁移时执行 `python manage.py migrate --fake-initial`，
+Django 检测到表已存在会把 0001 记为已执行，后续迁移（作业表等）正常执行。新库直接 migrate 即可。
+"""
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('prompts', '0001_initial'),
+        ('social', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TArticle',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('platform', models.CharField(max_length=100)),
+                ('impression_count', models.IntegerField()),
+                ('comment_count', models.IntegerField()),
+                ('message_count', models.IntegerField()),
+                ('like_count', models.IntegerField()),
+                ('click_count', models.IntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('article_id', models.CharField(max_length=50, unique=True)),
+                ('article_text', models.TextField()),
+                ('robot_id', models.IntegerField()),
+            ],
+            options={
+                'db_table': 't_article',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TArticleComments',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('comment_id', models.CharField(max_length=50, unique=True)),
+                ('content', models.TextField()),
+                ('commenter_id', models.CharField(max_length=50)),
+                ('commenter_nickname', models.CharField(max_length=100)),
+                ('reply_to_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('reply_to_nickname', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 't_article_comments',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SimpleTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('post', '发帖'), ('reply_comment', '回复评论')], max_length=32)),
+                ('provider', models.CharField(choices=[('twitter', 'Twitter'), ('facebook', 'Facebook')], max_length=32)),
+                ('language', models.CharField(choices=[('auto', 'Auto'), ('zh', 'Chinese'), ('en', 'English'), ('ja', 'Japanese'), ('ko', 'Korean'), ('es', 'Spanish'), ('fr', 'French'), ('de', 'German')], default='auto', help_text='AI 生成文案语言', max_length=8)),
+                ('text', models.TextField(blank=True)),
+                ('mentions', models.JSONField(default=list, help_text='可@的人用户名/ID 列表')),
+                ('tags', models.JSONField(default=list, help_text='最多 5 个话题标签（字符串，不含#）')),
+                ('payload', models.JSONField(default=dict, help_text='平台相关附加参数，如 comment_id 等')),
+                ('last_status', models.CharField(default='new', help_text='new/success/partial/error', max_length=16)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_success', models.BooleanField(default=False, help_text='上次执行是否全部成功')),
+                ('last_failed', models.BooleanField(default=False, help_text='上次执行是否存在失败')),
+                ('task_remark', models.CharField(blank=True, help_text='备注信息', max_length=255)),
+                ('last_text', models.TextField(blank=True, help_text='上次实际发送的最终文案（含 tags/mentions）')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('select_status', models.BooleanField()),
+                ('task_timing_type', models.CharField(help_text='定时任务类型', max_length=30)),
+                ('exec_status', models.CharField(help_text='任务状态', max_length=30)),
+                ('exec_id', models.CharField(help_text='定时任务id', max_length=255)),
+                ('exec_nums', models.IntegerField(default=0, help_text='执行次数')),
+                ('exec_datetime', models.DateTimeField(blank=True, help_text='执行时间', null=True)),
+                ('exec_prom_text', models.BooleanField(default=False, help_text='使用prompt生成文案')),
+                ('exec_type', models.CharField(help_text='任务执行类型', max_length=30)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simple_tasks', to=settings.AUTH_USER_MODEL)),
+                ('prompt', models.ForeignKey(blank=True, help_text='执行所用提示词（系统内容）', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tasks', to='prompts.promptconfig')),
+                ('selected_accounts', models.ManyToManyField(blank=True, related_name='simple_tasks', to='social.poolaccount')),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SimpleTaskRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('twitter', 'Twitter'), ('facebook', 'Facebook')], max_length=32)),
+                ('type', models.CharField(choices=[('post', '发帖'), ('reply_comment', '回复评论')], max_length=32)),
+                ('text', models.TextField(help_text='本次实际发送文案（含 tags/mentions）')),
+                ('used_prompt', models.CharField(blank=True, max_length=200)),
+                ('ai_model', models.CharField(blank=True, max_length=100)),
+                ('ai_provider', models.CharField(blank=True, max_length=50)),
+                ('success', models.BooleanField(default=False)),
+                ('external_id', models.CharField(blank=True, help_text='平台返回的对象ID，如 tweet_id 或 post_id', max_length=100)),
+                ('error_code', models.CharField(blank=True, max_length=64)),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('account', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='task_runs', to='social.poolaccount')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simple_task_runs', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='tasks.simpletask')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
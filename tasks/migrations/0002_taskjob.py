@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 11:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('queued', '排队中'), ('running', '执行中'), ('success', '全部成功'), ('partial', '部分成功'), ('error', '失败')], default='queued', max_length=16)),
+                ('account_ids', models.JSONField(default=list, help_text='本次执行的账号ID列表')),
+                ('total', models.IntegerField(default=0, help_text='账号总数')),
+                ('ok_count', models.IntegerField(default=0)),
+                ('err_count', models.IntegerField(default=0)),
+                ('progress', models.JSONField(default=dict, help_text='每账号执行结果 {account_id: {ok, error}}')),
+                ('error_message', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_jobs', to=settings.AUTH_USER_MODEL)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='tasks.simpletask')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='taskjob',
+            index=models.Index(fields=['status', 'created_at'], name='tasks_taskj_status_ef10ce_idx'),
+        ),
+        migrations.AddField(
+            model_name='simpletaskrun',
+            name='job',
+            field=models.ForeignKey(blank=True, help_text='所属执行作业（经 run 接口入队执行时记录）', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='runs', to='tasks.taskjob'),
+        ),
+    ]
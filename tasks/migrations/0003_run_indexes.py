@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:00
+"""
+运行记录表（tasks_simpletaskrun）上的 owner / task + 时间索引，定义见 SimpleTaskRun.Meta.indexes。
+
+迁移状态按 AddIndex 记录；数据库侧使用 IF NOT EXISTS，兼容已手动建过同名索引的库。
+PostgreSQL 上使用 CONCURRENTLY 避免锁表，需在事务外执行（atomic = False）。
+"""
+from django.db import migrations, models
+
+INDEXES = [
+    models.Index(fields=['owner', 'created_at'], name='run_owner_created_idx'),
+    models.Index(fields=['task', 'created_at'], name='run_task_created_idx'),
+]
+
+
+def _columns(apps, index) -> str:
+    model = apps.get_model('tasks', 'SimpleTaskRun')
+    return ', '.join(model._meta.get_field(field).column for field in index.fields)
+
+
+def create_indexes(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    for index in INDEXES:
+        schema_editor.execute(f'CREATE INDEX {concurrently}IF NOT EXISTS {index.name} '
+                              f'ON tasks_simpletaskrun ({_columns(apps, index)})')
+
+
+def drop_indexes(apps, schema_editor):
+    concurrently = 'CONCURRENTLY ' if schema_editor.connection.vendor == 'postgresql' else ''
+    for index in INDEXES:
+        schema_editor.execute(f'DROP INDEX {concurrently}IF EXISTS {index.name}')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0002_taskjob'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[migrations.AddIndex(model_name='simpletaskrun', index=index) for index in INDEXES],
+            database_operations=[migrations.RunPython(create_indexes, drop_indexes)],
+        ),
+    ]
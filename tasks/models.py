@@ -1,3 +1,5 @@
+import uuid
+
 from django.utils import timezone
 from django.conf import settings
 from django.db import models
@@ -93,14 +95,54 @@ class SimpleTaskRun(models.Model):
     error_message = models.TextField(blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    job = models.ForeignKey('TaskJob', on_delete=models.SET_NULL, null=True, blank=True, related_name='runs',
+                            help_text='所属执行作业（经 run 接口入队执行时记录）')
 
     class Meta:
         ordering = ['-created_at']
+        # 由 tasks/migrations/0003_run_indexes、0004_run_task_success_index 创建
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='run_owner_created_idx'),
+            models.Index(fields=['task', 'created_at'], name='run_task_created_idx'),
+            models.Index(fields=['task', 'success', 'created_at'], name='run_task_success_created_idx'),
+        ]
 
     def __str__(self) -> str:
         return f"Run(task={self.task_id}, provider={self.provider}, success={self.success})"
 
 
+class TaskJob(models.Model):
+    """任务执行作业：run 接口只负责入队，由独立 worker 进程执行并回写每账号进度。"""
+    STATUS_CHOICES = [
+        ('queued', '排队中'),
+        ('running', '执行中'),
+        ('success', '全部成功'),
+        ('partial', '部分成功'),
+        ('error', '失败'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(SimpleTask, on_delete=models.CASCADE, related_name='jobs')
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='task_jobs')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='queued')
+    account_ids = models.JSONField(default=list, help_text='本次执行的账号ID列表')
+    total = models.IntegerField(default=0, help_text='账号总数')
+    ok_count = models.IntegerField(default=0)
+    err_count = models.IntegerField(default=0)
+    progress = models.JSONField(default=dict, help_text='每账号执行结果 {account_id: {ok, error}}')
+    error_message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self) -> str:
+        return f"Job({self.id}, task={self.task_id}, status={self.status})"
+
+
 class TArticle(models.Model):
     id = models.BigAutoField(primary_key=True)
     platform = models.CharField(max_length=100)
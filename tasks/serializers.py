@@ -1,8 +1,8 @@
 from rest_framework import serializers
 from django.db.models import Q
-from utils.autoTask import scheduler
 from utils.utils import logger
-from .models import SimpleTask, SimpleTaskRun
+from utils.copyBuffer import invalidate_copy_buffer, schedule_copy_buffer_fill
+from .models import SimpleTask, SimpleTaskRun, TaskJob
 from social.models import PoolAccount
 from prompts.models import PromptConfig
 from models.models import SocialPoolaccount, TasksSimpletaskrun, TasksSimpletask, TasksSimpletaskSelectedAccounts, \
@@ -160,7 +160,8 @@ class SimpleTaskSerializer(serializers.ModelSerializer):
         accounts_data = [item["id"] for item in datas]
         if task_timing_type == "timing":
             from utils.runTimingTask import run_timing_task
-            from utils.autoTask import scheduler
+            from utils.autoTask import get_scheduler
+            scheduler = get_scheduler()
             try:
                 job_id = ''
                 if exec_type not in 'fixed':
@@ -195,6 +196,8 @@ class SimpleTaskSerializer(serializers.ModelSerializer):
             # 即时任务先保存再 调用启动
             print("1")
         obj.selected_accounts.set(accounts_data)
+        if task_timing_type == "timing":
+            schedule_copy_buffer_fill(obj.id)
         return obj
 
 
@@ -222,6 +225,8 @@ class SimpleTaskSerializer(serializers.ModelSerializer):
             datas = datas.filter(~Q(id__in=accounts_list))
             accounts_data = [{"id": item["id"], "name": item["name"]} for item in datas]
         obj = super().update(instance, validated_data)
+        # 文案/提示词可能已变化，丢弃旧的预生成文案
+        invalidate_copy_buffer(obj.id)
 
         # 正确处理 selected_accounts 关联
         if accounts_data is not None:
@@ -253,7 +258,8 @@ class SimpleTaskSerializer(serializers.ModelSerializer):
         task_timing_type = validated_data['task_timing_type']
         if task_timing_type == "timing":
             from utils.runTimingTask import run_timing_task
-            from utils.autoTask import scheduler
+            from utils.autoTask import get_scheduler
+            scheduler = get_scheduler()
             try:
                 job_id = ''
                 if exec_type not in 'fixed':
@@ -283,6 +289,7 @@ class SimpleTaskSerializer(serializers.ModelSerializer):
             except Exception as e:
                 # 处理定时任务调度异常
                 pass
+            schedule_copy_buffer_fill(obj.id)
         else:
             # 即时任务先保存再 调用启动
             print("1")
@@ -332,3 +339,19 @@ class SimpleTaskRunDetailSerializer(serializers.ModelSerializer):
                   'text', 'owner_id', 'task_id', 'used_prompt',
                   'ai_model', 'ai_provider', 'external_id', 'error_code', 'error_message', 'created_at', 'account',
                   'owner']
+
+
+class TaskJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.ReadOnlyField(source='id')
+    runs = serializers.SerializerMethodField()
+
+    def get_runs(self, obj):
+        # 本次作业写入的执行明细（每账号一条，按作业ID关联，同一任务的并发作业互不混淆）
+        qs = TasksSimpletaskrun.objects.filter(job_id=obj.id)
+        return list(qs.order_by('id').values('id', 'account_id', 'success', 'external_id', 'error_message',
+                                              'created_at'))
+
+    class Meta:
+        model = TaskJob
+        fields = ['job_id', 'task', 'status', 'account_ids', 'total', 'ok_count', 'err_count', 'progress',
+                  'error_message', 'created_at', 'started_at', 'finished_at', 'runs']
@@ -0,0 +1,312 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.test import APIClient
+
+from social.models import PoolAccount
+from utils import dbConnections, taskQueue
+from utils.utils import CustomPagination
+from .models import SimpleTask, SimpleTaskRun, TaskJob
+
+
+class LocalQueueBackendTests(SimpleTestCase):
+    def test_fifo_and_timeout(self):
+        backend = taskQueue.LocalQueueBackend()
+        backend.push('a')
+        backend.push('b')
+        self.assertEqual(backend.pop(0.01), 'a')
+        self.assertEqual(backend.pop(0.01), 'b')
+        self.assertIsNone(backend.pop(0.01))
+
+    def test_backend_must_implement_push_and_pop(self):
+        class Incomplete(taskQueue.BaseQueueBackend):
+            def push(self, job_id):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+
+def create_task(owner, **kwargs):
+    data = dict(owner=owner, type='post', provider='twitter', select_status=False, task_timing_type='',
+                exec_status='', exec_id='', exec_type='')
+    data.update(kwargs)
+    return SimpleTask.objects.create(**data)
+
+
+class TaskJobTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='owner', password='p')
+        self.task = create_task(self.user)
+        self.accounts = [PoolAccount.objects.create(provider='twitter', name=f'a{i}', owner=self.user,
+                                                    status='inactive') for i in range(3)]
+        self.account_ids = [account.id for account in self.accounts]
+
+    def test_claim_job_only_once(self):
+        job = taskQueue.enqueue_task_job(self.task, self.account_ids)
+        self.assertEqual((job.status, job.total), ('queued', 3))
+        claimed = taskQueue.claim_job(str(job.id))
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNotNone(claimed.started_at)
+        self.assertIsNone(taskQueue.claim_job(str(job.id)))
+
+    def test_execute_job_records_progress_and_counts(self):
+        job = taskQueue.enqueue_task_job(self.task, self.account_ids)
+        job = taskQueue.claim_job(str(job.id))
+        seen = {}
+
+        def run(task, accounts, on_result=None, job_id=None):
+            accounts = list(accounts)
+            seen.update(job_id=job_id, statuses={account.status for account in accounts})
+            results = [{'account_id': account.id, 'ok': account.id != self.account_ids[-1],
+                        'error': None if account.id != self.account_ids[-1] else 'boom'} for account in accounts]
+            for result in results:
+                on_result(result)
+            return {'ok': 2, 'error': 1, 'results': results}
+
+        with mock.patch('utils.runTimingTask.run_task_for_accounts', side_effect=run):
+            taskQueue.execute_job(job)
+        job.refresh_from_db()
+        self.assertEqual(seen, {'job_id': job.id, 'statuses': {'active'}})
+        self.assertEqual((job.status, job.ok_count, job.err_count), ('partial', 2, 1))
+        self.assertEqual(job.progress[str(self.account_ids[-1])], {'ok': False, 'error': 'boom'})
+        self.assertIsNotNone(job.finished_at)
+        # 执行结束后账号恢复为未激活
+        self.assertEqual(set(PoolAccount.objects.values_list('status', flat=True)), {'inactive'})
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.last_status, 'partial')
+
+    def test_execute_job_failure_marks_error(self):
+        job = taskQueue.claim_job(str(taskQueue.enqueue_task_job(self.task, self.account_ids).id))
+        with mock.patch('utils.runTimingTask.run_task_for_accounts', side_effect=RuntimeError('down')):
+            taskQueue.execute_job(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error_message), ('error', 'down'))
+
+    def test_recover_marks_only_stale_running_jobs(self):
+        stale = TaskJob.objects.create(task=self.task, owner=self.user, status='running',
+                                       started_at=timezone.now() - timedelta(hours=2))
+        fresh = TaskJob.objects.create(task=self.task, owner=self.user, status='running', started_at=timezone.now())
+        queued = TaskJob.objects.create(task=self.task, owner=self.user)
+        taskQueue.recover_jobs()
+        statuses = dict(TaskJob.objects.values_list('id', 'status'))
+        self.assertEqual((statuses[stale.id], statuses[fresh.id], statuses[queued.id]), ('error', 'running', 'queued'))
+
+
+class TaskJobStatusViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='owner', password='p')
+        self.other = get_user_model().objects.create_user(username='other', password='p')
+        self.task = create_task(self.user)
+        self.account = PoolAccount.objects.create(provider='twitter', name='a', owner=self.user)
+        self.client = APIClient()
+
+    def _url(self, job):
+        return f'/api/tasks/simple/jobs/{job.id}/'
+
+    def test_runs_belong_to_their_job_only(self):
+        now = timezone.now()
+        job = TaskJob.objects.create(task=self.task, owner=self.user, status='running', started_at=now,
+                                     account_ids=[self.account.id], total=1)
+        overlapping = TaskJob.objects.create(task=self.task, owner=self.user, status='running', started_at=now,
+                                             account_ids=[self.account.id], total=1)
+        for item in (job, overlapping):
+            SimpleTaskRun.objects.create(task=self.task, owner=self.user, provider='twitter', type='post', text='t',
+                                         account=self.account, job=item, external_id=str(item.id))
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self._url(job))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['job_id'], job.id)
+        self.assertEqual([run['external_id'] for run in response.data['runs']], [str(job.id)])
+
+    def test_other_users_job_is_not_found(self):
+        job = TaskJob.objects.create(task=self.task, owner=self.user)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self._url(job)).status_code, 404)
+
+
+class KeysetPaginationTests(SimpleTestCase):
+    def test_cursor_round_trip_and_invalid_cursor(self):
+        value = datetime(2026, 10, 18, 12, 30, 5, 123)
+        cursor = CustomPagination.encode_cursor(value, 42)
+        self.assertEqual(CustomPagination.decode_cursor(cursor), (value, 42))
+        with self.assertRaises(NotFound):
+            CustomPagination.decode_cursor('not-a-cursor')
+
+
+class TaskRunCursorPaginationViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='owner', password='p')
+        other = get_user_model().objects.create_user(username='other', password='p')
+        self.task = task = create_task(self.user)
+        self.runs = [SimpleTaskRun.objects.create(task=task, owner=self.user, provider='twitter', type='post',
+                                                  text=f'run{i}') for i in range(5)]
+        SimpleTaskRun.objects.create(task=create_task(other), owner=other, provider='twitter', type='post', text='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def page(self, **params):
+        params = dict(simpletask_id=self.task.id, paginationMode='cursor', pageSize=2, **params)
+        return self.client.get('/api/tasks/log_detail/', params).json()['data']
+
+    def test_cursor_pages_newest_first_and_counts_on_request(self):
+        first = self.page(withTotal=1)
+        self.assertEqual(first['pagination']['total'], 5)
+        self.assertTrue(first['pagination']['has_next'])
+        seen = [row['id'] for row in first['results']]
+        cursor = first['pagination']['next_cursor']
+        while cursor:
+            data = self.page(cursor=cursor)
+            self.assertIsNone(data['pagination']['total'])
+            seen += [row['id'] for row in data['results']]
+            cursor = data['pagination']['next_cursor']
+        self.assertEqual(seen, [run.id for run in reversed(self.runs)])
+
+
+class TaskLogListViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='owner', password='p')
+        other = get_user_model().objects.create_user(username='other', password='p')
+        self.old, self.new, idle = create_task(self.user), create_task(self.user), create_task(self.user)
+        # 最近运行的任务反而创建得最早，区分按运行时间与按创建时间排序
+        for task, created_at in ((self.new, datetime(2026, 9, 1)), (self.old, datetime(2026, 9, 2))):
+            SimpleTask.objects.filter(pk=task.pk).update(created_at=created_at)
+        for task, owner, created_at in ((self.old, self.user, datetime(2026, 10, 1, 8)),
+                                        (self.old, self.user, datetime(2026, 10, 2, 8)),
+                                        (self.new, self.user, datetime(2026, 10, 5, 8)),
+                                        (create_task(other), other, datetime(2026, 10, 5, 8))):
+            run = SimpleTaskRun.objects.create(task=task, owner=owner, provider='twitter', type='post', text='')
+            SimpleTaskRun.objects.filter(pk=run.pk).update(created_at=created_at)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, **params):
+        return [row['id'] for row in self.client.get('/api/tasks/task_log/', params).json()['data']['results']]
+
+    def test_lists_own_tasks_with_runs_in_range(self):
+        # 默认按最近运行时间倒序，而不是按任务创建时间
+        self.assertEqual(self.ids(), [self.new.id, self.old.id])
+        self.assertEqual(self.ids(ordering='latest_run_time'), [self.old.id, self.new.id])
+        self.assertEqual(self.ids(ordering='-latest_run_time'), [self.new.id, self.old.id])
+        self.assertEqual(self.ids(start_date='2026-10-03'), [self.new.id])
+        self.assertEqual(self.ids(end_date='2026-10-01'), [self.old.id])
+
+
+class DbConnectionScopeTests(SimpleTestCase):
+    def test_scope_cleans_up_connections(self):
+
+        @dbConnections.db_connection_scope(persistent=False)
+        def short_lived():
+            raise ValueError('boom')
+
+        @dbConnections.db_connection_scope
+        def long_lived():
+            return 1
+
+        with mock.patch.object(dbConnections, 'close_old_connections') as close_old, \
+                mock.patch.object(dbConnections.connections, 'close_all') as close_all:
+            with self.assertRaises(ValueError):
+                short_lived()
+            self.assertEqual((close_old.call_count, close_all.call_count), (1, 1))
+            self.assertEqual(long_lived(), 1)
+            self.assertEqual((close_old.call_count, close_all.call_count), (3, 1))
+        stats = dbConnections.get_db_connection_stats()
+        self.assertGreaterEqual(stats['scope_errors'], 1)
+        self.assertIn(stats['mode'], ('persistent', 'pool', 'pgbouncer'))
+
+
+class RunSchedulerCommandTests(SimpleTestCase):
+    def run_command(self, acquired, held, rounds):
+        """按给定的选举结果运行 run_scheduler，第 rounds 次等待时模拟 Ctrl+C 退出"""
+        scheduler = mock.Mock()
+        lock = mock.Mock(**{'acquire.side_effect': acquired, 'is_held.side_effect': held})
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) >= rounds:
+                raise KeyboardInterrupt
+
+        command = 'tasks.management.commands.run_scheduler'
+        with mock.patch(f'{command}.get_scheduler', return_value=scheduler), \
+                mock.patch(f'{command}.SchedulerLeaderLock', return_value=lock), \
+                mock.patch(f'{command}.register_system_jobs') as register, \
+                mock.patch(f'{command}.time.sleep', side_effect=sleep):
+            call_command('run_scheduler', poll=0.01, stdout=StringIO())
+        return scheduler, lock, register
+
+    def test_leader_runs_jobs_then_pauses_when_lock_is_lost(self):
+        scheduler, lock, register = self.run_command(acquired=[True, False], held=[False], rounds=3)
+        register.assert_called_once_with(scheduler)
+        scheduler.resume_execution.assert_called_once_with()
+        scheduler.scheduler.wakeup.assert_called_once_with()
+        scheduler.pause_execution.assert_called_once_with()
+        lock.release.assert_called_once_with()
+        scheduler.shutdown.assert_called_once_with()
+
+    def test_standby_never_executes_and_leader_pauses_on_exit(self):
+        scheduler, _, register = self.run_command(acquired=[False, False], held=[], rounds=2)
+        register.assert_not_called()
+        scheduler.resume_execution.assert_not_called()
+        scheduler.pause_execution.assert_not_called()
+        scheduler, _, _ = self.run_command(acquired=[True], held=[True], rounds=2)
+        self.assertEqual(scheduler.scheduler.wakeup.call_count, 2)
+        scheduler.pause_execution.assert_called_once_with()
+
+    @override_settings(SCHEDULER_RUN_IN_PROCESS=True)
+    def test_refuses_to_start_when_jobs_run_in_process(self):
+        with self.assertRaises(CommandError):
+            call_command('run_scheduler', once=True, stdout=StringIO())
+
+
+class InProcessSchedulerStartupTests(SimpleTestCase):
+    def ready(self, *argv, run_main=None):
+        from django.apps import apps
+        environ = {'RUN_MAIN': run_main} if run_main else {}
+        with mock.patch('utils.autoTask.get_scheduler') as get_scheduler, \
+                mock.patch('sys.argv', list(argv)), mock.patch.dict('os.environ', environ):
+            apps.get_app_config('tasks').ready()
+        return get_scheduler.called
+
+    @override_settings(SCHEDULER_RUN_IN_PROCESS=True)
+    def test_started_by_app_ready_in_serving_processes(self):
+        self.assertTrue(self.ready('/usr/local/bin/gunicorn', '-c', 'gunicorn.conf.py'))
+        self.assertTrue(self.ready('manage.py', 'runserver', run_main='true'))
+        # 自动重载的监视进程与其它管理命令不启动
+        self.assertFalse(self.ready('manage.py', 'runserver'))
+        self.assertFalse(self.ready('manage.py', 'migrate'))
+
+    def test_not_started_when_run_by_scheduler_process(self):
+        self.assertFalse(self.ready('/usr/local/bin/gunicorn', '-c', 'gunicorn.conf.py'))
+
+
+
+class CopyBufferRefillScheduleTests(TestCase):
+    def setUp(self):
+        from django_apscheduler.models import DjangoJob
+        user = get_user_model().objects.create_user(username='owner', password='p')
+        now = timezone.now()
+        self.tasks = {}
+        for name, next_run in (('soon', now + timedelta(hours=1)), ('daily', now + timedelta(hours=20)),
+                               ('paused_job', None)):
+            task = create_task(user, task_timing_type='timing', exec_id=f'mission_daily_{name}')
+            DjangoJob.objects.create(id=task.exec_id, next_run_time=next_run, job_state=b'')
+            self.tasks[name] = task.id
+        self.tasks['no_job'] = create_task(user, task_timing_type='timing', exec_id='mission_daily_gone').id
+
+    @override_settings(COPY_BUFFER_TTL=6 * 3600)
+    def test_only_tasks_triggering_within_ttl_are_refilled(self):
+        from utils import copyBuffer
+        with mock.patch.object(copyBuffer, 'refill_copy_buffer') as refill:
+            copyBuffer.refill_copy_buffers()
+            # 下次触发晚于有效期的每日任务不提前生成，否则文案会在触发前过期被重复生成
+            self.assertEqual([call.args[0].id for call in refill.call_args_list], [self.tasks['soon']])
+            copyBuffer.refill_copy_buffer_for_task(self.tasks['daily'])
+            self.assertEqual(refill.call_count, 1)
@@ -1,7 +1,6 @@
 from django.contrib.messages.context_processors import messages
-from django.db.models import Max
+from django.db.models import Exists, F, OuterRef, Subquery
 from drf_spectacular.types import OpenApiTypes
-from oauthlib.uri_validate import query
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -11,19 +10,30 @@ from urllib3 import request
 
 from accounts.permissions import IsOwnerOrAdmin
 from models.models import TasksSimpletaskrun, TasksSimpletask
-from utils.runTimingTask import process_account_task
+from utils.autoTask import get_scheduler
+from utils.taskQueue import enqueue_task_job
 from utils.utils import logger, ApiResponse, CustomPagination, generate_message, merge_text
-from .models import SimpleTask, SimpleTaskRun
-from .serializers import SimpleTaskSerializer, SimpleTaskRunSerializer, SimpleTaskRunDetailSerializer
+from .models import SimpleTask, SimpleTaskRun, TaskJob
+from .serializers import SimpleTaskSerializer, SimpleTaskRunSerializer, SimpleTaskRunDetailSerializer, \
+    TaskJobSerializer
 from stats.utils import record_success_run
 from django.utils import timezone
 from ai.models import AIConfig
 from social.models import PoolAccount
-from utils.largeModelUnit import LargeModelUnit
 from utils.twitterUnit import TwitterUnit, createTaskDetail
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 
+# 游标分页的查询参数（CustomPagination 的 paginationMode=cursor 模式）
+CURSOR_PAGINATION_PARAMETERS = [
+    OpenApiParameter(name='paginationMode', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                     description='传 cursor 使用游标分页（按创建时间倒序，不做 OFFSET/COUNT）', required=False),
+    OpenApiParameter(name='cursor', type=OpenApiTypes.STR, location=OpenApiParameter.QUERY,
+                     description='游标分页：上一页返回的 next_cursor，首页不传', required=False),
+    OpenApiParameter(name='withTotal', type=OpenApiTypes.BOOL, location=OpenApiParameter.QUERY,
+                     description='游标分页：是否统计总数（默认不统计）', required=False),
+]
+
 
 @extend_schema(tags=["任务日志"])
 @extend_schema_view(
@@ -34,6 +44,7 @@ from django_filters.rest_framework import DjangoFilterBackend
                                                     required=False, type=OpenApiTypes.DATE),
                                    OpenApiParameter(name='enterprise_id',
                                                     description='切换企业'),
+                                   *CURSOR_PAGINATION_PARAMETERS,
                                    ]),
 )
 class SimpleTaskRunViewSet(viewsets.ModelViewSet):
@@ -43,7 +54,7 @@ class SimpleTaskRunViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['provider', 'type', 'prompt__id']
     search_fields = ['text']
-    ordering_fields = ['created_at']
+    ordering_fields = ['created_at', 'latest_run_time']
 
     def list(self, request, *args, **kwargs):
         # 获取过滤后的查询集
@@ -70,37 +81,35 @@ class SimpleTaskRunViewSet(viewsets.ModelViewSet):
             else:
                 task_runs = TasksSimpletaskrun.objects.all()
         else:
-            task_runs = TasksSimpletaskrun.objects.filter(owner=user)
+            task_runs = TasksSimpletaskrun.objects.filter(owner_id=user.id)
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
         if start_date:
             try:
                 from datetime import datetime
                 start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-                task_runs = task_runs.filter(created_at__date__gte=start_date_obj)
+                # 使用区间比较而不是 __date 转换，保证可以走 created_at 索引
+                task_runs = task_runs.filter(created_at__gte=start_date_obj)
             except ValueError:
                 print("日期格式错误")
                 pass  # 如果日期格式错误，忽略过滤
         if end_date:
             try:
-                from datetime import datetime
+                from datetime import datetime, timedelta
                 end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-                task_runs = task_runs.filter(created_at__date__lte=end_date_obj)
+                task_runs = task_runs.filter(created_at__lt=end_date_obj + timedelta(days=1))
             except ValueError:
                 print("日期格式错误")
                 pass
-                # 按 task_id 分组，获取每个任务的最新运行时间
-        latest_runs = task_runs.values('task_id').annotate(
-            latest_run_time=Max('created_at')
-        ).order_by('-latest_run_time')
-        # 提取 task_id 列表
-        task_ids = [item['task_id'] for item in latest_runs]
-        # 根据 task_ids 查询 TasksSimpletask 表
-        if user.is_staff:
-            queryset = TasksSimpletask.objects.filter(id__in=task_ids)
-        else:
-            queryset = TasksSimpletask.objects.filter(id__in=task_ids, owner=user)
-        return queryset.order_by('-created_at')
+        # 单条 SQL：EXISTS 过滤有运行记录的任务，子查询取最近一次运行时间（走 (task_id, created_at) 索引）
+        task_runs = task_runs.filter(task_id=OuterRef('pk'))
+        queryset = TasksSimpletask.objects.filter(Exists(task_runs)).annotate(
+            latest_run_time=Subquery(task_runs.order_by('-created_at').values('created_at')[:1])
+        )
+        if not user.is_staff:
+            queryset = queryset.filter(owner_id=user.id)
+        # 默认按最近一次运行时间倒序，ordering 参数可覆盖
+        return queryset.order_by(F('latest_run_time').desc(nulls_last=True), '-id')
 
 
 from rest_framework.views import APIView
@@ -141,6 +150,7 @@ class TaskLogView(APIView):
                 description='每页条数',
                 required=False
             ),
+            *CURSOR_PAGINATION_PARAMETERS,
         ]
     )
     def get(self, request):
@@ -150,7 +160,8 @@ class TaskLogView(APIView):
         if user.is_staff:
             queryset = TasksSimpletaskrun.objects.all()
         else:
-            queryset = TasksSimpletaskrun.objects.filter(owner=request.user)
+            # models 应用的镜像模型外键指向 AuthUser，按 ID 过滤
+            queryset = TasksSimpletaskrun.objects.filter(owner_id=request.user.id)
         if simpletask_id:
             try:
                 queryset = queryset.filter(task_id=int(simpletask_id))
@@ -196,7 +207,7 @@ class TaskLogView(APIView):
             failed_runs = TasksSimpletaskrun.objects.filter(
                 task_id=int(simpletask_id),
                 success='failed',  # 根据实际数据库存储格式调整
-                owner=user
+                owner_id=user.id
             )
         # 返回失败的任务ID列表
         failed_ids = list(failed_runs.values_list('id', flat=True))
@@ -263,64 +274,38 @@ class SimpleTaskViewSet(viewsets.ModelViewSet):
         return qs
 
     @extend_schema(
-        summary='立即执行简单任务（并行多账号）',
-        description='根据 selected_accounts 逐个账号执行。AI 文案按优先级回退。',
-        responses={200: OpenApiResponse(description='执行完成，返回每账号结果')}
+        summary='立即执行简单任务（异步入队）',
+        description='将 selected_accounts 的执行提交到任务队列后立即返回作业ID，由 worker 进程并发执行；'
+                    '通过 jobs/{job_id}/ 查询每账号进度。',
+        responses={200: OpenApiResponse(description='已入队，返回作业ID')}
     )
     @action(detail=True, methods=['post'])
     def run(self, request, pk=None):
         task = self.get_object()
         try:
-            selected_qs = task.selected_accounts.all()
-            selected_ids = list(selected_qs.values_list('id', flat=True))
+            selected_ids = list(task.selected_accounts.values_list('id', flat=True))
         except Exception as e:
             return Response({
                 'detail': '获取选中账户时出错',
                 'error': str(e),
                 'selected_account_ids': list(task.selected_accounts.values_list('id', flat=True))
             }, status=400)
+        job = enqueue_task_job(task, selected_ids)
+        return Response({'status': 'queued', 'job_id': str(job.id), 'total': job.total})
 
-        # 运行前：将所选账号设为激活
-        if selected_ids:
-            try:
-                PoolAccount.objects.filter(id__in=selected_ids).update(status='active')
-            except Exception:
-                pass
-        # 平台执行
-        ok_count = 0
-        err_count = 0
-        for acc in selected_qs:
-            flags = process_account_task(acc, task)
-            if flags:
-                ok_count += 1
-            else:
-                err_count += 1
-        # 运行完成：将仍为 active 的账号改回 inactive
-        if selected_ids:
-            try:
-                PoolAccount.objects.filter(id__in=selected_ids, status='active').update(status='inactive')
-            except Exception:
-                pass
-        # 汇总并写回任务状态
-        try:
-            from django.utils import timezone as _tz
-            if ok_count and not err_count:
-                task.last_status = 'success'
-                task.last_success = True
-                task.last_failed = False
-            elif ok_count and err_count:
-                task.last_status = 'partial'
-                task.last_success = False
-                task.last_failed = True
-            else:
-                task.last_status = 'error'
-                task.last_success = False
-                task.last_failed = True
-            task.last_run_at = _tz.now()
-            task.save(update_fields=['last_status', 'last_success', 'last_failed', 'last_run_at'])
-        except Exception:
-            pass
-        return Response({'status': 'ok', 'summary': {'ok': ok_count, 'error': err_count}})
+    @extend_schema(
+        summary='查询任务执行作业进度',
+        responses={200: TaskJobSerializer}
+    )
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>[0-9a-fA-F-]{36})')
+    def job_status(self, request, job_id=None):
+        qs = TaskJob.objects.all()
+        if not request.user.is_staff:
+            qs = qs.filter(owner=request.user)
+        job = qs.filter(id=job_id).first()
+        if job is None:
+            return Response({'detail': '作业不存在'}, status=404)
+        return Response(TaskJobSerializer(job).data)
 
 
 from rest_framework.views import APIView
@@ -522,8 +507,6 @@ from datetime import datetime
 #             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
 
-from utils.autoTask import scheduler
-
 
 @extend_schema(tags=['任务执行（定时/非定时）'])
 class TaskSchedulerView(APIView):
@@ -602,15 +585,15 @@ class TaskSchedulerView(APIView):
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
     def pause_job(self, job_id):
-        scheduler.pause_job(job_id)
+        get_scheduler().pause_job(job_id)
         return ApiResponse(message=f'任务已暂停', status=200)
 
     def resume_job(self, job_id):
-        scheduler.resume_job(job_id)
+        get_scheduler().resume_job(job_id)
         return ApiResponse(message=f'任务已继续', status=200)
 
     def get_job(self, job_id):
-        scheduler.get(job_id)
+        get_scheduler().get(job_id)
 
     def delete_job(self, job_id):
-        scheduler.delete_job(job_id)
+        get_scheduler().delete_job(job_id)
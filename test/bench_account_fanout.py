@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：bench_account_fanout.py
+@Author  ：LYP
+@Date    ：2026/10/18 10:00
+@description : 多账号扇出执行基准（LLM / Twitter 客户端均为桩实现，不访问网络和数据库）
+
+用法: python test/bench_account_fanout.py [账号数] [LLM延迟秒] [Twitter延迟秒]
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ClipAI.settings')
+
+import django
+
+django.setup()
+
+from utils import runTimingTask
+from utils.accountExecutor import run_account_tasks
+
+ACCOUNTS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+LLM_LATENCY = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+TWITTER_LATENCY = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+
+
+class StubLargeModelUnit(object):
+    def __init__(self, model, api_key, base_url, temperature=0.7):
+        pass
+
+    def generateToOpenAI(self, messages):
+        time.sleep(LLM_LATENCY)
+        return True, "stub text"
+
+    generateToDeepSeek = generateToOpenAI
+
+
+class StubTwitterUnit(object):
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def sendTwitter(self, text, robotId, task, aiConfig, userId, prompt=None, jobId=None):
+        time.sleep(TWITTER_LATENCY)
+        return True, {'id': str(robotId), 'text': text}
+
+
+def main():
+    cfg = SimpleNamespace(id=1, model='stub', api_key='stub', base_url='http://stub', provider='openai',
+                          is_default=True, priority=0)
+    task = SimpleNamespace(id=1, owner_id=1, provider='twitter', type='post', language='en', text='bench',
+                           exec_prom_text=False, prompt_id=None, tags=[], mentions=[], last_text='')
+    accounts = [SimpleNamespace(id=i, provider='twitter', usage_policy='unlimited', api_key='k', api_secret='s',
+                                access_token='t', access_token_secret='ts') for i in range(ACCOUNTS)]
+
+    with mock.patch.object(runTimingTask, 'get_ai_config', lambda: cfg), \
+            mock.patch.object(runTimingTask, 'get_ai_configs', lambda: [cfg]), \
+            mock.patch.object(runTimingTask, 'get_ai_config_by_id', lambda config_id: cfg), \
+            mock.patch('utils.largeModelUnit.LargeModelUnit', StubLargeModelUnit), \
+            mock.patch.object(runTimingTask, 'get_twitter_client', lambda *args: StubTwitterUnit()), \
+            mock.patch.object(runTimingTask, 'record_success_run', lambda **kwargs: None):
+        start = time.perf_counter()
+        for acc in accounts:
+            runTimingTask.process_account_task(acc, task)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = run_account_tasks(task, accounts, runTimingTask.process_account_task)
+        concurrent = time.perf_counter() - start
+
+    print(f"accounts={ACCOUNTS} llm={LLM_LATENCY}s twitter={TWITTER_LATENCY}s")
+    print(f"serial     : {serial:.2f}s")
+    print(f"concurrent : {concurrent:.2f}s  ok={summary['ok']} error={summary['error']}")
+    print(f"speedup    : {serial / concurrent:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
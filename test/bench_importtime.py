@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：bench_importtime.py
+@Author  ：LYP
+@Date    ：2026/10/18 19:30
+@description : 启动导入耗时基准（python -X importtime）
+
+在子进程中执行 django.setup() 并导入 URL 配置（即 web worker 启动与 manage.py 命令加载的模块），
+解析 -X importtime 输出，打印总耗时、累计耗时最高的模块，并检查重量级客户端是否被提前导入。
+utils.tests.StartupImportTests 以同样方式做回归检查。
+
+用法: python test/bench_importtime.py [显示条数]
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 这些模块应在首次使用时才导入，不应出现在启动路径上
+LAZY_MODULES = ('tweepy', 'requests_oauthlib', 'oauthlib', 'httpx', 'utils.largeModelUnit',
+                'apscheduler.schedulers.background', 'django_apscheduler.jobstores')
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+_STARTUP = 'import django; django.setup(); import ClipAI.urls'
+
+
+def measure_startup(code: str = _STARTUP) -> dict:
+    """
+    :return: {'total_ms': 顶层导入累计耗时, 'modules': {模块名: 累计耗时(ms)}}
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'ClipAI.settings'))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    modules, total = {}, 0
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+        modules[name] = cumulative / 1000
+        if len(indent) == 1:
+            total += cumulative
+    return {'total_ms': total / 1000, 'modules': modules}
+
+
+def main():
+    top = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    result = measure_startup()
+    print(f"启动导入总耗时: {result['total_ms']:.1f} ms，共 {len(result['modules'])} 个模块")
+    ranked = sorted(((name, ms) for name, ms in result['modules'].items() if not name.startswith(('_', 'encodings'))),
+                    key=lambda item: item[1], reverse=True)
+    for name, ms in ranked[:top]:
+        print(f"{ms:10.1f} ms  {name}")
+    eager = [name for name in LAZY_MODULES if name in result['modules']]
+    print(f"提前导入的延迟加载模块: {', '.join(eager) if eager else '无'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：bench_load.py
+@Author  ：LYP
+@Date    ：2026/10/18 20:00
+@description : HTTP 压测（对比 runserver 与 gunicorn 部署的吞吐与延迟）
+
+固定并发数的线程各自复用 keep-alive 连接循环请求，持续指定秒数，输出 RPS、状态码分布与延迟分位数。
+可同时传入多个地址依次压测，便于同一台机器上对比两种部署方式，例如：
+    python manage.py runserver 127.0.0.1:8001
+    gunicorn -c gunicorn.conf.py -b 127.0.0.1:8002 ClipAI.wsgi:application
+    python test/bench_load.py http://127.0.0.1:8001/api/stats/summary/ http://127.0.0.1:8002/api/stats/summary/ \
+        -c 32 -d 20 --token <JWT>
+
+用法: python test/bench_load.py URL [URL ...] [-c 并发数] [-d 持续秒数] [--token JWT]
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+
+import requests
+
+
+def _percentile(values: list[float], ratio: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def run(url: str, concurrency: int, duration: float, headers: dict) -> dict:
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        session = requests.Session()
+        local_latencies, local_statuses = [], Counter()
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                status = session.get(url, headers=headers, timeout=60).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return {
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'statuses': dict(statuses),
+        'p50_ms': _percentile(latencies, 0.5) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP 压测')
+    parser.add_argument('urls', nargs='+', help='压测地址，可传多个依次压测')
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help='并发线程数')
+    parser.add_argument('-d', '--duration', type=float, default=10, help='每个地址持续秒数')
+    parser.add_argument('--token', default='', help='JWT access token（需要登录的接口）')
+    args = parser.parse_args()
+    headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+    for url in args.urls:
+        result = run(url, args.concurrency, args.duration, headers)
+        print(f"==== {url}  并发 {args.concurrency}，持续 {args.duration:g}s")
+        print(f"请求数 {result['requests']}，吞吐 {result['rps']:.1f} req/s，状态码 {result['statuses']}")
+        print(f"延迟 p50 {result['p50_ms']:.1f} ms / p95 {result['p95_ms']:.1f} ms / p99 {result['p99_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
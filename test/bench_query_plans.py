@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：bench_query_plans.py
+@Author  ：LYP
+@Date    ：2026/10/18 17:30
+@description : 热点查询执行计划对比（索引包上线前/后）
+
+对每条热点查询先在事务内临时删除索引包中的索引执行 EXPLAIN ANALYZE（“before”），
+事务回滚后再执行一次（“after”），输出两份执行计划与耗时。
+DROP INDEX 在事务内会持有表的排他锁直到回滚，请在测试/预发库上运行。
+
+用法: python test/bench_query_plans.py
+"""
+import importlib
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ClipAI.settings')
+
+import django
+
+django.setup()
+
+from django.db import connection, transaction
+
+from models.models import TasksSimpletaskrun
+from social.models import PoolAccount
+from tasks.models import TArticle, SimpleTaskRun
+
+INDEX_MIGRATIONS = ['stats.migrations.0004_index_pack']
+MODEL_INDEXES = [index.name for model in (PoolAccount, SimpleTaskRun) for index in model._meta.indexes]
+
+
+class _Rollback(Exception):
+    pass
+
+
+def pack_indexes() -> list[str]:
+    names = list(MODEL_INDEXES)
+    for module in INDEX_MIGRATIONS:
+        names.extend(item[0] for item in importlib.import_module(module).INDEXES)
+    return names
+
+
+def sample(queryset, field, default=0):
+    value = queryset.values_list(field, flat=True).first()
+    return default if value is None else value
+
+
+def hot_queries():
+    since = datetime.now() - timedelta(days=30)
+    task_id = sample(TasksSimpletaskrun.objects.order_by('-created_at'), 'task_id')
+    owner_id = sample(TasksSimpletaskrun.objects.order_by('-created_at'), 'owner_id')
+    robot_id = sample(TArticle.objects.order_by('-created_at'), 'robot_id')
+    return [
+        ('任务日志（task + success，按时间倒序）',
+         TasksSimpletaskrun.objects.filter(task_id=task_id, success='failed').order_by('-created_at')[:20]),
+        ('运行记录（owner + 时间范围）',
+         TasksSimpletaskrun.objects.filter(owner_id=owner_id, created_at__gte=since).order_by('-created_at')[:20]),
+        ('文章统计（robot + platform + 时间范围）',
+         TArticle.objects.filter(robot_id=robot_id, platform='twitter', created_at__gte=since).values('id')),
+        ('采集窗口（近10天文章）',
+         TArticle.objects.filter(created_at__gte=datetime.now() - timedelta(days=10)).values('article_id', 'robot_id')),
+        ('账号池（owner + provider + active）',
+         PoolAccount.objects.filter(owner_id=owner_id, provider='twitter', status='active').values('id')),
+    ]
+
+
+def execution_time(plan: str) -> str:
+    match = re.search(r'Execution Time: ([\d.]+) ms', plan)
+    return f"{match.group(1)} ms" if match else '-'
+
+
+def explain_without_indexes(queryset, names: list[str]) -> str:
+    plan = ''
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for name in names:
+                    cursor.execute(f'DROP INDEX IF EXISTS {name}')
+            plan = queryset.explain(analyze=True)
+            raise _Rollback()
+    except _Rollback:
+        pass
+    return plan
+
+
+def main():
+    if connection.vendor != 'postgresql':
+        print('仅支持 PostgreSQL')
+        return
+    names = pack_indexes()
+    print(f"索引包: {', '.join(names)}\n")
+    for title, queryset in hot_queries():
+        before = explain_without_indexes(queryset, names)
+        after = queryset.explain(analyze=True)
+        print(f"==== {title}  before {execution_time(before)} / after {execution_time(after)}")
+        print('-- before')
+        print(before)
+        print('-- after')
+        print(after)
+        print()
+
+
+if __name__ == '__main__':
+    main()
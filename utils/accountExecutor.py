@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：accountExecutor.py
+@Author  ：LYP
+@Date    ：2026/10/18 10:00
+@description : 多账号任务并发执行（有界线程池 + 平台并发上限）
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, Dict, Any
+
+from django.conf import settings
+from django.utils import timezone
+
+from utils.dbConnections import db_connection_scope
+from utils.utils import logger
+
+# 平台级信号量（进程内全局共享，多个任务同时运行时共同受限）
+_provider_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_provider_lock = threading.Lock()
+
+
+def _get_provider_semaphore(provider: str | None) -> threading.BoundedSemaphore | None:
+    limit = getattr(settings, 'TASK_EXEC_PROVIDER_LIMITS', {}).get(provider or '')
+    if not limit:
+        return None
+    with _provider_lock:
+        sem = _provider_semaphores.get(provider)
+        if sem is None:
+            sem = threading.BoundedSemaphore(int(limit))
+            _provider_semaphores[provider] = sem
+        return sem
+
+
+# 工作线程使用独立的数据库连接，执行完毕立即归还，避免线程退出后连接泄漏
+@db_connection_scope(persistent=False)
+def _run_one(handler: Callable, account, task) -> Dict[str, Any]:
+    """在工作线程中执行单个账号，异常不向外抛出，统一转为失败结果"""
+    provider = getattr(account, 'provider', None) or getattr(task, 'provider', None)
+    sem = _get_provider_semaphore(provider)
+    try:
+        if sem:
+            sem.acquire()
+        try:
+            flags = handler(account, task)
+        finally:
+            if sem:
+                sem.release()
+        return {'account_id': account.id, 'ok': bool(flags), 'error': None}
+    except Exception as e:
+        logger.error(f"账号 {account.id} 执行任务 {task.id} 失败: {e}")
+        return {'account_id': account.id, 'ok': False, 'error': str(e)}
+
+
+def run_account_tasks(task, accounts: Iterable, handler: Callable, max_workers: int | None = None,
+                      on_result: Callable[[Dict[str, Any]], None] | None = None) -> Dict[str, Any]:
+    """
+    并发执行多个账号的任务
+    :param task: 任务对象
+    :param accounts: 账号列表
+    :param handler: 单账号执行函数 handler(account, task)，返回真值表示成功
+    :param max_workers: 最大并发数，默认取 settings.TASK_EXEC_MAX_WORKERS
+    :param on_result: 每个账号完成后的回调（用于进度上报）
+    :return: {'ok': 成功数, 'error': 失败数, 'results': [每账号结果]}
+    """
+    accounts = list(accounts)
+    summary = {'ok': 0, 'error': 0, 'results': []}
+    if not accounts:
+        return summary
+    workers = max_workers or getattr(settings, 'TASK_EXEC_MAX_WORKERS', 16)
+    workers = max(1, min(int(workers), len(accounts)))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'task-{task.id}') as pool:
+        futures = {pool.submit(_run_one, handler, acc, task): idx for idx, acc in enumerate(accounts)}
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if result['ok']:
+                summary['ok'] += 1
+            else:
+                summary['error'] += 1
+            if on_result:
+                try:
+                    on_result(result)
+                except Exception as e:
+                    logger.warning(f"上报账号 {result['account_id']} 执行结果失败: {e}")
+    # 保持与账号输入顺序一致
+    summary['results'] = [results[i] for i in range(len(accounts))]
+    return summary
+
+
+def save_task_summary(task, ok_count: int, err_count: int) -> None:
+    """根据执行结果汇总写回任务状态"""
+    try:
+        if ok_count and not err_count:
+            task.last_status = 'success'
+            task.last_success = True
+            task.last_failed = False
+        elif ok_count and err_count:
+            task.last_status = 'partial'
+            task.last_success = False
+            task.last_failed = True
+        else:
+            task.last_status = 'error'
+            task.last_success = False
+            task.last_failed = True
+        task.last_run_at = timezone.now()
+        task.save(update_fields=['last_status', 'last_success', 'last_failed', 'last_run_at'])
+    except Exception:
+        pass
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：asyncTwitter.py
+@Author  ：LYP
+@Date    ：2026/10/18 21:00
+@description : 异步 Twitter 采集（多账号并发获取推文指标与评论）
+
+同步 TwitterUnit 逐账号、逐批阻塞请求，采集耗时约为 请求数 × 延迟。这里在一个事件循环中并发执行全部账号的
+Tweets lookup 与评论搜索：同一 app key（api_key）同时在途的请求不超过 TWITTER_ASYNC_CONCURRENCY_PER_APP，
+全局不超过 TWITTER_ASYNC_MAX_CONCURRENCY。每个请求同样先经过 TwitterRateLimiter 取令牌、由响应头回写，
+429 时清空令牌并抛出 RateLimitExceeded。响应构造为 tweepy 的数据模型，与同步路径共用 normalizeMetrics / normalizeComments。
+
+tweepy.asynchronous 依赖 aiohttp、async_lru，这里直接使用 httpx + oauthlib（OAuth 1.0a 用户授权签名）。
+事件循环内不访问数据库，采集结果由调用方在同步代码中落库。httpx / tweepy 在调用时才导入。
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from django.conf import settings
+
+from utils.rateLimiter import RateLimitExceeded, get_rate_limiter, rate_limit_buckets
+from utils.twitterUnit import (TWEETS_LOOKUP_MAX_IDS, SEARCH_MAX_RESULTS, SEARCH_MAX_PAGES, normalizeMetrics,
+                               buildConversationQueries, commentSearchIds, queryConversationIds, mergeComments,
+                               applyComments)
+from utils.utils import logger
+
+if TYPE_CHECKING:
+    import httpx
+
+API_BASE = 'https://api.twitter.com'
+TWEETS_ROUTE = '/2/tweets'
+SEARCH_ROUTE = '/2/tweets/search/recent'
+
+
+def _sign(credentials: tuple, url: str, params: dict) -> tuple[str, dict]:
+    """OAuth 1.0a 用户授权签名，返回 (带查询串的地址, 请求头)"""
+    import httpx
+    from oauthlib.oauth1 import Client
+    api_key, api_secret, access_token, access_token_secret = credentials
+    uri = str(httpx.URL(url, params=params))
+    uri, headers, _ = Client(api_key, client_secret=api_secret, resource_owner_key=access_token,
+                             resource_owner_secret=access_token_secret).sign(uri, http_method='GET')
+    return uri, headers
+
+
+def _to_response(payload: dict):
+    """接口 JSON -> tweepy.Response（Tweet / User 模型），与 tweepy.Client 的返回一致"""
+    from tweepy import Response, Tweet, User
+    data = payload.get('data')
+    includes = payload.get('includes', {})
+    if 'users' in includes:
+        includes['users'] = [User(user) for user in includes['users']]
+    return Response([Tweet(tweet) for tweet in data] if data else None, includes,
+                    payload.get('errors', []), payload.get('meta', {}))
+
+
+class AsyncTwitterCollector(object):
+    def __init__(self, per_app: int | None = None, max_concurrency: int | None = None, transport=None):
+        """
+        :param per_app: 同一 api_key 同时在途的请求数，默认 TWITTER_ASYNC_CONCURRENCY_PER_APP
+        :param max_concurrency: 全局同时在途的请求数，默认 TWITTER_ASYNC_MAX_CONCURRENCY
+        :param transport: httpx 传输层（测试时注入）
+        """
+        self.per_app = per_app or getattr(settings, 'TWITTER_ASYNC_CONCURRENCY_PER_APP', 4)
+        self.max_concurrency = max_concurrency or getattr(settings, 'TWITTER_ASYNC_MAX_CONCURRENCY', 32)
+        self.transport = transport
+        self._client = None
+        self._semaphore = None
+        self._app_semaphores = {}
+
+    def _app_semaphore(self, api_key: str) -> asyncio.Semaphore:
+        semaphore = self._app_semaphores.get(api_key)
+        if semaphore is None:
+            semaphore = self._app_semaphores[api_key] = asyncio.Semaphore(self.per_app)
+        return semaphore
+
+    async def _get(self, credentials: tuple, route: str, params: dict) -> dict:
+        """经限流器发起一次用户授权 GET 请求，返回 JSON"""
+        buckets = rate_limit_buckets('GET', route, credentials[0], credentials[2])
+        limiter = get_rate_limiter()
+        async with self._app_semaphore(credentials[0]), self._semaphore:
+            # 令牌用尽时 acquire 会阻塞等待窗口重置，放到线程中执行，不阻塞其它账号
+            await asyncio.to_thread(limiter.acquire_buckets, buckets)
+            url, headers = _sign(credentials, API_BASE + route, params)
+            response = await self._client.get(url, headers=headers)
+        if response.status_code == 429:
+            key = await asyncio.to_thread(limiter.exhaust_buckets, buckets, response.headers)
+            reset_at = response.headers.get('x-rate-limit-reset')
+            raise RateLimitExceeded(key, float(reset_at) if reset_at else time.time())
+        response.raise_for_status()
+        await asyncio.to_thread(limiter.update_buckets, buckets, response.headers)
+        return response.json()
+
+    async def fetch_account(self, credentials: tuple, tweet_ids: list[str], since_ids: dict[str, str] | None = None,
+                            known_comment_counts: dict[str, int] | None = None) -> dict[str, dict]:
+        """
+        获取同一账号下多条推文的指标及评论（口径同 TwitterUnit.getTwitterDataBatch，但不落库）
+        各批 Tweets lookup 并发执行，完成后各组评论搜索再并发执行
+        :param credentials: (api_key, api_secret, access_token, access_token_secret)
+        :return: {推文ID: 指标数据(含 comments)}
+        """
+        tweet_ids = [str(item) for item in tweet_ids]
+        since_ids = since_ids or {}
+        known_comment_counts = known_comment_counts or {}
+        chunks = [tweet_ids[start:start + TWEETS_LOOKUP_MAX_IDS]
+                  for start in range(0, len(tweet_ids), TWEETS_LOOKUP_MAX_IDS)]
+        payloads = await asyncio.gather(*(
+            self._get(credentials, TWEETS_ROUTE, {'ids': ','.join(chunk), 'tweet.fields': 'public_metrics,created_at'})
+            for chunk in chunks))
+        result = {}
+        for payload in payloads:
+            for tweet in _to_response(payload).data or []:
+                if tweet.public_metrics:
+                    data = normalizeMetrics(tweet)
+                    data['comments'] = []
+                    result[str(tweet.id)] = data
+        if not result:
+            return result
+
+        queries = buildConversationQueries(commentSearchIds(result, known_comment_counts), since_ids)
+        outcomes = await asyncio.gather(*(self._search_replies(credentials, query, sinceId)
+                                          for query, sinceId in queries), return_exceptions=True)
+        comments, incomplete = {}, set()
+        for (query, _), outcome in zip(queries, outcomes):
+            if isinstance(outcome, Exception):
+                # 评论搜索失败不丢弃已取到的指标，这些推文的评论下次重新搜索
+                logger.warning(f"搜索评论失败: {outcome}")
+                incomplete.update(queryConversationIds(query))
+                continue
+            pages, complete = outcome
+            for commentResponse in pages:
+                mergeComments(comments, commentResponse)
+            if not complete:
+                incomplete.update(queryConversationIds(query))
+        applyComments(result, comments, incomplete)
+        return result
+
+    async def _search_replies(self, credentials: tuple, query: str, sinceId: str | None) -> tuple[list, bool]:
+        """按 next_token 顺序翻页拉取一组评论查询，返回 (各页响应, 是否已取完)，口径同 TwitterUnit._searchReplies"""
+        params = {'query': query, 'tweet.fields': 'author_id,conversation_id,created_at',
+                  'user.fields': 'username,name', 'expansions': 'author_id', 'max_results': SEARCH_MAX_RESULTS}
+        if sinceId:
+            params['since_id'] = sinceId
+        pages = []
+        for _ in range(SEARCH_MAX_PAGES):
+            commentResponse = _to_response(await self._get(credentials, SEARCH_ROUTE, params))
+            pages.append(commentResponse)
+            nextToken = (commentResponse.meta or {}).get('next_token')
+            if not nextToken:
+                return pages, True
+            params['next_token'] = nextToken
+        return pages, False
+
+    async def collect(self, jobs: dict) -> dict:
+        """
+        并发采集多个账号
+        :param jobs: {标识: {'credentials': (...), 'tweet_ids': [...], 'since_ids': {...}, 'known_comment_counts': {...}}}
+        :return: {标识: 采集结果 或 异常对象}，单个账号失败不影响其它账号
+        """
+        import httpx
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._app_semaphores = {}
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        timeout = httpx.Timeout(getattr(settings, 'TWITTER_HTTP_TIMEOUT', 30))
+        async with httpx.AsyncClient(limits=limits, timeout=timeout, transport=self.transport) as client:
+            self._client = client
+            started = time.monotonic()
+            outcomes = await asyncio.gather(*(self.fetch_account(**job) for job in jobs.values()),
+                                            return_exceptions=True)
+        self._client = None
+        logger.info(f"并发采集 {len(jobs)} 个账号完成，耗时 {time.monotonic() - started:.2f} 秒")
+        return dict(zip(jobs, outcomes))
+
+
+def collect_twitter_data(jobs: dict, **kwargs) -> dict:
+    """同步入口（调度线程中调用）：新建事件循环执行 AsyncTwitterCollector.collect"""
+    return asyncio.run(AsyncTwitterCollector(**kwargs).collect(jobs))
@@ -1,9 +1,11 @@
+import os
 import pickle
 import random
+import sys
+import threading
 from datetime import datetime
 
-from apscheduler.schedulers.background import BackgroundScheduler
-from django_apscheduler.jobstores import DjangoJobStore
+from django.conf import settings
 from django.utils import timezone
 
 from utils.utils import logger, ApiResponse
@@ -14,6 +16,10 @@ fixed_exec_time = timezone.make_aware(
 
 class DjangoTaskScheduler:
     def __init__(self):
+        # apscheduler 与任务存储在创建调度器时才导入
+        from apscheduler.schedulers.background import BackgroundScheduler
+        from django_apscheduler.jobstores import DjangoJobStore
+
         # 初始化调度器
         self.scheduler = BackgroundScheduler(
             timezone=timezone.get_current_timezone_name()
@@ -22,13 +28,16 @@ class DjangoTaskScheduler:
         self.scheduler.add_jobstore(DjangoJobStore(), 'default')
         self.is_running = False
 
-    def start(self):
-        """启动调度器"""
+    def start(self, paused=False):
+        """
+        启动调度器
+        :param paused: 暂停模式：只读写任务存储（增删改任务落库），不触发执行
+        """
         if not self.is_running:
             try:
-                self.scheduler.start()
+                self.scheduler.start(paused=paused)
                 self.is_running = True
-                logger.info("调度器启动成功")
+                logger.info("调度器启动成功（仅维护任务定义）" if paused else "调度器启动成功")
             except Exception as e:
                 logger.info(f"调度器启动失败:  ")
                 self.shutdown()
@@ -118,11 +127,12 @@ class DjangoTaskScheduler:
                 """
                 每fixed 
                 """
-                scheduler.add_job(
+                self.scheduler.add_job(
                     func,
                     trigger='date',
-                    job_id=job_id,
+                    id=job_id,
                     run_date=fixed_time,
+                    replace_existing=replace_existing,
                     args=kwargs.get('args', ()),
                     kwargs=kwargs.get('kwargs', {})
                 )
@@ -208,9 +218,64 @@ class DjangoTaskScheduler:
         except Exception as e:
             logger.info(f"获取任务 {job_id} 失败: {e}")
 
-# 初始化调度器
-scheduler = DjangoTaskScheduler()
-scheduler.start()
+    def resume_execution(self):
+        """开始触发任务（由 run_scheduler 主节点调用）"""
+        self.scheduler.resume()
+        logger.info("调度器开始执行任务")
+
+    def pause_execution(self):
+        """停止触发任务（失去主节点身份时调用），任务定义保留在数据库中"""
+        self.scheduler.pause()
+        logger.info("调度器已暂停执行任务")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> DjangoTaskScheduler:
+    """
+    获取进程内调度器，首次调用时才创建并连接任务存储（导入本模块不启动调度器）
+    web 进程以暂停模式启动，只负责写入任务定义；任务由 python manage.py run_scheduler 进程（多副本时仅主节点）统一触发。
+    SCHEDULER_RUN_IN_PROCESS=1 时恢复旧行为，在当前进程内直接执行（单进程开发环境）
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            in_process = getattr(settings, 'SCHEDULER_RUN_IN_PROCESS', False)
+            task_scheduler = DjangoTaskScheduler()
+            task_scheduler.start(paused=not in_process)
+            if in_process:
+                register_system_jobs(task_scheduler)
+            _scheduler = task_scheduler
+        return _scheduler
+
+
+def start_in_process_scheduler() -> None:
+    """
+    SCHEDULER_RUN_IN_PROCESS=1 时由 TasksConfig.ready() 调用：进程启动即创建调度器并开始执行任务，
+    不必等到首次访问 get_scheduler()。manage.py 的其它命令（migrate、test 等）与 runserver 自动重载的监视进程不启动
+    """
+    if not getattr(settings, 'SCHEDULER_RUN_IN_PROCESS', False):
+        return
+    if os.path.basename(sys.argv[0]) == 'manage.py':
+        command = sys.argv[1] if len(sys.argv) > 1 else ''
+        if command != 'runserver' or os.environ.get('RUN_MAIN') != 'true':
+            return
+    get_scheduler()
+
+
+def __getattr__(name):
+    # 兼容 from utils.autoTask import scheduler
+    if name == 'scheduler':
+        return get_scheduler()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def register_system_jobs(task_scheduler):
+    """注册系统级周期任务（只需由执行任务的进程注册一次）"""
+    from utils.copyBuffer import schedule_copy_buffer_refill
+    schedule_copy_buffer_refill(task_scheduler)
 
 def user_stat_task(user_id, task_desc):
     """用户统计任务函数"""
@@ -1,8 +1,21 @@
+from collections import defaultdict
 from datetime import datetime, timedelta
 
+from django.conf import settings
+
 from tasks.models import TArticle as Article
 from social.models import PoolAccount
-from utils.twitterUnit import TwitterUnit
+from social.utils import account_credentials, decrypt_accounts
+from stats.models import ArticleRefreshState
+from utils.dbConnections import db_connection_scope
+from utils.rateLimiter import RateLimitExceeded
+from utils.asyncTwitter import collect_twitter_data
+from utils.twitterClientCache import get_twitter_client
+from utils.twitterUnit import saveTwitterDataBatch
+
+# 只采集该天数内发布的文章
+ARTICLE_WINDOW_DAYS = 10
+
 
 class TimeoutError(Exception):
     pass
@@ -11,67 +24,149 @@ class TimeoutError(Exception):
 def timeout_handler(signum, frame):
     raise TimeoutError("API调用超时")
 
-def collect_recent_articles_data():
+@db_connection_scope
+def collect_recent_articles_data(force: bool = False):
     """
     统计10天内的文章数据，获取文章ID和机器人ID，
-    然后调用Twitter API获取详细数据
+    按机器人账号分组后批量调用Twitter API获取详细数据，各账号并发请求（TWITTER_ASYNC_ENABLED=0 时逐账号同步请求）
+    增量采集：只刷新 next_refresh_at 已到期的推文，新发或有变化的推文刷新频繁，长期无变化的按指数退避
+    :param force: 为 True 时忽略刷新时间，全部刷新
     """
+    from tweepy.errors import TooManyRequests
+
+    now = datetime.now()
     # 计算10天前的日期
-    s1 = str(datetime.now() - timedelta(days=10))[:10] + " 00:00:00"
-    s2 = str(datetime.now() + timedelta(days=1))[:10] + " 00:00:00"
+    s1 = str(now - timedelta(days=ARTICLE_WINDOW_DAYS))[:10] + " 00:00:00"
+    s2 = str(now + timedelta(days=1))[:10] + " 00:00:00"
 
     # 查询10天内的文章数据
-    recent_articles = Article.objects.filter(created_at__range=[s1, s2]).values('article_id', 'robot_id')
+    recent_articles = list(Article.objects.filter(created_at__range=[s1, s2])
+                           .values('article_id', 'robot_id', 'created_at'))
+    states = ensure_refresh_states(recent_articles, now)
+    created = {item['article_id']: item['created_at'] for item in recent_articles}
 
-    # 创建结果列表
-    results = []
-    #
-    # 遍历文章数据
+    # 只处理到期的文章，按机器人账号分组
+    grouped = defaultdict(list)
     for article_data in recent_articles:
-        article_id = article_data['article_id']
-        robot_id = article_data['robot_id']
-        print(article_id, robot_id)
-
-        try:
-            # 根据robot_id获取对应的API凭证
-            pool_account = PoolAccount.objects.get(id=robot_id)
-
-            # 初始化Twitter客户端
-            twitter_client = TwitterUnit(
-                api_key=pool_account.api_key,
-                api_secret=pool_account.api_secret,
-                access_token=pool_account.access_token,
-                access_token_secret=pool_account.access_token_secret
-            )
-            try:
-                # 调用getTwitterData方法获取推文详细数据
-                success, twitter_data = twitter_client.getTwitterData(article_id)
-
-                if success and twitter_data:
-                    # 存储结果
-                    results.append({
-                        'article_id': article_id,
-                        'robot_id': robot_id,
-                        'twitter_data': twitter_data
-                    })
-                    # 这里可以更新数据库中的文章统计数据
-                    # update_article_stats(article_id, twitter_data)
-                else:
-                    continue
-            except TimeoutError:
-                print(f"处理article_id {article_id}超时，跳过")
+        if force or states[article_data['article_id']].next_refresh_at <= now:
+            grouped[article_data['robot_id']].append(article_data['article_id'])
+
+    # 一次查询取出全部账号凭证
+    accounts = PoolAccount.objects.in_bulk(list(grouped))
+    decrypt_accounts(accounts.values())
+
+    # 每个账号一个采集任务，推文指标按 100 条一批获取
+    jobs = {}
+    for robot_id, article_ids in grouped.items():
+        pool_account = accounts.get(robot_id)
+        if pool_account is None:
+            print(f"未找到robot_id为{robot_id}的账号信息")
+            continue
+        jobs[robot_id] = {
+            'credentials': account_credentials(pool_account),
+            'tweet_ids': article_ids,
+            'since_ids': {k: states[k].since_id for k in article_ids if states[k].since_id},
+            'known_comment_counts': {k: states[k].comment_count for k in article_ids if states[k].last_refreshed_at},
+        }
+
+    if getattr(settings, 'TWITTER_ASYNC_ENABLED', True):
+        # 全部账号并发请求，结果回到当前线程后逐账号落库
+        outcomes = collect_twitter_data(jobs)
+        for robot_id, outcome in outcomes.items():
+            if isinstance(outcome, Exception):
                 continue
+            try:
+                saveTwitterDataBatch(outcome)
             except Exception as e:
-                # 检查是否为速率限制错误
-                if "Rate limit exceeded" in str(e):
-                    print(f"遇到速率限制，跳过article_id {article_id}")
-                    continue
-            else:
-                print(f"处理article_id {article_id}成功")
-        except PoolAccount.DoesNotExist:
-            print(f"未找到robot_id为{robot_id}的账号信息")
+                outcomes[robot_id] = e
+    else:
+        outcomes = {robot_id: _fetch_account_sync(robot_id, job) for robot_id, job in jobs.items()}
+
+    # 创建结果列表
+    results = []
+    touched = []
+    for robot_id, twitter_datas in outcomes.items():
+        article_ids = grouped[robot_id]
+        if isinstance(twitter_datas, (TooManyRequests, RateLimitExceeded)):
+            # 不更新采集状态，下次调度仍视为到期
+            print(f"遇到速率限制，跳过robot_id {robot_id} 的 {len(article_ids)} 篇文章")
             continue
-        except Exception as e:
-            print(f"处理article_id {article_id}时出错: {e}")
+        if isinstance(twitter_datas, Exception):
+            print(f"处理robot_id {robot_id}时出错: {twitter_datas}")
             continue
-    return results
\ No newline at end of file
+        for article_id in article_ids:
+            twitter_data = twitter_datas.get(str(article_id))
+            touched.append(schedule_next_refresh(states[article_id], twitter_data, created[article_id], now))
+            if twitter_data:
+                # 存储结果
+                results.append({
+                    'article_id': article_id,
+                    'robot_id': robot_id,
+                    'twitter_data': twitter_data
+                })
+        print(f"处理robot_id {robot_id} 成功，获取 {len(twitter_datas)}/{len(article_ids)} 篇文章数据")
+    ArticleRefreshState.objects.bulk_update(touched, ['next_refresh_at', 'interval_seconds', 'impression_count',
+                                                      'comment_count', 'like_count', 'since_id',
+                                                      'last_refreshed_at'], batch_size=500)
+    return results
+
+
+def _fetch_account_sync(robot_id: int, job: dict) -> dict | Exception:
+    """同步路径（TWITTER_ASYNC_ENABLED=0）：逐账号阻塞请求并落库，异常作为结果返回"""
+    try:
+        # 复用账号缓存的Twitter客户端
+        twitter_client = get_twitter_client(robot_id, *job['credentials'])
+        return twitter_client.getTwitterDataBatch(job['tweet_ids'], since_ids=job['since_ids'],
+                                                  known_comment_counts=job['known_comment_counts'])
+    except Exception as e:
+        return e
+
+
+def ensure_refresh_states(articles: list[dict], now: datetime) -> dict:
+    """为新文章补建采集状态（立即到期），清理窗口外的旧状态，返回 {文章ID: 状态}"""
+    ids = [item['article_id'] for item in articles]
+    states = ArticleRefreshState.objects.in_bulk(ids, field_name='article_id')
+    missing = [ArticleRefreshState(article_id=item['article_id'], robot_id=item['robot_id'], next_refresh_at=now)
+               for item in articles if item['article_id'] not in states]
+    if missing:
+        ArticleRefreshState.objects.bulk_create(missing, ignore_conflicts=True, batch_size=500)
+        states = ArticleRefreshState.objects.in_bulk(ids, field_name='article_id')
+    ArticleRefreshState.objects.filter(created_at__lt=now - timedelta(days=ARTICLE_WINDOW_DAYS + 1)).delete()
+    return states
+
+
+def schedule_next_refresh(state, data: dict | None, created_at, now: datetime):
+    """
+    计算下次刷新时间：发布不足 ARTICLE_REFRESH_YOUNG_HOURS 小时或指标有变化时按最短间隔刷新，
+    否则间隔翻倍，直至 ARTICLE_REFRESH_MAX_SECONDS
+    :param data: 本次取到的指标（含 comments），推文已删除/不可见时为 None；
+                 commentsComplete 为 False 时评论未取全，不推进评论数与 since_id，下次重新搜索
+    """
+    min_seconds = getattr(settings, 'ARTICLE_REFRESH_MIN_SECONDS', 900)
+    max_seconds = getattr(settings, 'ARTICLE_REFRESH_MAX_SECONDS', 2 * 86400)
+    young = created_at and now - created_at < timedelta(hours=getattr(settings, 'ARTICLE_REFRESH_YOUNG_HOURS', 24))
+    changed = False
+    if data:
+        metrics = (data.get('pageViews', 0), data.get('commentCount', 0), data.get('likeCount', 0))
+        changed = metrics != (state.impression_count, state.comment_count, state.like_count)
+        state.impression_count, state.like_count = metrics[0], metrics[2]
+        if data.get('commentsComplete', True):
+            state.comment_count = metrics[1]
+            commentIds = [int(item['id']) for item in data.get('comments', [])]
+            if commentIds:
+                state.since_id = str(max(commentIds + [int(state.since_id or 0)]))
+    if young or changed:
+        state.interval_seconds = min_seconds
+    else:
+        state.interval_seconds = min(max_seconds, max(min_seconds, state.interval_seconds * 2))
+    state.last_refreshed_at = now
+    state.next_refresh_at = now + timedelta(seconds=state.interval_seconds)
+    return state
+
+
+def schedule_article_collect(task_scheduler) -> None:
+    """在调度器（DjangoJobStore）中注册增量采集任务，以字符串引用函数便于持久化，由 run_scheduler 进程执行"""
+    task_scheduler.scheduler.add_job('utils.c_scheduler:collect_recent_articles_data', trigger='interval',
+                                     minutes=settings.ARTICLE_REFRESH_TICK_MINUTES, id='collect_artical_data',
+                                     name='Collect Due Artical Data', replace_existing=True,
+                                     coalesce=True, max_instances=1)
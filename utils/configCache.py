@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：configCache.py
+@Author  ：LYP
+@Date    ：2026/10/18 18:00
+@description : AI 配置 / 提示词进程内缓存（带版本号，保存/删除时失效）
+
+配置对象缓存在进程内存中，版本号保存在 Django 缓存里：任一进程保存或删除 AIConfig / PromptConfig 时递增版本号，
+其它进程下次读取发现版本变化即清空本地缓存。使用本地内存缓存后端时版本号不跨进程，
+此时依赖 CONFIG_CACHE_TTL 兜底过期。
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+
+from ai.models import AIConfig
+from prompts.models import PromptConfig
+
+_VERSION_KEY = 'configcache:ver'
+_lock = threading.Lock()
+_state = {'version': None, 'loaded_at': 0.0, 'ai_configs': None, 'prompts': {}}
+
+
+def _current_version():
+    try:
+        return cache.get_or_set(_VERSION_KEY, 1, timeout=None)
+    except Exception:
+        # 缓存不可用时仅按 TTL 过期
+        return _state['version']
+
+
+def _fresh_state():
+    """返回 (本地缓存, 当前版本号)，版本变化或超过 TTL 时先清空"""
+    version = _current_version()
+    now = time.monotonic()
+    with _lock:
+        if version != _state['version'] or now - _state['loaded_at'] > getattr(settings, 'CONFIG_CACHE_TTL', 300):
+            _state.update(version=version, loaded_at=now, ai_configs=None, prompts={})
+        return _state, _state['version']
+
+
+def get_ai_configs() -> list[AIConfig]:
+    """全部启用的 AI 配置，按模型默认排序（默认配置优先，其次优先级降序）"""
+    state, version = _fresh_state()
+    configs = state['ai_configs']
+    if configs is None:
+        configs = list(AIConfig.objects.filter(enabled=True))
+        with _lock:
+            # 查询期间发生失效（版本已变）时不写回，避免旧数据落到新版本下
+            if state['version'] == version:
+                state['ai_configs'] = configs
+    return configs
+
+
+def get_ai_config() -> AIConfig | None:
+    """当前首选的 AI 配置（与原 AIConfig.objects.filter(enabled=True).first() 口径一致）"""
+    configs = get_ai_configs()
+    return configs[0] if configs else None
+
+
+def get_ai_config_by_id(config_id) -> AIConfig | None:
+    return next((config for config in get_ai_configs() if config.id == config_id), None)
+
+
+def get_prompt(prompt_id) -> PromptConfig | None:
+    """按ID获取提示词，不存在时返回 None（结果同样缓存）"""
+    if not prompt_id:
+        return None
+    state, version = _fresh_state()
+    if prompt_id in state['prompts']:
+        return state['prompts'][prompt_id]
+    prompt = PromptConfig.objects.filter(id=prompt_id).first()
+    with _lock:
+        if state['version'] == version:
+            state['prompts'][prompt_id] = prompt
+    return prompt
+
+
+def invalidate_config_cache(*args, **kwargs) -> None:
+    """递增版本号并清空本进程缓存；参数兼容信号回调"""
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.add(_VERSION_KEY, 2, timeout=None)
+    except Exception:
+        pass
+    with _lock:
+        _state.update(version=None, loaded_at=0.0, ai_configs=None, prompts={})
+
+
+def connect_config_signals() -> None:
+    """由 ai 应用的 AppConfig.ready 调用一次：AIConfig / PromptConfig 保存或删除（含视图与后台）时失效缓存"""
+    for model in (AIConfig, PromptConfig):
+        post_save.connect(invalidate_config_cache, sender=model, dispatch_uid=f'configcache_save_{model.__name__}')
+        post_delete.connect(invalidate_config_cache, sender=model, dispatch_uid=f'configcache_delete_{model.__name__}')
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：copyBuffer.py
+@Author  ：LYP
+@Date    ：2026/10/18 14:00
+@description : 定时任务文案预生成缓冲区
+
+定时任务触发前在后台提前生成候选文案存入缓存，触发时直接取用，
+缓冲区为空时才实时调用大模型，从而把大模型延迟移出发帖关键路径。
+缓冲区以提示词指纹区分版本：任务文案/提示词变化后旧文案自动失效。
+只为下次触发时间落在有效期（COPY_BUFFER_TTL）内的任务补充，触发间隔更长的任务不会反复生成过期文案。
+"""
+import hashlib
+import json
+import threading
+import time
+from datetime import timedelta
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from utils.configCache import get_ai_config
+from utils.dbConnections import db_connection_scope
+from utils.utils import logger, generate_message
+
+_KEY = 'copybuf:{task_id}'
+_LOCK_KEY = 'copybuf:lock:{task_id}'
+
+
+def _depth() -> int:
+    return getattr(settings, 'COPY_BUFFER_DEPTH', 5)
+
+
+def _ttl() -> int:
+    return getattr(settings, 'COPY_BUFFER_TTL', 6 * 3600)
+
+
+def task_fingerprint(task) -> str:
+    """根据实际发送给大模型的提示词及后缀计算指纹"""
+    raw = json.dumps(generate_message(task), ensure_ascii=False, sort_keys=True) + '|' + (task.last_text or '')
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class _BufferLock(object):
+    """基于 cache.add 的互斥锁，LocMem/Redis 均为原子操作"""
+
+    def __init__(self, task_id, timeout: int = 10, wait: float = 5.0):
+        self.key = _LOCK_KEY.format(task_id=task_id)
+        self.timeout = timeout
+        self.wait = wait
+        self.acquired = False
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.wait
+        while not cache.add(self.key, 1, timeout=self.timeout):
+            if time.monotonic() >= deadline:
+                return self
+            time.sleep(0.05)
+        self.acquired = True
+        return self
+
+    def __exit__(self, *exc):
+        if self.acquired:
+            cache.delete(self.key)
+
+
+def _load(task_id, fingerprint: str) -> list:
+    data = cache.get(_KEY.format(task_id=task_id))
+    if not data or data.get('fingerprint') != fingerprint:
+        return []
+    now = time.time()
+    return [item for item in data.get('items', []) if item['expires_at'] > now]
+
+
+def _save(task_id, fingerprint: str, items: list) -> None:
+    cache.set(_KEY.format(task_id=task_id), {'fingerprint': fingerprint, 'items': items}, timeout=_ttl())
+
+
+def pop_copies(task, n: int) -> List[Tuple[str, dict]]:
+    """
+    从缓冲区取出最多 n 条文案
+    :return: [(文案, ai_meta)]
+    """
+    if n <= 0:
+        return []
+    fingerprint = task_fingerprint(task)
+    with _BufferLock(task.id) as lock:
+        if not lock.acquired:
+            return []
+        items = _load(task.id, fingerprint)
+        taken, rest = items[:n], items[n:]
+        _save(task.id, fingerprint, rest)
+    if taken:
+        logger.info(f"任务 {task.id} 从预生成缓冲区取出 {len(taken)} 条文案，剩余 {len(rest)} 条")
+    return [(item['text'], item['meta']) for item in taken]
+
+
+def buffer_size(task) -> int:
+    return len(_load(task.id, task_fingerprint(task)))
+
+
+def refill_copy_buffer(task, cfg=None, target: int | None = None) -> int:
+    """
+    将任务缓冲区补足到目标深度
+    :param target: 目标条数，默认 max(COPY_BUFFER_DEPTH, 任务账号数)
+    :return: 本次新增条数
+    """
+    from models.models import TasksSimpletaskSelectedAccounts
+    from utils.runTimingTask import generate_ai_texts
+
+    if target is None:
+        accounts = TasksSimpletaskSelectedAccounts.objects.filter(simpletask_id=task.id).count()
+        target = max(_depth(), accounts)
+    fingerprint = task_fingerprint(task)
+    missing = target - len(_load(task.id, fingerprint))
+    if missing <= 0:
+        return 0
+    if cfg is None:
+        cfg = get_ai_config()
+    # 生成过程不持锁，生成完成后再合并写入
+    generated = [(text, meta) for text, meta in generate_ai_texts(task, cfg, missing) if text]
+    if not generated:
+        return 0
+    expires_at = time.time() + _ttl()
+    with _BufferLock(task.id) as lock:
+        if not lock.acquired:
+            return 0
+        items = _load(task.id, fingerprint)
+        # 生成期间缓冲区可能已被其它进程补充，只存入仍缺少的部分
+        stored = generated[:max(0, target - len(items))]
+        items.extend({'text': text, 'meta': meta, 'expires_at': expires_at} for text, meta in stored)
+        _save(task.id, fingerprint, items)
+    logger.info(f"任务 {task.id} 预生成文案 {len(generated)} 条，存入 {len(stored)} 条")
+    return len(stored)
+
+
+def due_tasks(tasks) -> list:
+    """
+    筛出下次触发时间落在缓冲区有效期内的任务（按 exec_id 读取调度器作业的 next_run_time），
+    无调度作业或已暂停（next_run_time 为空）的任务不补充
+    """
+    from django_apscheduler.models import DjangoJob
+
+    tasks = list(tasks)
+    exec_ids = [task.exec_id for task in tasks if task.exec_id]
+    if not exec_ids:
+        return []
+    next_runs = dict(DjangoJob.objects.filter(id__in=exec_ids).values_list('id', 'next_run_time'))
+    deadline = timezone.now() + timedelta(seconds=_ttl())
+    return [task for task in tasks if next_runs.get(task.exec_id) and next_runs[task.exec_id] <= deadline]
+
+
+def refill_copy_buffer_async(task) -> None:
+    """后台线程补充缓冲区，不阻塞当前执行"""
+
+    @db_connection_scope(persistent=False)
+    def _run():
+        try:
+            if due_tasks([task]):
+                refill_copy_buffer(task)
+        except Exception as e:
+            logger.warning(f"任务 {task.id} 预生成文案失败: {e}")
+
+    threading.Thread(target=_run, name=f'copybuf-{task.id}', daemon=True).start()
+
+
+@db_connection_scope
+def refill_copy_buffer_for_task(task_id) -> None:
+    """调度任务：补充单个定时任务的缓冲区（任务保存后由 schedule_copy_buffer_fill 注册）"""
+    from models.models import TasksSimpletask
+    task = TasksSimpletask.objects.filter(id=task_id).first()
+    if task is None:
+        return
+    try:
+        if due_tasks([task]):
+            refill_copy_buffer(task)
+    except Exception as e:
+        logger.warning(f"任务 {task_id} 预生成文案失败: {e}")
+
+
+def schedule_copy_buffer_fill(task_id) -> None:
+    """
+    web 进程保存定时任务后调用：写入一次性调度任务，由执行定时任务的调度器进程立即补充缓冲区，
+    不在请求进程内起后台线程（gunicorn worker 回收时线程会被中断）
+    """
+    from utils.autoTask import get_scheduler
+    try:
+        get_scheduler().scheduler.add_job('utils.copyBuffer:refill_copy_buffer_for_task', trigger='date',
+                                          args=[task_id], id=f'copy_buffer_fill_{task_id}', replace_existing=True,
+                                          misfire_grace_time=None)
+    except Exception as e:
+        logger.warning(f"任务 {task_id} 注册文案预生成失败: {e}")
+
+
+def invalidate_copy_buffer(task_id) -> None:
+    cache.delete(_KEY.format(task_id=task_id))
+
+
+@db_connection_scope
+def refill_copy_buffers() -> None:
+    """调度任务：为下次触发落在有效期内的执行中定时任务补充缓冲区"""
+    from models.models import TasksSimpletask
+    tasks = TasksSimpletask.objects.filter(task_timing_type='timing').exclude(exec_status='paused')
+    for task in due_tasks(tasks):
+        try:
+            refill_copy_buffer(task)
+        except Exception as e:
+            logger.warning(f"任务 {task.id} 预生成文案失败: {e}")
+
+
+def schedule_copy_buffer_refill(task_scheduler) -> None:
+    """在调度器中注册周期补充任务（以字符串引用函数，便于 DjangoJobStore 持久化）"""
+    minutes = getattr(settings, 'COPY_BUFFER_REFILL_MINUTES', 30)
+    if minutes <= 0:
+        return
+    try:
+        task_scheduler.scheduler.add_job('utils.copyBuffer:refill_copy_buffers', trigger='interval',
+                                         minutes=minutes, id='copy_buffer_refill', replace_existing=True,
+                                         coalesce=True, max_instances=1)
+        logger.info(f"文案预生成任务已注册，每 {minutes} 分钟执行一次")
+    except Exception as e:
+        logger.info(f"注册文案预生成任务失败: {e}")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：dbConnections.py
+@Author  ：LYP
+@Date    ：2026/10/18 20:30
+@description : 非请求线程的数据库连接生命周期与连接使用统计
+
+Django 只在 HTTP 请求开始/结束时清理连接，调度器、worker、后台线程需要自行处理：
+- 长期存活的线程（APScheduler 线程池、worker 主循环）每次执行前后按 CONN_MAX_AGE 清理过期/失效连接，
+  与请求周期的行为一致；
+- 短生命周期线程（账号并发执行、后台补充文案）执行完毕立即关闭连接（连接池模式下归还到池中），
+  否则线程退出后连接要等到 PostgreSQL 超时才会释放。
+"""
+import functools
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import connections, close_old_connections
+from django.db.backends.signals import connection_created
+
+from utils.utils import logger
+
+_lock = threading.Lock()
+_stats = {'created': 0, 'scopes': 0, 'scope_errors': 0}
+# 本进程内所有建立过连接的 DatabaseWrapper（每线程一个），用于统计当前打开的连接数
+_wrappers = weakref.WeakSet()
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    with _lock:
+        _stats['created'] += 1
+        _wrappers.add(connection)
+
+
+connection_created.connect(_on_connection_created, dispatch_uid='db_connection_stats')
+
+
+def db_connection_scope(func=None, *, persistent: bool = True):
+    """
+    线程入口函数装饰器：管理该线程的数据库连接
+    :param persistent: True 用于长期存活的线程，执行前后按 CONN_MAX_AGE 清理；
+                       False 用于执行完即退出的线程，结束时关闭本线程全部连接
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            close_old_connections()
+            with _lock:
+                _stats['scopes'] += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                with _lock:
+                    _stats['scope_errors'] += 1
+                raise
+            finally:
+                if persistent:
+                    close_old_connections()
+                else:
+                    connections.close_all()
+
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+
+def _pool_stats(alias: str) -> dict | None:
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is None:
+        return None
+    try:
+        return dict(pool.get_stats())
+    except Exception as e:
+        logger.warning(f"读取连接池统计失败: {e}")
+        return None
+
+
+def _server_stats(alias: str) -> dict | None:
+    """PostgreSQL 服务端视角：当前库各状态连接数与 max_connections"""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(state, 'unknown'), count(*) FROM pg_stat_activity "
+                           "WHERE datname = current_database() GROUP BY 1")
+            states = dict(cursor.fetchall())
+            cursor.execute('SHOW max_connections')
+            max_connections = int(cursor.fetchone()[0])
+    except Exception as e:
+        logger.warning(f"读取数据库连接统计失败: {e}")
+        return None
+    return {'states': states, 'total': sum(states.values()), 'max_connections': max_connections}
+
+
+def get_db_connection_stats(alias: str = 'default') -> dict:
+    """连接使用统计：本进程打开的连接数、累计新建次数、连接池及服务端统计"""
+    with _lock:
+        stats = dict(_stats)
+        wrappers = list(_wrappers)
+    stats['open'] = sum(1 for wrapper in wrappers if wrapper.connection is not None)
+    stats['mode'] = getattr(settings, 'DB_POOL_MODE', 'persistent')
+    stats['conn_max_age'] = connections[alias].settings_dict.get('CONN_MAX_AGE')
+    stats['pool'] = _pool_stats(alias)
+    stats['server'] = _server_stats(alias)
+    return stats
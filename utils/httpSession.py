@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：httpSession.py
+@Author  ：LYP
+@Date    ：2026/10/18 12:00
+@description : 进程级共享 HTTP 连接池（按 base_url 的 scheme+host 复用 keep-alive 连接）
+
+httpx 在首次创建客户端时才导入，读取统计（MetricsView）不加载 httpx。
+"""
+from __future__ import annotations
+
+import threading
+from typing import Dict, Any, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from utils.utils import logger
+
+if TYPE_CHECKING:
+    import httpx
+
+_clients: Dict[str, httpx.Client] = {}
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'requests': 0, 'new_connections': 0}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _http2_enabled() -> bool:
+    if not getattr(settings, 'LLM_HTTP2', False):
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        logger.warning("LLM_HTTP2 已开启但未安装 h2，回退为 HTTP/1.1")
+        return False
+
+
+def _default_timeout() -> httpx.Timeout:
+    import httpx
+    return httpx.Timeout(getattr(settings, 'LLM_HTTP_TIMEOUT', 60),
+                         connect=getattr(settings, 'LLM_HTTP_CONNECT_TIMEOUT', 10))
+
+
+def get_http_client(url: str) -> httpx.Client:
+    """获取 url 所属主机的共享客户端，不存在时创建"""
+    key = _origin(url)
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _stats['hits'] += 1
+            return client
+        _stats['misses'] += 1
+        pool_size = getattr(settings, 'LLM_HTTP_POOL_SIZE', 20)
+        import httpx
+        client = httpx.Client(
+            http2=_http2_enabled(),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                keepalive_expiry=getattr(settings, 'LLM_HTTP_KEEPALIVE_EXPIRY', 60)),
+            timeout=_default_timeout(),
+        )
+        _clients[key] = client
+        return client
+
+
+class _ConnectionTrace(object):
+    """httpcore trace 回调：记录本次请求是否新建了 TCP 连接"""
+
+    def __init__(self):
+        self.connected = False
+
+    def __call__(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            self.connected = True
+
+
+def post_json(url: str, payload: dict, headers: dict | None = None, timeout: float | None = None) -> httpx.Response:
+    """
+    通过共享连接池发送 JSON POST
+    :param url: 完整请求地址
+    :param payload: 请求体
+    :param headers: 请求头
+    :param timeout: 本次请求超时（秒），默认取 LLM_HTTP_TIMEOUT
+    """
+    import httpx
+    client = get_http_client(url)
+    trace = _ConnectionTrace()
+    try:
+        return client.post(url, json=payload, headers=headers,
+                           timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                           extensions={'trace': trace})
+    finally:
+        with _lock:
+            _stats['requests'] += 1
+            if trace.connected:
+                _stats['new_connections'] += 1
+
+
+def get_http_stats() -> Dict[str, Any]:
+    """连接池统计：客户端命中/未命中、请求数、新建连接数与复用数"""
+    with _lock:
+        stats = dict(_stats)
+        stats['pools'] = len(_clients)
+    stats['reused_connections'] = stats['requests'] - stats['new_connections']
+    return stats
+
+
+def close_http_clients() -> None:
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
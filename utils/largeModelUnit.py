@@ -7,11 +7,16 @@
 @Date    ：2025/10/10 9:38
 @description : 大模型生成返回词
 """
-import requests
+import asyncio
 import random
-import json
 from typing import List, Dict
 
+import httpx
+from django.conf import settings
+
+from utils.httpSession import post_json
+from utils.utils import logger
+
 
 class LargeModelUnit(object):
     def __init__(self, model: str, api_key: str, base_url: str, temperature: float = 0.7):
@@ -30,7 +35,7 @@ class LargeModelUnit(object):
         :return:
         """
         self.payload["messages"] = messages
-        resp = requests.post(self.base_url, json=self.payload, headers=self.headers).json()
+        resp = post_json(self.base_url, self.payload, self.headers).json()
         try:
             return True, resp["choices"][0]["message"]["content"]
         except:
@@ -43,13 +48,79 @@ class LargeModelUnit(object):
         :return:
         """
         self.payload["messages"] = messages
-        resp = requests.post(self.base_url, data=json.dumps(self.payload), headers=self.headers).json()
+        resp = post_json(self.base_url, self.payload, self.headers).json()
 
         try:
             return True, resp["choices"][0]["message"]["content"]
         except:
             return False, ""
 
+
+class AsyncLargeModelUnit(object):
+    """
+    异步批量生成：同一组 messages 一次生成 n 条候选文案
+    支持 n 参数的厂商单次请求返回多条，其余厂商在信号量约束下并发发起 n 次请求
+    """
+    # 只列出 ai/router.py SUPPORTED_PROVIDERS 中会路由到这里的厂商
+    N_PARAM_PROVIDERS = {'openai'}
+    # 单次请求最多要求的候选数，避免单个响应过大
+    MAX_N_PER_REQUEST = 8
+
+    def __init__(self, model: str, api_key: str, base_url: str, provider: str = '', temperature: float = 0.7,
+                 concurrency: int | None = None):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.provider = provider
+        self.temperature = temperature
+        self.concurrency = concurrency or getattr(settings, 'LLM_ASYNC_CONCURRENCY', 8)
+        self.headers = {'Content-Type': 'application/json', 'Accept': 'application/json',
+                        'Authorization': f'Bearer {self.api_key}'}
+
+    def _payload(self, messages: List[Dict[str, str]], n: int) -> dict:
+        payload = {"model": self.model, "temperature": random.uniform(self.temperature, 2), "top_p": 0.9,
+                   "presence_penalty": 0.5, "messages": messages}
+        if n > 1:
+            payload["n"] = n
+        return payload
+
+    async def _request(self, client: httpx.AsyncClient, sem: asyncio.Semaphore, messages: List[Dict[str, str]],
+                       n: int) -> List[str]:
+        async with sem:
+            try:
+                resp = await client.post(self.base_url, json=self._payload(messages, n), headers=self.headers)
+                choices = resp.json().get("choices") or []
+                return [c["message"]["content"] for c in choices if c.get("message", {}).get("content")]
+            except Exception as e:
+                logger.warning(f"批量生成请求失败: {e}")
+                return []
+
+    async def generate_many(self, messages: List[Dict[str, str]], n: int) -> List[tuple[bool, str]]:
+        """
+        生成 n 条候选文案
+        :param messages: 提示词
+        :param n: 候选数量
+        :return: 长度为 n 的 [(是否成功, 文案)]，失败项为 (False, "")
+        """
+        if n <= 0:
+            return []
+        if self.provider in self.N_PARAM_PROVIDERS:
+            batches = [min(self.MAX_N_PER_REQUEST, n - i) for i in range(0, n, self.MAX_N_PER_REQUEST)]
+        else:
+            batches = [1] * n
+        sem = asyncio.Semaphore(self.concurrency)
+        timeout = httpx.Timeout(getattr(settings, 'LLM_HTTP_TIMEOUT', 60),
+                                connect=getattr(settings, 'LLM_HTTP_CONNECT_TIMEOUT', 10))
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            groups = await asyncio.gather(*[self._request(client, sem, messages, size) for size in batches])
+        texts = [text for group in groups for text in group][:n]
+        return [(True, text) for text in texts] + [(False, "")] * (n - len(texts))
+
+    def generate_many_sync(self, messages: List[Dict[str, str]], n: int) -> List[tuple[bool, str]]:
+        """供同步代码（视图/调度线程）调用"""
+        return asyncio.run(self.generate_many(messages, n))
+
 #
 # if __name__ == '__main__':
 #     base_url = "https://api.deepseek.com/chat/completions"
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：rateLimiter.py
+@Author  ：LYP
+@Date    ：2026/10/18 15:00
+@description : Twitter API 限流器（令牌桶，由响应头 x-rate-limit-* 校准）
+
+每个 (凭证, 接口) 一个令牌桶：剩余次数 = 桶内令牌，x-rate-limit-reset 时刻整桶补满。
+用户授权请求同时消耗该用户的桶与所属 app（api_key）的桶，后者由 x-app-limit-24hour-* 响应头校准。
+调用前先取令牌，桶空时在 TWITTER_RATE_LIMIT_MAX_WAIT 内等待窗口重置，否则直接抛出 RateLimitExceeded，
+避免把请求打到 429 上。状态保存在 Django 缓存中（TWITTER_RATE_LIMIT_CACHE），
+多进程部署需配置共享缓存（如 Redis）才能在 web 与 worker 间共享。
+RateLimitedClient 在首次访问时才导入 tweepy 并创建，导入本模块不加载 tweepy。
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from utils.utils import logger
+
+# 只替换资源 ID（推文 / 用户 ID 均为长数字），不影响 /2/ 这类版本号
+_ID_SEGMENT = re.compile(r'/\d{3,}(?=/|$)')
+_UNSAFE = re.compile(r'\s+')
+RATE_LIMIT_HEADERS = 'x-rate-limit'
+APP_LIMIT_HEADERS = 'x-app-limit-24hour'
+
+
+class RateLimitExceeded(Exception):
+    """令牌已用尽且窗口重置时间超过最长等待时间"""
+
+    def __init__(self, key: str, reset_at: float):
+        self.key = key
+        self.reset_at = reset_at
+        super().__init__(f"Rate limit exceeded: {key}，{max(0, int(reset_at - time.time()))} 秒后重置")
+
+
+def _fingerprint(value: str) -> str:
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+def endpoint_of(method: str, route: str) -> str:
+    """/2/tweets/123 -> GET:/2/tweets/:id，同一接口的不同资源共用一个桶；不含空白，可直接用作缓存键"""
+    return _UNSAFE.sub('_', f"{method.upper()}:{_ID_SEGMENT.sub('/:id', route)}")
+
+
+def rate_limit_key(method: str, route: str, api_key: str, access_token: str | None = None) -> str:
+    """用户授权请求按用户令牌计数，应用授权请求按 api_key 计数（与 Twitter 的计数口径一致）"""
+    if access_token:
+        return f"user:{_fingerprint(access_token)}:{endpoint_of(method, route)}"
+    return f"app:{_fingerprint(api_key)}:{endpoint_of(method, route)}"
+
+
+def rate_limit_buckets(method: str, route: str, api_key: str,
+                       access_token: str | None = None) -> list[tuple[str, str]]:
+    """
+    一次请求需要消耗的令牌桶 [(桶键, 校准用的响应头前缀)]
+    应用授权只计 app 桶；用户授权先计所属 app 的按日总量桶，再计用户桶
+    """
+    if not access_token:
+        return [(rate_limit_key(method, route, api_key), RATE_LIMIT_HEADERS)]
+    return [(rate_limit_key(method, route, api_key), APP_LIMIT_HEADERS),
+            (rate_limit_key(method, route, api_key, access_token), RATE_LIMIT_HEADERS)]
+
+
+class TwitterRateLimiter(object):
+    def __init__(self, cache_alias: str | None = None, max_wait: float | None = None):
+        self.cache = caches[cache_alias or getattr(settings, 'TWITTER_RATE_LIMIT_CACHE', 'default')]
+        self.max_wait = max_wait if max_wait is not None else getattr(settings, 'TWITTER_RATE_LIMIT_MAX_WAIT', 60)
+
+    @staticmethod
+    def _keys(key: str) -> tuple[str, str]:
+        return f"twrl:{key}:remaining", f"twrl:{key}:reset"
+
+    def acquire(self, key: str) -> None:
+        """取一个令牌；桶状态未知时放行，由本次响应头初始化"""
+        remaining_key, reset_key = self._keys(key)
+        reset_at = self.cache.get(reset_key)
+        if reset_at is None:
+            return
+        try:
+            remaining = self.cache.decr(remaining_key)
+        except ValueError:
+            return
+        if remaining >= 0:
+            return
+        wait = reset_at - time.time()
+        if wait <= 0:
+            return
+        if wait > self.max_wait:
+            raise RateLimitExceeded(key, reset_at)
+        logger.info(f"限流 {key} 令牌已用尽，等待 {wait:.1f} 秒")
+        time.sleep(wait)
+
+    def release(self, key: str) -> None:
+        """归还 acquire 取走的令牌（同一请求的后续桶取令牌失败时调用）"""
+        try:
+            self.cache.incr(self._keys(key)[0])
+        except ValueError:
+            pass
+
+    def update(self, key: str, headers, prefix: str = RATE_LIMIT_HEADERS) -> None:
+        """按响应头校准桶内令牌数与重置时间"""
+        remaining = headers.get(f'{prefix}-remaining')
+        reset_at = headers.get(f'{prefix}-reset')
+        if remaining is None or reset_at is None:
+            return
+        self._store(key, int(remaining), float(reset_at))
+
+    def exhaust(self, key: str, headers=None, prefix: str = RATE_LIMIT_HEADERS) -> None:
+        """收到 429：清空令牌直到重置时间（响应头缺失时按 RATE_LIMIT_DEFAULT_BACKOFF_SECONDS 退避）"""
+        reset_at = (headers or {}).get(f'{prefix}-reset')
+        if reset_at is None:
+            reset_at = time.time() + getattr(settings, 'RATE_LIMIT_DEFAULT_BACKOFF_SECONDS', 300)
+        self._store(key, 0, float(reset_at))
+
+    def acquire_buckets(self, buckets: list[tuple[str, str]]) -> None:
+        """依次从每个桶取令牌；任一桶失败时归还已取的令牌再抛出"""
+        acquired = []
+        try:
+            for key, _ in buckets:
+                self.acquire(key)
+                acquired.append(key)
+        except RateLimitExceeded:
+            for key in acquired:
+                self.release(key)
+            raise
+
+    def update_buckets(self, buckets: list[tuple[str, str]], headers) -> None:
+        for key, prefix in buckets:
+            self.update(key, headers, prefix)
+
+    def exhaust_buckets(self, buckets: list[tuple[str, str]], headers=None) -> str:
+        """
+        收到 429：清空响应头显示已用尽的桶，无法判断时清空最细粒度的桶
+        :return: 被清空的桶键（用于异常信息）
+        """
+        headers = headers or {}
+        limited = [(key, prefix) for key, prefix in buckets if headers.get(f'{prefix}-remaining') == '0']
+        for key, prefix in limited or buckets[-1:]:
+            self.exhaust(key, headers, prefix)
+        return (limited or buckets[-1:])[0][0]
+
+    def _store(self, key: str, remaining: int, reset_at: float) -> None:
+        remaining_key, reset_key = self._keys(key)
+        timeout = max(1, int(reset_at - time.time()) + 5)
+        self.cache.set_many({remaining_key: remaining, reset_key: reset_at}, timeout=timeout)
+
+    def snapshot(self, key: str) -> dict:
+        remaining_key, reset_key = self._keys(key)
+        values = self.cache.get_many([remaining_key, reset_key])
+        return {'remaining': values.get(remaining_key), 'reset_at': values.get(reset_key)}
+
+
+_limiter = None
+
+
+def get_rate_limiter() -> TwitterRateLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = TwitterRateLimiter()
+    return _limiter
+
+
+_client_class = None
+
+
+def _rate_limited_client_class():
+    global _client_class
+    if _client_class is None:
+        from tweepy import Client
+        from tweepy.errors import TooManyRequests
+
+        class RateLimitedClient(Client):
+            """所有请求先经过限流器取令牌，并用响应头回写桶状态"""
+
+            def request(self, method, route, params=None, json=None, user_auth=False):
+                buckets = rate_limit_buckets(method, route, self.consumer_key or self.bearer_token or '',
+                                             self.access_token if user_auth else None)
+                limiter = get_rate_limiter()
+                limiter.acquire_buckets(buckets)
+                try:
+                    response = super().request(method, route, params=params, json=json, user_auth=user_auth)
+                except TooManyRequests as e:
+                    limiter.exhaust_buckets(buckets, e.response.headers)
+                    raise
+                limiter.update_buckets(buckets, response.headers)
+                return response
+
+        _client_class = RateLimitedClient
+    return _client_class
+
+
+def __getattr__(name):
+    # from utils.rateLimiter import RateLimitedClient 时才加载 tweepy
+    if name == 'RateLimitedClient':
+        return _rate_limited_client_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
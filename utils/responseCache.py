@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：responseCache.py
+@Author  ：LYP
+@Date    ：2026/10/18 16:00
+@description : 统计看板响应缓存（按数据所属用户分版本，写入时失效）
+
+缓存键 = 视图名 + 可见范围(全部/某用户) + 该范围的版本号 + 查询参数摘要。
+文章/运行统计写入时递增对应用户及“全部”范围的版本号，旧键自然失效，无需逐个删除。
+缓存后端通过 STATS_CACHE_ALIAS 选择 CACHES 中的别名（本地内存或 Redis）。
+"""
+import functools
+import hashlib
+import threading
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from utils.utils import logger
+
+_ALL = 'all'
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_view_stats: dict = {}
+
+
+def _cache():
+    return caches[getattr(settings, 'STATS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(scope) -> str:
+    return f'statscache:ver:{scope}'
+
+
+def _get_version(scope) -> int:
+    return _cache().get_or_set(_version_key(scope), 1, timeout=None)
+
+
+def _bump(scope) -> None:
+    cache = _cache()
+    try:
+        cache.incr(_version_key(scope))
+    except ValueError:
+        cache.add(_version_key(scope), 2, timeout=None)
+
+
+def invalidate_stats_cache(owner_ids: Iterable[int | None] = ()) -> None:
+    """数据写入后调用：使相关用户及超级管理员“全部”范围的缓存失效"""
+    try:
+        for owner_id in set(owner_ids):
+            if owner_id is not None:
+                _bump(owner_id)
+        _bump(_ALL)
+    except Exception as e:
+        # 缓存不可用不影响写入流程
+        logger.warning(f"统计缓存失效失败: {e}")
+        return
+    with _lock:
+        _stats['invalidations'] += 1
+
+
+def request_scope(request, superuser_all: bool = True):
+    """请求的数据可见范围：超级管理员未指定 enterprise_id 时为全部，否则为具体用户ID"""
+    if superuser_all and request.user.is_superuser:
+        return request.query_params.get('enterprise_id') or _ALL
+    return request.user.id
+
+
+def _record(name: str, hit: bool) -> None:
+    field = 'hits' if hit else 'misses'
+    with _lock:
+        _stats[field] += 1
+        view = _view_stats.setdefault(name, {'hits': 0, 'misses': 0})
+        view[field] += 1
+
+
+def cached_stats_response(name: str, superuser_all: bool = True, timeout: int | None = None):
+    """
+    APIView.get 装饰器：缓存成功的 JSON 响应体（code == 200），非 JSON 响应（如 CSV 导出）不缓存
+    :param name: 视图名，参与缓存键与命中率统计
+    :param superuser_all: 超级管理员是否可查看全部用户数据（否则始终按当前用户）
+    :param timeout: 过期秒数，默认 STATS_CACHE_TTL
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            if not getattr(settings, 'STATS_CACHE_ENABLED', True):
+                return func(self, request, *args, **kwargs)
+            scope = request_scope(request, superuser_all)
+            params = '&'.join(f'{k}={v}' for k, v in sorted(request.query_params.items()))
+            digest = hashlib.md5(params.encode('utf-8')).hexdigest()
+            try:
+                key = f'statscache:{name}:{scope}:{_get_version(scope)}:{digest}'
+                data = _cache().get(key)
+            except Exception as e:
+                logger.warning(f"读取统计缓存失败: {e}")
+                return func(self, request, *args, **kwargs)
+            if data is not None:
+                _record(name, True)
+                return Response(data)
+            _record(name, False)
+            response = func(self, request, *args, **kwargs)
+            if isinstance(response, Response) and isinstance(response.data, dict) \
+                    and response.data.get('code') == 200:
+                ttl = timeout if timeout is not None else getattr(settings, 'STATS_CACHE_TTL', 300)
+                _cache().set(key, response.data, timeout=ttl)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def get_stats_cache_stats() -> dict:
+    """命中率统计（进程内）"""
+    with _lock:
+        stats = dict(_stats)
+        views = {name: dict(item) for name, item in _view_stats.items()}
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0
+    stats['views'] = views
+    return stats
@@ -9,22 +9,30 @@
 """
 from distutils.log import fatal
 
+import queue
 import requests
 import random
 import json
 from typing import List, Dict
-from datetime import datetime
+from datetime import date, datetime
 
-from ai.models import AIConfig
-from social.models import PoolAccount
-from tasks.models import SimpleTaskRun
-from utils.largeModelUnit import LargeModelUnit
-from utils.twitterUnit import TwitterUnit, createTaskDetail
+from django.conf import settings
+
+from social.models import PoolAccount, AccountDailyUsage
+from social.utils import account_credentials, decrypt_accounts
+from ai.router import get_router
+from utils.twitterClientCache import get_twitter_client
+from utils.twitterUnit import createTaskDetail
 from models.models import TasksSimpletaskrun, TasksSimpletask, SocialPoolaccount, TasksSimpletaskSelectedAccounts
 from stats.utils import record_success_run
+from utils.accountExecutor import run_account_tasks
+from utils.dbConnections import db_connection_scope
+from utils.configCache import get_ai_config, get_ai_configs, get_ai_config_by_id, get_prompt
+from utils.copyBuffer import pop_copies, refill_copy_buffer_async
 from utils.utils import generate_message, logger, merge_text
 
 
+@db_connection_scope
 def run_timing_task(task_id):
     """
     执行定时任务
@@ -36,74 +44,187 @@ def run_timing_task(task_id):
         robot_ids = [item["poolaccount_id"] for item in robotList]
         accounts = SocialPoolaccount.objects.filter(id__in=robot_ids)
 
-        for acc in accounts:
-            process_account_task(acc, task)
+        summary = run_task_for_accounts(task, accounts, use_buffer=True)
+        logger.info(f"定时任务 {task_id} 执行完成: 成功 {summary['ok']} 个, 失败 {summary['error']} 个")
+        # 发帖完成后在后台为下一次触发补充文案
+        refill_copy_buffer_async(task)
 
     except Exception as e:
         logger.error(f"执行定时任务失败: {e}")
         raise Exception(f"执行定时任务失败: {str(e)}")
 
 
-def process_account_task(account, task):
-    """处理单个账号的任务执行"""
-    # 使用限制检查
-    if getattr(account, 'usage_policy', 'unlimited') == 'limited':
-        today = datetime.now().date()
-        used_today = SimpleTaskRun.objects.filter(account=account, created_at__date=today).count()
-        if used_today >= 2:
+def run_task_for_accounts(task, accounts, on_result=None, use_buffer=False, job_id=None):
+    """
+    多账号执行入口：先按账号数一次性批量生成文案，再并发发布
+    :param task: 任务
+    :param accounts: 账号列表
+    :param on_result: 每账号完成回调，透传给 run_account_tasks
+    :param use_buffer: 优先使用预生成缓冲区中的文案（定时任务），不足部分再实时生成
+    :param job_id: 所属执行作业ID，写入每条运行明细
+    """
+    accounts = list(accounts)
+    # 受限账号先占用当日额度，已达上限的账号不参与本次文案生成；日期只取一次，占用与归还落在同一天
+    quota_day = date.today()
+    blocked = {account.id for account in accounts if not reserve_daily_quota(account, quota_day)}
+    runnable = len(accounts) - len(blocked)
+    # 全部账号令牌一次批量解密并写入明文缓存，各账号执行时直接命中
+    decrypt_accounts([account for account in accounts if account.id not in blocked])
+    # 配置与提示词只解析一次，逐层传给生成与记录环节
+    cfg = get_ai_config()
+    prompt = get_prompt(task.prompt_id) if task.exec_prom_text else None
+    copies = queue.SimpleQueue()
+    buffered = []
+    if use_buffer and runnable:
+        try:
+            buffered = pop_copies(task, runnable)
+        except Exception as e:
+            logger.warn(f"任务 {task.id} 读取预生成文案失败：{e}")
+    for item in buffered:
+        copies.put(item)
+    if runnable > len(buffered):
+        for item in generate_ai_texts(task, cfg, runnable - len(buffered), prompt=prompt):
+            copies.put(item)
+
+    def handler(account, task):
+        if account.id in blocked:
+            logger.info(f"账号 {account.id} 已达每日使用上限")
+            return None
+        try:
+            generated = copies.get_nowait()
+        except queue.Empty:
+            generated = None
+        return process_account_task(account, task, cfg=cfg, generated=generated, prompt=prompt, job_id=job_id,
+                                    quota_day=quota_day)
+
+    return run_account_tasks(task, accounts, handler, on_result=on_result)
+
+
+def reserve_daily_quota(account, day=None) -> bool:
+    """使用限制检查：受限账号检查并占用 day（默认当天）的额度（单条条件 UPDATE，并发执行不会超额），不限次账号直接通过"""
+    if getattr(account, 'usage_policy', 'unlimited') != 'limited':
+        return True
+    return AccountDailyUsage.reserve(account.id, settings.ACCOUNT_LIMITED_DAILY_QUOTA, day)
+
+
+def release_daily_quota(account, day=None) -> None:
+    """未发出任何内容时归还占用的额度；day 须与占用时一致，跨零点执行也归还到同一天"""
+    if getattr(account, 'usage_policy', 'unlimited') != 'limited':
+        return
+    AccountDailyUsage.release(account.id, day)
+
+
+def process_account_task(account, task, cfg=None, generated=None, prompt=None, job_id=None, quota_day=None):
+    """
+    处理单个账号的任务执行
+    :param cfg: 已解析的 AI 配置，为空时从配置缓存读取
+    :param generated: 预先生成的 (文案, ai_meta)，为空时实时生成
+    :param prompt: 已解析的提示词，为空时从配置缓存读取
+    :param job_id: 所属执行作业ID
+    :param quota_day: 调用方已占用额度的日期（run_task_for_accounts 在生成文案前统一占用），为空时在此占用当天额度
+    """
+    if quota_day is None:
+        quota_day = date.today()
+        if not reserve_daily_quota(account, quota_day):
             logger.info(f"账号 {account.id} 已达每日使用上限")
             return
+    try:
+        cfg, final_text = _prepare_text(task, cfg, generated, prompt)
+    except Exception:
+        release_daily_quota(account, quota_day)
+        raise
+    if task.provider != 'twitter' or not final_text:
+        # 未发出任何内容，不计入当日次数
+        release_daily_quota(account, quota_day)
+        return False
+    # 已尝试发布：无论成功与否都计入当日次数，持续失败的受限账号同样受每日上限约束
+    return send_to_twitter(account, task, cfg, final_text, prompt=prompt, job_id=job_id)
 
-    cfg = AIConfig.objects.filter(enabled=True).first()
+
+def _prepare_text(task, cfg, generated, prompt):
+    """生成（或使用预生成的）文案，返回 (实际生成文案的配置, 最终发布文本)"""
+    if cfg is None:
+        cfg = get_ai_config()
     # AI文本生成
-    text, ai_meta = generate_ai_text(task, cfg)
+    if generated and generated[0]:
+        text, ai_meta = generated
+    else:
+        text, ai_meta = generate_ai_text(task, cfg, prompt=prompt)
+    # 路由失败切换后，运行记录按实际生成文案的配置落库
+    cfg = get_ai_config_by_id(ai_meta.get('config_id')) or cfg
     final_text = merge_text(task, text)
     logger.info(f"为账号 {task.id} 生成的文本：{final_text}")
-    # 发布到平台
-    if task.provider == 'twitter':
-        flags = send_to_twitter(account, task, cfg, final_text)
-    return flags
-
-def generate_ai_text(task, cfg):
-    """调用AI模型生成文本"""
-    global text, flag
+    return cfg, final_text
+
+
+def _route_candidates(cfg):
+    """路由候选：全部启用的配置，显式传入但未在其中的配置一并参与"""
+    configs = list(get_ai_configs())
+    if cfg is not None and all(item.id != cfg.id for item in configs):
+        configs.insert(0, cfg)
+    return configs
+
+
+def generate_ai_text(task, cfg, prompt=None):
+    """调用AI模型生成文本（经厂商路由，首选失败时切换到下一个配置）"""
+    # 多账号并发执行时不能共享模块级变量，必须使用局部变量
     try:
-        cli = LargeModelUnit(cfg.model, cfg.api_key, cfg.base_url)
-        messages = generate_message(task)
-        if cfg.provider == "openai":
-            flag, text = cli.generateToOpenAI(messages=messages)
-        elif cfg.provider == "deepseek":
-            flag, text = cli.generateToDeepSeek(messages=messages)
-        else:
-            pass
-        text = text + "\n" + task.last_text
-        logger.info(f"调用模型成功，返回结果：{text}")
-        if flag:
-            ai_meta = {
-                'model': cfg.model,
-                'provider': cfg.provider,
-                'final_text': text,
-                'language': getattr(task, 'language', 'auto'),
-            }
-
-            return text, ai_meta
+        messages = generate_message(task, prompt)
+        used, text = get_router().generate(messages, _route_candidates(cfg))
+        if used is not None:
+            text = text + "\n" + task.last_text
+            logger.info(f"调用模型成功，返回结果：{text}")
+            return text, _build_ai_meta(task, used, text)
+        logger.warn(f"为账号 {task.id} 调用模型失败：无可用的 AI 配置")
     except Exception as e:
         print(f"调用模型失败：\n:${repr(e)}")
         logger.warn(f"为账号 {task.id} 调用模型失败：{e}")
     return '', {}
 
 
-def send_to_twitter(account, task, cfg, content):
+def generate_ai_texts(task, cfg, n, prompt=None):
+    """
+    同一任务批量生成 n 条文案（所有账号共用同一提示词，一个往返窗口内完成）
+    :return: [(文案, ai_meta)]，失败项为 ('', {})；无可用配置时返回空列表，由各账号实时生成
+    """
+    if n <= 0:
+        return []
+    try:
+        results = get_router().generate_many(generate_message(task, prompt), n, _route_candidates(cfg))
+    except Exception as e:
+        logger.warn(f"任务 {task.id} 批量生成文案失败：{e}")
+        return []
+    if not results:
+        return []
+    items = []
+    for used, text in results:
+        text = text + "\n" + task.last_text
+        items.append((text, _build_ai_meta(task, used, text)))
+    items.extend([('', {})] * (n - len(items)))
+    logger.info(f"任务 {task.id} 批量生成文案 {sum(1 for t, _ in items if t)}/{n} 条")
+    return items
+
+
+def _build_ai_meta(task, cfg, text):
+    return {
+        'config_id': cfg.id,
+        'model': cfg.model,
+        'provider': cfg.provider,
+        'final_text': text,
+        'language': getattr(task, 'language', 'auto'),
+    }
+
+
+def send_to_twitter(account, task, cfg, content, prompt=None, job_id=None):
     """发送推文"""
     try:
-        api_key = account.api_key
-        api_secret = account.api_secret
-        at = account.access_token
-        ats = account.access_token_secret
-        client = TwitterUnit(api_key, api_secret, at, ats)
+        api_key, api_secret, at, ats = account_credentials(account)
+        # 同一账号复用客户端及其连接池
+        client = get_twitter_client(account.id, api_key, api_secret, at, ats)
 
         if task.type == 'post':
-            flags, resp = client.sendTwitter(content, int(account.id), task, cfg, userId=task.owner_id)
+            flags, resp = client.sendTwitter(content, int(account.id), task, cfg, userId=task.owner_id,
+                                               prompt=prompt, jobId=job_id)
             logger.info(f"推文发送成功响应: {resp}")
             try:
                 record_success_run(
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：schedulerLeader.py
+@Author  ：LYP
+@Date    ：2026/10/18 19:00
+@description : 调度器主节点选举（PostgreSQL 会话级 advisory lock）
+
+多个 run_scheduler 副本同时运行时，只有拿到锁的进程触发任务，其余进程待命轮询。
+锁绑定在数据库会话上：主节点进程退出或连接断开时由数据库自动释放，待命副本下一轮即可接管。
+非 PostgreSQL 数据库（本地开发）不做选举，直接视为主节点。
+"""
+from django.db import connections
+
+from utils.utils import logger
+
+
+class SchedulerLeaderLock(object):
+    def __init__(self, key: int, using: str = 'default'):
+        self.key = key
+        self.using = using
+        self.held = False
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def acquire(self) -> bool:
+        """尝试成为主节点（不阻塞）"""
+        if self.connection.vendor != 'postgresql':
+            self.held = True
+            return True
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT pg_try_advisory_lock(%s)', [self.key])
+                self.held = bool(cursor.fetchone()[0])
+        except Exception as e:
+            logger.warning(f"获取调度器主节点锁失败: {e}")
+            self._reset()
+        return self.held
+
+    def is_held(self) -> bool:
+        """确认锁仍然有效：会话级锁随连接存活，连接失效即视为失去主节点身份"""
+        if not self.held or self.connection.vendor != 'postgresql':
+            return self.held
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Exception as e:
+            logger.warning(f"调度器主节点连接失效: {e}")
+            self._reset()
+        return self.held
+
+    def release(self) -> None:
+        if self.held and self.connection.vendor == 'postgresql':
+            try:
+                with self.connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [self.key])
+            except Exception as e:
+                logger.warning(f"释放调度器主节点锁失败: {e}")
+        self.held = False
+
+    def _reset(self) -> None:
+        self.held = False
+        # 丢弃失效连接，下次使用时重新建立
+        self.connection.close()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：streamExport.py
+@Author  ：LYP
+@Date    ：2026/10/18 16:30
+@description : 流式导出（CSV / NDJSON）
+
+查询集通过 .iterator(chunk_size) 分批读取（PostgreSQL 下为服务端游标），
+逐行编码后交给 StreamingHttpResponse，内存占用与导出行数无关。
+"""
+import csv
+import json
+from typing import Iterable, Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+class _Echo(object):
+    """csv.writer 的伪文件对象：write 直接返回编码后的行"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, fields: list[str], chunk_size: int = 2000) -> Iterator[dict]:
+    return queryset.values(*fields).iterator(chunk_size=chunk_size)
+
+
+def iter_csv(rows: Iterable[dict], fields: list[str], headers: list[str] | None = None) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers or fields)
+    for row in rows:
+        yield writer.writerow([row.get(field) for field in fields])
+
+
+def iter_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def streaming_export(queryset, fields: list[str], filename: str, export_format: str = 'csv',
+                     headers: list[str] | None = None, chunk_size: int = 2000) -> StreamingHttpResponse:
+    """
+    构造流式导出响应
+    :param queryset: 已过滤/排序的查询集
+    :param fields: 导出字段（values() 字段名，支持跨表 a__b）
+    :param filename: 下载文件名（不含扩展名）
+    :param export_format: csv / ndjson
+    :param headers: CSV 表头，默认使用字段名
+    :param chunk_size: 每批从数据库读取的行数
+    """
+    rows = iter_rows(queryset, fields, chunk_size)
+    if export_format == 'ndjson':
+        response = StreamingHttpResponse(iter_ndjson(rows), content_type='application/x-ndjson; charset=utf-8')
+    else:
+        export_format = 'csv'
+        response = StreamingHttpResponse(iter_csv(rows, fields, headers), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
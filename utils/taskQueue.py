@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：taskQueue.py
+@Author  ：LYP
+@Date    ：2026/10/18 11:00
+@description : 任务执行队列（run 接口入队，worker 进程执行）
+
+后端通过 settings.TASK_QUEUE_BACKEND 选择：
+- database: 作业表本身即队列（默认，无需额外服务）
+- redis:    作业ID经 Redis 列表分发，作业状态仍落库
+- local:    进程内内存队列，仅用于测试/本地调试
+"""
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from utils.utils import logger
+
+
+class BaseQueueBackend(ABC):
+    @abstractmethod
+    def push(self, job_id: str) -> None:
+        """作业入队"""
+
+    @abstractmethod
+    def pop(self, timeout: float) -> str | None:
+        """取出下一个待执行作业ID，超时返回 None"""
+
+
+class DatabaseQueueBackend(BaseQueueBackend):
+    """以 TaskJob 表为队列，worker 轮询 queued 状态的作业"""
+
+    def __init__(self, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+
+    def push(self, job_id: str) -> None:
+        # 作业行写入即入队
+        pass
+
+    def pop(self, timeout: float) -> str | None:
+        from tasks.models import TaskJob
+        deadline = time.monotonic() + timeout
+        while True:
+            job_id = TaskJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True).first()
+            if job_id:
+                return str(job_id)
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+
+class RedisQueueBackend(BaseQueueBackend):
+    def __init__(self, url: str, key: str = 'clipai:task_jobs'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.key = key
+
+    def push(self, job_id: str) -> None:
+        self.client.lpush(self.key, str(job_id))
+
+    def pop(self, timeout: float) -> str | None:
+        item = self.client.brpop(self.key, timeout=max(1, int(timeout)))
+        if not item:
+            return None
+        return item[1].decode()
+
+
+class LocalQueueBackend(BaseQueueBackend):
+    """进程内队列，测试环境替身"""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def push(self, job_id: str) -> None:
+        self.queue.put(str(job_id))
+
+    def pop(self, timeout: float) -> str | None:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_queue_backend() -> BaseQueueBackend:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = getattr(settings, 'TASK_QUEUE_BACKEND', 'database')
+            if name == 'redis':
+                _backend = RedisQueueBackend(settings.REDIS_URL)
+            elif name == 'local':
+                _backend = LocalQueueBackend()
+            else:
+                _backend = DatabaseQueueBackend(getattr(settings, 'TASK_QUEUE_POLL_INTERVAL', 1.0))
+        return _backend
+
+
+def enqueue_task_job(task, account_ids: Iterable[int]):
+    """创建作业并入队（作业归属任务所有者），返回 TaskJob"""
+    from tasks.models import TaskJob
+    account_ids = list(account_ids)
+    job = TaskJob.objects.create(task_id=task.id, owner_id=task.owner_id, account_ids=account_ids,
+                                 total=len(account_ids))
+    get_queue_backend().push(str(job.id))
+    logger.info(f"任务 {task.id} 已入队，作业ID: {job.id}，账号数: {len(account_ids)}")
+    return job
+
+
+def claim_job(job_id: str):
+    """将 queued 作业原子地置为 running，多个 worker 竞争时只有一个成功"""
+    from tasks.models import TaskJob
+    claimed = TaskJob.objects.filter(id=job_id, status='queued').update(status='running', started_at=timezone.now())
+    if not claimed:
+        return None
+    return TaskJob.objects.select_related('task').get(id=job_id)
+
+
+def execute_job(job) -> None:
+    """执行作业：并发处理各账号并逐个回写进度"""
+    from social.models import PoolAccount
+    from utils.accountExecutor import save_task_summary
+    from utils.runTimingTask import run_task_for_accounts
+
+    task = job.task
+    account_ids = job.account_ids or []
+
+    def on_result(result):
+        # 回调在 worker 主线程中串行执行，不会并发写同一行
+        job.progress[str(result['account_id'])] = {'ok': result['ok'], 'error': result['error']}
+        if result['ok']:
+            job.ok_count += 1
+        else:
+            job.err_count += 1
+        job.save(update_fields=['progress', 'ok_count', 'err_count'])
+
+    try:
+        # 运行前：将所选账号设为激活
+        if account_ids:
+            PoolAccount.objects.filter(id__in=account_ids).update(status='active')
+        accounts = PoolAccount.objects.filter(id__in=account_ids)
+        summary = run_task_for_accounts(task, accounts, on_result=on_result, job_id=job.id)
+        if account_ids:
+            PoolAccount.objects.filter(id__in=account_ids, status='active').update(status='inactive')
+        save_task_summary(task, summary['ok'], summary['error'])
+        if summary['ok'] and not summary['error']:
+            job.status = 'success'
+        elif summary['ok']:
+            job.status = 'partial'
+        else:
+            job.status = 'error'
+    except Exception as e:
+        logger.error(f"执行作业 {job.id} 失败: {e}")
+        job.status = 'error'
+        job.error_message = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error_message', 'finished_at'])
+
+
+def recover_jobs() -> None:
+    """worker 启动时的恢复：长时间未结束的作业标记失败（不重跑，避免重复发帖），排队中的作业重新入队"""
+    from tasks.models import TaskJob
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'TASK_QUEUE_STALE_SECONDS', 3600))
+    TaskJob.objects.filter(status='running', started_at__lt=stale_before).update(
+        status='error', error_message='worker 中断', finished_at=timezone.now())
+    backend = get_queue_backend()
+    if not isinstance(backend, DatabaseQueueBackend):
+        for job_id in TaskJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True):
+            backend.push(str(job_id))
+
+
+def run_worker(once: bool = False, timeout: float = 5.0) -> int:
+    """
+    worker 主循环
+    :param once: 为 True 时处理完当前队列即返回
+    :param timeout: 单次取作业的等待时间（秒）
+    :return: 已执行作业数
+    """
+    backend = get_queue_backend()
+    executed = 0
+    while True:
+        close_old_connections()
+        job_id = backend.pop(timeout)
+        if job_id is None:
+            if once:
+                return executed
+            continue
+        job = claim_job(job_id)
+        if job is None:
+            continue
+        logger.info(f"开始执行作业 {job.id}（任务 {job.task_id}）")
+        execute_job(job)
+        executed += 1
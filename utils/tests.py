@@ -0,0 +1,427 @@
+import threading
+import time
+import warnings
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase, override_settings
+
+from utils import accountExecutor
+from utils.accountExecutor import run_account_tasks
+
+
+class RunAccountTasksTests(SimpleTestCase):
+    def setUp(self):
+        accountExecutor._provider_semaphores.clear()
+        self.task = SimpleNamespace(id=1, provider='twitter')
+
+    def _accounts(self, n):
+        return [SimpleNamespace(id=i, provider='twitter') for i in range(n)]
+
+    def test_summary_keeps_account_order_and_counts(self):
+        def handler(account, task):
+            if account.id == 2:
+                raise Exception('boom')
+            return account.id % 2 == 0
+
+        summary = run_account_tasks(self.task, self._accounts(5), handler, max_workers=3)
+        self.assertEqual(summary['ok'], 2)
+        self.assertEqual(summary['error'], 3)
+        self.assertEqual([r['account_id'] for r in summary['results']], [0, 1, 2, 3, 4])
+        self.assertEqual(summary['results'][2]['error'], 'boom')
+
+    @override_settings(TASK_EXEC_PROVIDER_LIMITS={'twitter': 2})
+    def test_provider_limit_bounds_concurrency(self):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0}
+
+        def handler(account, task):
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            time.sleep(0.02)
+            with lock:
+                state['running'] -= 1
+            return True
+
+        summary = run_account_tasks(self.task, self._accounts(8), handler, max_workers=8)
+        self.assertEqual(summary['ok'], 8)
+        self.assertLessEqual(state['peak'], 2)
+
+
+def start_fake_llm_server():
+    """本地 OpenAI 兼容桩服务：按请求的 n 返回对应数量的 choices，并记录每次请求体"""
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            received.append(payload)
+            choices = [{'message': {'content': 'hi'}} for _ in range(payload.get('n', 1))]
+            body = json.dumps({'choices': choices}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/chat/completions', received
+
+
+class SharedHttpClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server, self.url, _ = start_fake_llm_server()
+
+    def tearDown(self):
+        from utils.httpSession import close_http_clients
+        close_http_clients()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused_per_host(self):
+        from utils.httpSession import get_http_stats
+        from utils.largeModelUnit import LargeModelUnit
+        before = get_http_stats()
+        cli = LargeModelUnit('m', 'k', self.url)
+        for _ in range(3):
+            self.assertEqual(cli.generateToOpenAI([{'role': 'user', 'content': 'x'}]), (True, 'hi'))
+        after = get_http_stats()
+        self.assertEqual(after['requests'] - before['requests'], 3)
+        self.assertEqual(after['new_connections'] - before['new_connections'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+        self.assertEqual(after['hits'] - before['hits'], 2)
+
+
+class AsyncLargeModelUnitTests(SimpleTestCase):
+    def setUp(self):
+        self.server, self.url, self.received = start_fake_llm_server()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_n_parameter_batches_requests(self):
+        from utils.largeModelUnit import AsyncLargeModelUnit
+        cli = AsyncLargeModelUnit('m', 'k', self.url, provider='openai')
+        results = cli.generate_many_sync([{'role': 'user', 'content': 'x'}], 10)
+        self.assertEqual(results, [(True, 'hi')] * 10)
+        self.assertEqual(sorted(p.get('n', 1) for p in self.received), [2, 8])
+
+    def test_providers_without_n_fan_out(self):
+        from utils.largeModelUnit import AsyncLargeModelUnit
+        cli = AsyncLargeModelUnit('m', 'k', self.url, provider='deepseek', concurrency=2)
+        results = cli.generate_many_sync([{'role': 'user', 'content': 'x'}], 3)
+        self.assertEqual(results, [(True, 'hi')] * 3)
+        self.assertEqual(len(self.received), 3)
+        self.assertTrue(all('n' not in p for p in self.received))
+
+
+class RunTaskForAccountsTests(SimpleTestCase):
+    def test_quota_blocked_accounts_get_no_generated_copy(self):
+        from unittest import mock
+        from utils import runTimingTask
+        task = SimpleNamespace(id=7, prompt_id=None, exec_prom_text=False, provider='twitter')
+        accounts = [SimpleNamespace(id=i, provider='twitter', usage_policy='limited' if i < 2 else 'unlimited')
+                    for i in range(4)]
+        sent = []
+        with mock.patch.object(runTimingTask.AccountDailyUsage, 'reserve', side_effect=lambda account_id, limit, day: account_id == 1) as reserve, \
+                mock.patch.object(runTimingTask, 'decrypt_accounts'), \
+                mock.patch.object(runTimingTask, 'get_ai_config', return_value=None), \
+                mock.patch.object(runTimingTask, 'generate_ai_texts', return_value=[('t', {})] * 3) as generate, \
+                mock.patch.object(runTimingTask, 'process_account_task',
+                                  side_effect=lambda account, task, **kwargs: sent.append((account.id, kwargs)) or True):
+            summary = runTimingTask.run_task_for_accounts(task, accounts)
+        # 账号 0 已达上限：只为 3 个账号生成文案，也不会再执行
+        self.assertEqual(generate.call_args.args[2], 3)
+        self.assertEqual(reserve.call_count, 2)
+        day = reserve.call_args.args[2]
+        self.assertEqual(sorted(account_id for account_id, _ in sent), [1, 2, 3])
+        # 占用与执行使用同一日期，跨零点时归还也落在占用的那一天
+        self.assertTrue(all(kwargs['quota_day'] == day and kwargs['generated'] == ('t', {}) for _, kwargs in sent))
+        self.assertEqual((summary['ok'], summary['error']), (3, 1))
+
+    def test_quota_released_only_when_nothing_sent(self):
+        from datetime import date
+        from unittest import mock
+        from utils import runTimingTask
+        day = date(2026, 10, 18)
+        account = SimpleNamespace(id=1, usage_policy='limited')
+        twitter = SimpleNamespace(id=7, provider='twitter')
+        with mock.patch.object(runTimingTask.AccountDailyUsage, 'release') as release, \
+                mock.patch.object(runTimingTask, '_prepare_text', return_value=(None, 'text')), \
+                mock.patch.object(runTimingTask, 'send_to_twitter', side_effect=[True, False, RuntimeError('down')]):
+            self.assertTrue(runTimingTask.process_account_task(account, twitter, quota_day=day))
+            # 已尝试发布：失败或异常都不归还，持续失败的账号仍受每日上限约束
+            self.assertFalse(runTimingTask.process_account_task(account, twitter, quota_day=day))
+            with self.assertRaises(RuntimeError):
+                runTimingTask.process_account_task(account, twitter, quota_day=day)
+            release.assert_not_called()
+            self.assertFalse(runTimingTask.process_account_task(account, SimpleNamespace(id=8, provider='x'),
+                                                                quota_day=day))
+        with mock.patch.object(runTimingTask.AccountDailyUsage, 'release') as release2, \
+                mock.patch.object(runTimingTask, '_prepare_text', side_effect=[(None, ''), RuntimeError('llm')]), \
+                mock.patch.object(runTimingTask, 'send_to_twitter') as send:
+            self.assertFalse(runTimingTask.process_account_task(account, twitter, quota_day=day))
+            with self.assertRaises(RuntimeError):
+                runTimingTask.process_account_task(account, twitter, quota_day=day)
+            send.assert_not_called()
+        self.assertEqual(release.call_args_list, [mock.call(1, day)])
+        self.assertEqual(release2.call_args_list, [mock.call(1, day), mock.call(1, day)])
+
+
+class CopyBufferTests(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.task = SimpleNamespace(id=42, exec_prom_text=False, text='hello', language='zh', provider='twitter',
+                                    type='post', last_text='#tag')
+
+    @override_settings(COPY_BUFFER_TTL=60)
+    def test_pop_and_invalidate_on_text_change(self):
+        from unittest import mock
+        from utils import copyBuffer
+        items = [('a', {}), ('b', {}), ('', {}), ('c', {})]
+        with mock.patch('utils.runTimingTask.generate_ai_texts', return_value=items):
+            self.assertEqual(copyBuffer.refill_copy_buffer(self.task, cfg=object(), target=4), 3)
+        self.assertEqual(copyBuffer.pop_copies(self.task, 2), [('a', {}), ('b', {})])
+        self.assertEqual(copyBuffer.buffer_size(self.task), 1)
+        self.task.text = 'changed'
+        self.assertEqual(copyBuffer.pop_copies(self.task, 2), [])
+
+    @override_settings(COPY_BUFFER_TTL=60)
+    def test_refill_returns_stored_count(self):
+        from unittest import mock
+        from utils import copyBuffer
+
+        def generate(task, cfg, n):
+            # 生成期间其它进程已补充了 2 条
+            copyBuffer._save(task.id, copyBuffer.task_fingerprint(task),
+                             [{'text': 'x', 'meta': {}, 'expires_at': time.time() + 60}] * 2)
+            return [('a', {}), ('b', {}), ('c', {})]
+
+        with mock.patch('utils.runTimingTask.generate_ai_texts', side_effect=generate):
+            self.assertEqual(copyBuffer.refill_copy_buffer(self.task, cfg=object(), target=3), 1)
+        self.assertEqual(copyBuffer.buffer_size(self.task), 3)
+
+    def test_fill_is_scheduled_not_threaded(self):
+        from unittest import mock
+        from utils import copyBuffer
+        with mock.patch('utils.autoTask.get_scheduler') as get_scheduler:
+            copyBuffer.schedule_copy_buffer_fill(42)
+        args, kwargs = get_scheduler.return_value.scheduler.add_job.call_args
+        self.assertEqual(args[0], 'utils.copyBuffer:refill_copy_buffer_for_task')
+        self.assertEqual((kwargs['trigger'], kwargs['args'], kwargs['id']), ('date', [42], 'copy_buffer_fill_42'))
+
+
+class TwitterBatchCollectTests(SimpleTestCase):
+    def test_lookup_chunks_and_conversation_queries(self):
+        from unittest import mock
+        from utils import twitterUnit
+
+        def get_tweets(ids, **kwargs):
+            data = [SimpleNamespace(id=int(i), public_metrics={'like_count': 1, 'reply_count': 1}, created_at=None) for i in ids]
+            return SimpleNamespace(data=data, includes={})
+
+        unit = twitterUnit.TwitterUnit.__new__(twitterUnit.TwitterUnit)
+        unit.client = mock.Mock()
+        unit.client.get_tweets.side_effect = get_tweets
+        unit.client.search_recent_tweets.return_value = SimpleNamespace(data=None, includes={})
+        ids = [str(10 ** 18 + i) for i in range(250)]
+        with mock.patch.object(twitterUnit, 'bulkUpdateArticles', return_value={}), \
+                mock.patch.object(twitterUnit, 'bulkUpsertArticleComments'), \
+                mock.patch.object(twitterUnit.transaction, 'atomic'):
+            result = unit.getTwitterDataBatch(ids)
+        self.assertEqual(len(result), 250)
+        self.assertEqual([len(c.kwargs['ids']) for c in unit.client.get_tweets.call_args_list], [100, 100, 50])
+        queries = [c.kwargs['query'] for c in unit.client.search_recent_tweets.call_args_list]
+        self.assertTrue(all(len(q) <= twitterUnit.SEARCH_QUERY_MAX_LENGTH for q in queries))
+        self.assertEqual(sum(q.count('conversation_id:') for q in queries), 250)
+
+
+class TwitterReplySearchTests(SimpleTestCase):
+    def _unit(self, search):
+        from unittest import mock
+        from utils import twitterUnit
+        unit = twitterUnit.TwitterUnit.__new__(twitterUnit.TwitterUnit)
+        unit.client = mock.Mock()
+        unit.client.get_tweets.side_effect = lambda ids, **kwargs: SimpleNamespace(data=[
+            SimpleNamespace(id=int(i), public_metrics={'reply_count': 2}, created_at=None) for i in ids])
+        unit.client.search_recent_tweets.side_effect = search
+        return unit
+
+    def _collect(self, unit, ids):
+        from unittest import mock
+        from utils import twitterUnit
+        with mock.patch.object(twitterUnit, 'saveTwitterDataBatch'):
+            return unit.getTwitterDataBatch(ids)
+
+    @staticmethod
+    def _page(conversation, comment_id, next_token=None):
+        reply = SimpleNamespace(id=comment_id, text='', author_id=1, created_at=None, conversation_id=conversation)
+        return SimpleNamespace(data=[reply], includes={}, meta={'next_token': next_token} if next_token else {})
+
+    def test_replies_are_paged_by_next_token(self):
+        def search(query, **kwargs):
+            return self._page('1', 11, 'p2') if 'next_token' not in kwargs else self._page('1', 12)
+
+        unit = self._unit(search)
+        result = self._collect(unit, ['1'])
+        self.assertEqual([item['id'] for item in result['1']['comments']], ['11', '12'])
+        self.assertTrue(result['1']['commentsComplete'])
+        self.assertEqual(unit.client.search_recent_tweets.call_args_list[1].kwargs['next_token'], 'p2')
+
+    def test_search_failure_keeps_metrics(self):
+        from utils import twitterUnit
+        from utils.rateLimiter import RateLimitExceeded
+        # 每组查询只容纳一部分推文，第二组起限流
+        ids = [str(10 ** 18 + i) for i in range(60)]
+        queries = twitterUnit.buildConversationQueries(ids)
+        calls = []
+
+        def search(query, **kwargs):
+            calls.append(query)
+            if len(calls) > 1:
+                raise RateLimitExceeded('k', time.time() + 60)
+            return self._page(twitterUnit.queryConversationIds(query)[0], 5)
+
+        result = self._collect(self._unit(search), ids)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(result), 60)
+        first = set(twitterUnit.queryConversationIds(queries[0][0]))
+        self.assertEqual({k for k, v in result.items() if v['commentsComplete']}, first)
+
+    def test_incomplete_comments_do_not_advance_state(self):
+        from datetime import datetime
+        from stats.models import ArticleRefreshState
+        from utils.c_scheduler import schedule_next_refresh
+        now = datetime.now()
+        state = ArticleRefreshState(article_id='1', robot_id=1, next_refresh_at=now, comment_count=1, since_id='10')
+        data = {'pageViews': 5, 'commentCount': 3, 'likeCount': 1, 'comments': [{'id': '40'}],
+                'commentsComplete': False}
+        schedule_next_refresh(state, data, now, now)
+        self.assertEqual((state.comment_count, state.since_id, state.impression_count), (1, '10', 5))
+
+
+class TwitterRateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_tokens_follow_headers_and_block_when_empty(self):
+        from utils.rateLimiter import TwitterRateLimiter, RateLimitExceeded, rate_limit_key
+        limiter = TwitterRateLimiter(max_wait=0)
+        key = rate_limit_key('GET', '/2/tweets/123', 'k', 'token')
+        self.assertEqual(key, rate_limit_key('GET', '/2/tweets/456', 'k', 'token'))
+        limiter.acquire(key)  # 未知状态放行
+        limiter.update(key, {'x-rate-limit-remaining': '1', 'x-rate-limit-reset': str(time.time() + 60)})
+        limiter.acquire(key)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire(key)
+        limiter.update(key, {'x-rate-limit-remaining': '5', 'x-rate-limit-reset': str(time.time() + 60)})
+        limiter.acquire(key)
+        self.assertEqual(limiter.snapshot(key)['remaining'], 4)
+
+    def test_endpoint_keeps_version_and_is_cache_safe(self):
+        from utils.rateLimiter import endpoint_of, rate_limit_key
+        self.assertEqual(endpoint_of('get', '/2/tweets/1460323737035677698'), 'GET:/2/tweets/:id')
+        self.assertEqual(endpoint_of('GET', '/2/users/2244994945/tweets'), 'GET:/2/users/:id/tweets')
+        self.assertEqual(endpoint_of('POST', '/2/tweets'), 'POST:/2/tweets')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            from django.core.cache import cache
+            cache.validate_key(f"twrl:{rate_limit_key('GET', '/2/tweets/search/recent', 'k', 'token')}:remaining")
+
+    def test_user_auth_consumes_app_and_user_buckets(self):
+        from utils.rateLimiter import TwitterRateLimiter, RateLimitExceeded, rate_limit_buckets
+        limiter = TwitterRateLimiter(max_wait=0)
+        reset_at = str(time.time() + 60)
+        first = rate_limit_buckets('POST', '/2/tweets', 'k', 'token-1')
+        second = rate_limit_buckets('POST', '/2/tweets', 'k', 'token-2')
+        (app_key, _), (user_key, _) = first
+        self.assertEqual(app_key, second[0][0])
+        limiter.update_buckets(first, {'x-rate-limit-remaining': '5', 'x-rate-limit-reset': reset_at,
+                                       'x-app-limit-24hour-remaining': '1', 'x-app-limit-24hour-reset': reset_at})
+        limiter.acquire_buckets(first)
+        self.assertEqual((limiter.snapshot(app_key)['remaining'], limiter.snapshot(user_key)['remaining']), (0, 4))
+        # app 日总量用尽后，其它用户的请求同样被拦截
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire_buckets(second)
+        # 用户桶用尽时归还已取的 app 令牌
+        limiter.update_buckets(first, {'x-rate-limit-remaining': '0', 'x-rate-limit-reset': reset_at,
+                                       'x-app-limit-24hour-remaining': '3', 'x-app-limit-24hour-reset': reset_at})
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire_buckets(first)
+        self.assertEqual(limiter.snapshot(app_key)['remaining'], 3)
+        self.assertEqual(limiter.exhaust_buckets(second, {'x-rate-limit-reset': reset_at}), second[1][0])
+
+
+class ArticleRefreshScheduleTests(SimpleTestCase):
+    @override_settings(ARTICLE_REFRESH_MIN_SECONDS=100, ARTICLE_REFRESH_MAX_SECONDS=350, ARTICLE_REFRESH_YOUNG_HOURS=1)
+    def test_backoff_on_static_and_reset_on_change(self):
+        from datetime import datetime, timedelta
+        from stats.models import ArticleRefreshState
+        from utils.c_scheduler import schedule_next_refresh
+        now = datetime.now()
+        old = now - timedelta(days=3)
+        state = ArticleRefreshState(article_id='1', robot_id=1, next_refresh_at=now)
+        data = {'pageViews': 5, 'commentCount': 1, 'likeCount': 0, 'comments': [{'id': '20'}, {'id': '30'}]}
+        schedule_next_refresh(state, data, old, now)
+        self.assertEqual((state.interval_seconds, state.since_id), (100, '30'))
+        intervals = [schedule_next_refresh(state, dict(data, comments=[]), old, now).interval_seconds for _ in range(3)]
+        self.assertEqual(intervals, [200, 350, 350])
+        self.assertEqual(state.since_id, '30')
+        schedule_next_refresh(state, dict(data, likeCount=3), old, now)
+        self.assertEqual(state.interval_seconds, 100)
+        schedule_next_refresh(state, None, now - timedelta(minutes=5), now)
+        self.assertEqual(state.interval_seconds, 100)
+
+
+class StartupImportTests(SimpleTestCase):
+    def test_heavy_clients_not_imported_on_startup(self):
+        import os
+        from test.bench_importtime import LAZY_MODULES, measure_startup
+        result = measure_startup()
+        self.assertEqual([name for name in LAZY_MODULES if name in result['modules']], [])
+        # 可选耗时预算（毫秒），CI 机器上按需设置
+        budget = os.getenv('IMPORT_TIME_BUDGET_MS')
+        if budget:
+            self.assertLessEqual(result['total_ms'], float(budget))
+
+
+class GunicornConfigTests(SimpleTestCase):
+    def load(self, **environ):
+        import os
+        import runpy
+        from unittest import mock
+        from django.conf import settings
+        with mock.patch.dict(os.environ, environ):
+            return runpy.run_path(os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'))
+
+    def test_config_imports_and_uses_known_settings(self):
+        from gunicorn.config import Config
+        namespace = self.load(GUNICORN_WORKERS='3', GUNICORN_THREADS='4', GUNICORN_PRELOAD='0')
+        config = Config()
+        for name, value in namespace.items():
+            if name in config.settings:
+                config.set(name, value)
+        self.assertEqual((config.workers, config.threads, config.worker_class_str), (3, 4, 'gthread'))
+        self.assertFalse(config.preload_app)
+        self.assertGreater(config.timeout, 60)
+        self.assertIs(config.post_fork, namespace['post_fork'])
+
+    def test_post_fork_closes_inherited_connections(self):
+        from unittest import mock
+        post_fork = self.load()['post_fork']
+        with mock.patch('django.db.connections.close_all') as close_all, \
+                mock.patch('utils.httpSession.close_http_clients') as close_http_clients:
+            post_fork(mock.Mock(), mock.Mock())
+        close_all.assert_called_once_with()
+        close_http_clients.assert_called_once_with()
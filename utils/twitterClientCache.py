@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+@Project ：ClipAI
+@File    ：twitterClientCache.py
+@Author  ：LYP
+@Date    ：2026/10/18 21:30
+@description : 账号级 Twitter 客户端缓存（LRU，凭证变更时失效）
+
+每个 TwitterUnit 内含一个 tweepy.Client 及其 requests.Session，缓存后同一账号的多次发推 / 采集复用
+到 api.twitter.com 的 keep-alive 连接。缓存键为 (账号ID, 凭证指纹)：凭证变化时键随之变化，
+其它进程中的旧客户端不会再被命中，只待 LRU 淘汰；本进程内 PoolAccount.set_access_token 会立即移除旧客户端。
+超过 TWITTER_CLIENT_CACHE_SIZE 时淘汰最久未使用的客户端并关闭其连接。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+_lock = threading.Lock()
+_clients = OrderedDict()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+
+def credential_fingerprint(*credentials) -> str:
+    return hashlib.sha1('\0'.join(credential or '' for credential in credentials).encode('utf-8')).hexdigest()[:16]
+
+
+def _close(client) -> None:
+    session = getattr(getattr(client, 'client', None), 'session', None)
+    if session is not None:
+        session.close()
+
+
+def get_twitter_client(account_id: int, api_key: str, api_secret: str, access_token: str,
+                       access_token_secret: str):
+    """
+    获取账号的 TwitterUnit，缓存中不存在时创建
+    :param account_id: 账号ID（PoolAccount.id）
+    """
+    key = (account_id, credential_fingerprint(api_key, api_secret, access_token, access_token_secret))
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            _stats['hits'] += 1
+            return client
+        _stats['misses'] += 1
+    from utils.twitterUnit import TwitterUnit
+    client = TwitterUnit(api_key, api_secret, access_token, access_token_secret)
+    evicted = []
+    with _lock:
+        # 并发创建时以先放入缓存的为准
+        existing = _clients.get(key)
+        if existing is not None:
+            evicted.append(client)
+            client = existing
+        else:
+            _clients[key] = client
+            while len(_clients) > getattr(settings, 'TWITTER_CLIENT_CACHE_SIZE', 256):
+                evicted.append(_clients.popitem(last=False)[1])
+                _stats['evictions'] += 1
+    for item in evicted:
+        _close(item)
+    return client
+
+
+def invalidate_twitter_client(account_id: int | None) -> None:
+    """移除账号的全部缓存客户端（凭证变更或账号删除时调用）"""
+    if account_id is None:
+        return
+    with _lock:
+        removed = [_clients.pop(key) for key in list(_clients) if key[0] == account_id]
+        _stats['invalidations'] += len(removed)
+    for client in removed:
+        _close(client)
+
+
+def clear_twitter_clients() -> None:
+    with _lock:
+        removed = list(_clients.values())
+        _clients.clear()
+    for client in removed:
+        _close(client)
+
+
+def get_twitter_client_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats['size'] = len(_clients)
+    total = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / total, 4) if total else 0
+    return stats
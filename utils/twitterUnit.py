@@ -7,15 +7,18 @@
 @Date    ：2025/10/10 15:21
 @description : 推特工具类
 """
+import re
 import time
+from collections import defaultdict
 from datetime import datetime
 from imghdr import tests
 from math import trunc
 
-from tweepy import Client
 from tasks.models import TArticle as Article, TArticleComments as ArticleComments
-from models.models import TasksSimpletaskrun, TasksSimpletask, AiAiconfig, PromptsPromptconfig
-from django.db import transaction
+from models.models import TasksSimpletaskrun, TasksSimpletask, AiAiconfig
+from django.db import connection, transaction
+from stats.utils import apply_article_deltas, rollup_article_created
+from utils.configCache import get_prompt
 from utils.utils import logger
 
 
@@ -31,7 +34,9 @@ class TwitterUnit(object):
         self.api_secret = api_secret
         self.access_token = access_token
         self.access_token_secret = access_token_secret
-        self.client = Client(
+        # 经限流器发起请求：令牌不足时等待或直接跳过，不再等到 429 才发现（tweepy 首次使用时才导入）
+        from utils.rateLimiter import RateLimitedClient
+        self.client = RateLimitedClient(
             consumer_key=self.api_key,
             consumer_secret=self.api_secret,
             access_token=self.access_token,
@@ -39,7 +44,8 @@ class TwitterUnit(object):
             wait_on_rate_limit=False
         )
 
-    def sendTwitter(self, text: str, robotId: int, task: TasksSimpletask, aiConfig: AiAiconfig, userId: int) -> tuple[
+    def sendTwitter(self, text: str, robotId: int, task: TasksSimpletask, aiConfig: AiAiconfig, userId: int,
+                    prompt=None, jobId=None) -> tuple[
         bool, dict | None | str]:
         """
         发布推文
@@ -48,6 +54,8 @@ class TwitterUnit(object):
         :param task: 任务对象
         :param aiConfig: AI配置
         :param userId: 当前人
+        :param prompt: 已解析的提示词（记录运行明细用）
+        :param jobId: 所属执行作业ID（记录运行明细用）
         :return:
         """
         try:
@@ -58,7 +66,8 @@ class TwitterUnit(object):
                     data = response.data
                     createArticle("twitter", data, robotId)
                     createTaskDetail("twitter", text=text, sendType="post", task=task, aiConfig=aiConfig, status=True,
-                                     errorMessage=None, articleId=data["id"], userId=userId, robotId=robotId, )
+                                     errorMessage=None, articleId=data["id"], userId=userId, robotId=robotId,
+                                     prompt=prompt, jobId=jobId)
                 else:
                     data = dict()
             except:
@@ -66,7 +75,8 @@ class TwitterUnit(object):
             return True, data
         except Exception as e:
             createTaskDetail("twitter", text=text, sendType="post", task=task, aiConfig=aiConfig, status=False,
-                             errorMessage=str(e), articleId=None, userId=userId, robotId=robotId, )
+                             errorMessage=str(e), articleId=None, userId=userId, robotId=robotId, prompt=prompt,
+                             jobId=jobId)
             logger.error(f"发布推文失败: {e}")
             return False, str(e)
 
@@ -81,13 +91,6 @@ class TwitterUnit(object):
             response = self.client.get_tweet(id=tweet_id, expansions=['author_id'],
                                              tweet_fields=['public_metrics', 'created_at', 'context_annotations'],
                                              user_auth=True)
-            if hasattr(response, 'headers'):
-                remaining = response.headers.get('x-rate-limit-remaining')
-                reset_time = response.headers.get('x-rate-limit-reset')
-
-                # 如果剩余请求数很少，可以选择跳过
-                if remaining is not None and int(remaining) < 2:
-                    raise Exception("Rate limit exceeded")
 
             commentResponse = self.client.search_recent_tweets(
                 query=f"conversation_id:{tweet_id} is:reply",
@@ -99,29 +102,12 @@ class TwitterUnit(object):
             )
             try:
                 if hasattr(response, 'data') and response.data.public_metrics:
-                    result = response.data.public_metrics
-                    data = {
-                        'pageViews': result.get('impression_count', 0),  # 浏览量(曝光)
-                        'commentCount': result.get('reply_count', 0),  # 评论数
-                        'likeCount': result.get('like_count', 0),  # 点赞数
-                        'repostCount': result.get('retweet_count', 0),  # 转发数
-                        'citationCount': result.get('quote_count', 0),  # 引用数
-                        'createDate': response.data.created_at  # 创建时间
-                    }
+                    data = normalizeMetrics(response.data)
                     updateArticle(tweet_id, data)
                 else:
                     data = dict()
                 if hasattr(commentResponse, 'data') and commentResponse.data:
-                    userList = [{"id": str(item.id), "name": item["data"]["name"], "username": item["data"]["username"]}
-                                for
-                                item in commentResponse.includes["users"]]
-                    comments = [{"id": str(item.id), "text": item.text, "author_id": item.author_id,
-                                 "created_at": item.created_at}
-                                for item in commentResponse.data]
-                    user_dict = {user['id']: user for user in userList}
-                    newComments = [{**item, 'name': user_dict.get(item['author_id'], {}).get('name', 'Unknown'),
-                                    'username': user_dict.get(item['author_id'], {}).get('username', 'unknown_user')}
-                                   for item in comments]
+                    newComments = normalizeComments(commentResponse).get(str(tweet_id), [])
                     data['comments'] = newComments
                     logger.info(f"获取推文 {tweet_id} 评论列表成功 内容\n：{newComments}")
                     createArticleComments(tweet_id, newComments)
@@ -134,6 +120,81 @@ class TwitterUnit(object):
             logger.error(f"获取推文 {tweet_id} 指标数据失败: {e}")
             return False, None
 
+    def getTwitterDataBatch(self, tweet_ids: list[str], since_ids: dict[str, str] | None = None,
+                            known_comment_counts: dict[str, int] | None = None) -> dict[str, dict]:
+        """
+        批量获取同一账号下多条推文的指标数据及评论列表
+        指标走 Tweets lookup（每次最多 100 条），评论按 conversation_id 合并为 OR 查询
+        :param tweet_ids: 推文ID列表
+        :param since_ids: {推文ID: 已采集到的最新评论ID}，评论只拉取其后的新回复
+        :param known_comment_counts: {推文ID: 上次评论数}，评论数未变化的推文不再搜索评论
+        :return: {推文ID: 指标数据(含 comments)}，未取到的推文不出现在结果中
+        """
+        tweet_ids = [str(item) for item in tweet_ids]
+        since_ids = since_ids or {}
+        known_comment_counts = known_comment_counts or {}
+        result = {}
+        for start in range(0, len(tweet_ids), TWEETS_LOOKUP_MAX_IDS):
+            chunk = tweet_ids[start:start + TWEETS_LOOKUP_MAX_IDS]
+            logger.info(f"正在批量获取 {len(chunk)} 条推文的指标")
+            response = self.client.get_tweets(ids=chunk, tweet_fields=['public_metrics', 'created_at'],
+                                              user_auth=True)
+            for tweet in response.data or []:
+                if tweet.public_metrics:
+                    data = normalizeMetrics(tweet)
+                    data['comments'] = []
+                    result[str(tweet.id)] = data
+        if not result:
+            return result
+
+        searchIds = commentSearchIds(result, known_comment_counts)
+        comments, incomplete = {}, set()
+        queries = buildConversationQueries(searchIds, since_ids)
+        for index, (query, sinceId) in enumerate(queries):
+            try:
+                pages, complete = self._searchReplies(query, sinceId)
+            except Exception as e:
+                # 评论搜索失败不丢弃已取到的指标，这些推文的评论下次重新搜索；限流时其余查询也不再发起
+                logger.warning(f"搜索评论失败: {e}")
+                rest = queries[index:] if isRateLimitError(e) else [(query, sinceId)]
+                for restQuery, _ in rest:
+                    incomplete.update(queryConversationIds(restQuery))
+                if isRateLimitError(e):
+                    break
+                continue
+            for commentResponse in pages:
+                mergeComments(comments, commentResponse)
+            if not complete:
+                incomplete.update(queryConversationIds(query))
+
+        applyComments(result, comments, incomplete)
+        saveTwitterDataBatch(result)
+        return result
+
+    def _searchReplies(self, query: str, sinceId: str | None) -> tuple[list, bool]:
+        """
+        按 next_token 分页拉取一组评论查询（最多 SEARCH_MAX_PAGES 页）
+        :return: (各页响应, 是否已取完)
+        """
+        pages = []
+        params = {'since_id': sinceId} if sinceId else {}
+        for _ in range(SEARCH_MAX_PAGES):
+            commentResponse = self.client.search_recent_tweets(
+                query=query,
+                tweet_fields=['author_id', 'conversation_id', 'created_at'],
+                user_fields=['username', 'name'],
+                expansions=['author_id'],
+                max_results=SEARCH_MAX_RESULTS,
+                user_auth=True,
+                **params
+            )
+            pages.append(commentResponse)
+            nextToken = (getattr(commentResponse, 'meta', None) or {}).get('next_token')
+            if not nextToken:
+                return pages, True
+            params['next_token'] = nextToken
+        return pages, False
+
     def replyTwitterMessages(self, tweet_id: str, text: str) -> bool:
         """
         回复特定评论
@@ -156,6 +217,121 @@ class TwitterUnit(object):
             return False
 
 
+# Tweets lookup 单次最多 100 个ID；search 查询串最长 512 字符，单次最多 100 条
+TWEETS_LOOKUP_MAX_IDS = 100
+SEARCH_QUERY_MAX_LENGTH = 512
+SEARCH_MAX_RESULTS = 100
+# 单组评论查询最多翻页数，超过时本次视为未取完，下次继续
+SEARCH_MAX_PAGES = 10
+_CONVERSATION_ID = re.compile(r'conversation_id:(\d+)')
+# bulk_update / bulk_create 单条 SQL 的行数
+BULK_BATCH_SIZE = 500
+
+
+def normalizeMetrics(tweet) -> dict:
+    """推文对象 -> 入库用的指标字典"""
+    result = tweet.public_metrics
+    return {
+        'pageViews': result.get('impression_count', 0),  # 浏览量(曝光)
+        'commentCount': result.get('reply_count', 0),  # 评论数
+        'likeCount': result.get('like_count', 0),  # 点赞数
+        'repostCount': result.get('retweet_count', 0),  # 转发数
+        'citationCount': result.get('quote_count', 0),  # 引用数
+        'createDate': tweet.created_at  # 创建时间
+    }
+
+
+def normalizeComments(commentResponse) -> dict[str, list]:
+    """
+    评论搜索结果 -> {conversation_id: [评论]}，评论附带作者昵称
+    单条推文查询时 conversation_id 即推文ID
+    """
+    users = (commentResponse.includes or {}).get("users", [])
+    user_dict = {str(item.id): {"name": item["data"]["name"], "username": item["data"]["username"]} for item in users}
+    grouped = {}
+    for item in commentResponse.data or []:
+        author = user_dict.get(str(item.author_id), {})
+        grouped.setdefault(str(item.conversation_id), []).append({
+            "id": str(item.id), "text": item.text, "author_id": item.author_id, "created_at": item.created_at,
+            "name": author.get('name', 'Unknown'), "username": author.get('username', 'unknown_user'),
+        })
+    return grouped
+
+
+def buildConversationQueries(tweet_ids: list[str], since_ids: dict[str, str] | None = None) \
+        -> list[tuple[str, str | None]]:
+    """
+    将多个推文的评论查询合并为若干个不超过长度上限的 OR 查询
+    since_id 作用于整条查询，因此按 since_id 排序后分组，每组取最小值（组内有未采集过的推文则不限制）
+    :return: [(查询串, since_id)]
+    """
+    since_ids = since_ids or {}
+    ordered = sorted(tweet_ids, key=lambda k: (since_ids.get(k) is None, int(since_ids.get(k) or 0)))
+    queries, clauses, groupSince = [], [], []
+    suffix = ") is:reply"
+
+    def flush():
+        since = None if not groupSince or None in groupSince else min(groupSince, key=int)
+        queries.append(("(" + " OR ".join(clauses) + suffix, since))
+
+    for tweetId in ordered:
+        clause = f"conversation_id:{tweetId}"
+        candidate = "(" + " OR ".join(clauses + [clause]) + suffix
+        if clauses and len(candidate) > SEARCH_QUERY_MAX_LENGTH:
+            flush()
+            clauses, groupSince = [], []
+        clauses.append(clause)
+        groupSince.append(since_ids.get(tweetId))
+    if clauses:
+        flush()
+    return queries
+
+
+def queryConversationIds(query: str) -> list[str]:
+    """评论查询串中包含的推文ID"""
+    return _CONVERSATION_ID.findall(query)
+
+
+def isRateLimitError(error: Exception) -> bool:
+    """限流器拒绝或 Twitter 返回 429"""
+    from utils.rateLimiter import RateLimitExceeded
+    if isinstance(error, RateLimitExceeded):
+        return True
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) == 429
+
+
+def mergeComments(comments: dict[str, list], commentResponse) -> None:
+    """将一页评论搜索结果按 conversation_id 合并到 comments"""
+    if commentResponse.data:
+        for conversationId, items in normalizeComments(commentResponse).items():
+            comments.setdefault(conversationId, []).extend(items)
+
+
+def applyComments(result: dict[str, dict], comments: dict[str, list], incomplete: set) -> None:
+    """
+    把评论挂到各推文结果上；commentsComplete 为 False 表示评论未取全（搜索失败或超过翻页上限），
+    采集状态不推进 since_id / 评论数，下次重新搜索
+    """
+    for tweetId, data in result.items():
+        data['comments'] = comments.get(tweetId, [])
+        data['commentsComplete'] = tweetId not in incomplete
+
+
+def commentSearchIds(result: dict[str, dict], known_comment_counts: dict[str, int]) -> list[str]:
+    """没有回复或回复数与上次相同的推文无需再搜索评论"""
+    return [k for k, v in result.items() if v['commentCount'] and v['commentCount'] != known_comment_counts.get(k)]
+
+
+def saveTwitterDataBatch(result: dict[str, dict]) -> None:
+    """整批一次落库：指标 bulk_update，评论按 comment_id upsert"""
+    if not result:
+        return
+    with transaction.atomic():
+        articles = bulkUpdateArticles(result)
+        bulkUpsertArticleComments({k: v['comments'] for k, v in result.items() if v['comments']}, articles)
+
+
 @transaction.atomic
 def createArticle(platform: str, result: dict, robotId: int) -> Article:
     """
@@ -178,13 +354,14 @@ def createArticle(platform: str, result: dict, robotId: int) -> Article:
             robot_id=robotId,
             created_at=time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
         )
+        rollup_article_created(platform, robotId, datetime.now().date())
         return article
 
 
 @transaction.atomic
 def updateArticle(articleId: str, data: dict) -> tuple[bool, Article | None]:
     """
-    回复特定评论
+    更新单篇文章指标
    :param articleId: 文章ID
    :param data: 获取到的文章数据 点赞量等
    data = {
@@ -197,16 +374,42 @@ def updateArticle(articleId: str, data: dict) -> tuple[bool, Article | None]:
         }
    :return:
    """
-    try:
-        article = Article.objects.get(article_id=articleId)
+    articles = bulkUpdateArticles({articleId: data})
+    article = articles.get(str(articleId))
+    return article is not None, article
+
+
+@transaction.atomic
+def bulkUpdateArticles(metrics: dict[str, dict]) -> dict[str, Article]:
+    """
+    批量更新文章指标：一次查询取出文章，bulk_update 按批写回
+    :param metrics: {文章ID: updateArticle 同格式的指标数据}
+    :return: {文章ID: 文章}，仅包含库中存在的文章
+    """
+    if not metrics:
+        return {}
+    now = datetime.now()
+    # 行锁保证变化量基于最新值计算：并发刷新同一文章时后到者等待并读到前者写入的值，日汇总不会重复累加
+    articles = {item.article_id: item for item in Article.objects.select_for_update().filter(
+        article_id__in=[str(k) for k in metrics]).order_by('article_id')}
+    # 同步累加指标变化量到日汇总表
+    deltas = defaultdict(lambda: defaultdict(int))
+    for articleId, data in metrics.items():
+        article = articles.get(str(articleId))
+        if article is None:
+            continue
+        bucket = deltas[(article.created_at.date(), article.robot_id, article.platform)]
+        bucket['impression_count'] += data.get("pageViews", 0) - (article.impression_count or 0)
+        bucket['comment_count'] += data.get("commentCount", 0) - (article.comment_count or 0)
+        bucket['like_count'] += data.get("likeCount", 0) - (article.like_count or 0)
         article.impression_count = data.get("pageViews", 0)
         article.comment_count = data.get("commentCount", 0)
         article.like_count = data.get("likeCount", 0)
-        article.updated_at = datetime.now()
-        article.save()
-        return True, article
-    except Article.DoesNotExist:
-        return False, None
+        article.updated_at = now
+    apply_article_deltas(deltas)
+    Article.objects.bulk_update(list(articles.values()), ['impression_count', 'comment_count', 'like_count',
+                                                          'updated_at'], batch_size=BULK_BATCH_SIZE)
+    return articles
 
 
 @transaction.atomic
@@ -222,27 +425,58 @@ def createArticleComments(articleId: str, data: list) -> bool:
     'username': 'KatharynJe68272'}
     """
     try:
-        for item in data:
-            print(f" 创建文章评论==>{item}")
-            articleId = Article.objects.get(article_id=articleId).id
-            comment = ArticleComments.objects.create(
-                article_id=articleId,
-                comment_id=item.get("id"),
-                content=item.get("text"),
-                commenter_id=item.get("author_id"),
-                created_at=item.get("created_at"),
-                commenter_nickname=item.get("name")
-            )
-            comment.save()
+        bulkUpsertArticleComments({articleId: data})
         return True
     except Exception as e:
         print(e)
         return False
 
 
+@transaction.atomic
+def bulkUpsertArticleComments(comments: dict[str, list], articles: dict[str, Article] | None = None) -> int:
+    """
+    批量写入评论，按 comment_id 幂等：重复采集时更新内容与昵称而不是报唯一键冲突
+    :param comments: {文章ID: [评论]}，评论格式同 createArticleComments
+    :param articles: 已查出的 {文章ID: 文章}，为空时按文章ID一次查询
+    :return: 写入条数
+    """
+    if not comments:
+        return 0
+    if articles is None:
+        articles = {item.article_id: item for item in
+                    Article.objects.filter(article_id__in=[str(k) for k in comments]).only('id', 'article_id')}
+    now = datetime.now()
+    # 同一批次内 comment_id 去重，否则 ON CONFLICT DO UPDATE 会因同一行被更新两次而报错
+    rows = {}
+    for articleId, items in comments.items():
+        article = articles.get(str(articleId))
+        if article is None:
+            continue
+        for item in items:
+            rows[str(item.get("id"))] = ArticleComments(
+                article_id=article.id,
+                comment_id=str(item.get("id")),
+                content=item.get("text"),
+                commenter_id=item.get("author_id"),
+                commenter_nickname=item.get("name"),
+                created_at=item.get("created_at"),
+                updated_at=now,
+            )
+    if not rows:
+        return 0
+    if connection.features.supports_update_conflicts_with_target:
+        ArticleComments.objects.bulk_create(rows.values(), batch_size=BULK_BATCH_SIZE, update_conflicts=True,
+                                            unique_fields=['comment_id'],
+                                            update_fields=['content', 'commenter_nickname', 'updated_at'])
+    else:
+        ArticleComments.objects.bulk_create(rows.values(), batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+    return len(rows)
+
+
 @transaction.atomic
 def createTaskDetail(platform: str, text: str, sendType: str, task: TasksSimpletask, aiConfig: AiAiconfig, status: bool,
-                     errorMessage: str | None, articleId: str | None, userId: int, robotId: int) -> bool:
+                     errorMessage: str | None, articleId: str | None, userId: int, robotId: int,
+                     prompt=None, jobId=None) -> bool:
     """
     创建任务详情
     :param platform: 平台
@@ -255,10 +489,14 @@ def createTaskDetail(platform: str, text: str, sendType: str, task: TasksSimplet
     :param articleId :文章ID
     :param userId
     :param robotId
+    :param prompt: 已解析的提示词，为空时从配置缓存读取
+    :param jobId: 所属执行作业ID（run 接口入队执行时）
     :return:
     """
     try:
-        used_prompt = PromptsPromptconfig.objects.get(id=task.prompt_id).name
+        if prompt is None:
+            prompt = get_prompt(task.prompt_id)
+        used_prompt = prompt.name if prompt else ''
         createData = TasksSimpletaskrun.objects.create(
             provider=platform,
             type=sendType,
@@ -270,6 +508,7 @@ def createTaskDetail(platform: str, text: str, sendType: str, task: TasksSimplet
             task_id=task.id,
             owner_id=userId,
             account_id=robotId,
+            job_id=jobId,
         )
         if status:
             createData.success = "success"
@@ -1,7 +1,11 @@
+import base64
+import json
 import platform
 from threading import Lock
 from typing import List, Dict
 from django.core.paginator import EmptyPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 import logging
 import os
@@ -22,12 +26,21 @@ lang_map = {
 }
 
 
-def generate_message(task: Task) -> List[Dict[str, str]]:
+def generate_message(task: Task, prompt=None) -> List[Dict[str, str]]:
+    """
+    构造大模型消息
+    :param prompt: 已解析的提示词，为空时从配置缓存读取
+    """
     lang_name = lang_map.get(task.language, 'Auto')
 
     isPrompt = task.exec_prom_text
     if isPrompt:
-        prompt_text = Prompts.objects.get(id=task.prompt_id).content
+        if prompt is None:
+            from utils.configCache import get_prompt
+            prompt = get_prompt(task.prompt_id)
+            if prompt is None:
+                raise Prompts.DoesNotExist(f"提示词 {task.prompt_id} 不存在")
+        prompt_text = prompt.content
     else:
         prompt_text = task.text
     if task.language == "zh" or task.language == "auto":
@@ -198,12 +211,31 @@ class ApiResponse(Response):
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    页码分页；paginationMode=cursor 时切换为按 (created_at, id) 倒序的游标分页：
+    不做 OFFSET 扫描，总数默认不统计（withTotal=1 时才 COUNT）
+    """
     page_size = 20  # 默认每页条数
     page_query_param = 'currentPage'  # 关键：匹配前端的 "currentPage" 参数（指定页码）
     page_size_query_param = 'pageSize'  # 匹配前端的 "pageSize" 参数（指定每页条数）
     max_page_size = 999  # 最大每页条数限制
+    mode_query_param = 'paginationMode'  # cursor 开启游标分页
+    cursor_query_param = 'cursor'  # 上一页返回的 next_cursor
+    total_query_param = 'withTotal'  # 游标分页下是否统计总数
+    cursor_fields = ('created_at', 'id')  # 游标排序键（倒序），需有联合索引
 
     def get_paginated_response(self, data):
+        if getattr(self, 'keyset', False):
+            return ApiResponse({
+                'pagination': {
+                    'mode': 'cursor',
+                    'page_size': self.keyset_page_size,
+                    'next_cursor': self.next_cursor,
+                    'has_next': self.next_cursor is not None,
+                    'total': self.keyset_total,
+                },
+                'results': data
+            })
         # 现在这个方法会在分页生效时被自动调用
         return ApiResponse({
             'pagination': {
@@ -219,6 +251,9 @@ class CustomPagination(PageNumberPagination):
         """
         处理超出范围的页码请求
         """
+        self.keyset = request.query_params.get(self.mode_query_param) == 'cursor'
+        if self.keyset:
+            return self.paginate_keyset(queryset, request)
         try:
             return super().paginate_queryset(queryset, request, view=view)
         except Exception as e:
@@ -234,3 +269,36 @@ class CustomPagination(PageNumberPagination):
                 return []
             # 如果是其他异常，重新抛出
             raise e
+
+    def paginate_keyset(self, queryset, request):
+        """按 (created_at, id) 倒序取下一页：WHERE (created_at, id) < 游标位置，多取一条判断是否还有下一页"""
+        first, second = self.cursor_fields
+        self.request = request
+        self.keyset_page_size = self.get_page_size(request) or self.page_size
+        self.keyset_total = queryset.count() if request.query_params.get(self.total_query_param) in ('1', 'true') \
+            else None
+        queryset = queryset.order_by(f'-{first}', f'-{second}')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            value, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(**{f'{first}__lt': value}) | Q(**{first: value, f'{second}__lt': pk}))
+        rows = list(queryset[:self.keyset_page_size + 1])
+        self.next_cursor = None
+        if len(rows) > self.keyset_page_size:
+            rows = rows[:self.keyset_page_size]
+            last = rows[-1]
+            self.next_cursor = self.encode_cursor(getattr(last, first), getattr(last, second))
+        return rows
+
+    @staticmethod
+    def encode_cursor(value: datetime, pk: int) -> str:
+        raw = json.dumps([value.isoformat(), pk])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, int]:
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return datetime.fromisoformat(value), int(pk)
+        except (ValueError, TypeError):
+            raise NotFound('无效的游标')